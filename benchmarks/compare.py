@@ -0,0 +1,41 @@
+"""
+Compara dois resultados JSON da suíte (suite.py ou load_test.py) e aponta regressões:
+tempos/latências (*_s, *_ms; max_* fica de fora por ser ruidoso) que pioraram e vazões
+(*_per_s, *_rps) que caíram mais que --threshold. Sai com código 1 se houver regressão.
+
+    uv run python benchmarks/compare.py benchmarks/results/suite-A.json benchmarks/results/suite-B.json
+"""
+from __future__ import annotations
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from harness import compare
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("current", type=Path)
+    parser.add_argument("--threshold", type=float, default=0.1, help="Piora relativa tolerada (0.1 = 10%%)")
+    args = parser.parse_args(argv)
+
+    baseline, current = (json.loads(p.read_text(encoding="utf-8")) for p in (args.baseline, args.current))
+    if baseline["kind"] != current["kind"]:
+        parser.error(f"Resultados de tipos diferentes: {baseline['kind']} x {current['kind']}")
+    if baseline["params"] != current["params"]:
+        print(f"Atenção: parâmetros diferentes entre as execuções: {baseline['params']} x {current['params']}",
+              file=sys.stderr)
+
+    rows = compare(baseline, current, args.threshold)
+    for row in rows:
+        print(json.dumps(row))
+    regressions = [r for r in rows if r["regression"]]
+    print(f"{len(regressions)} regressão(ões) acima de {args.threshold:.0%} em {len(rows)} métricas "
+          f"({baseline['environment'].get('commit')} -> {current['environment'].get('commit')})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
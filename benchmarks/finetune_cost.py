@@ -0,0 +1,90 @@
+"""
+Custo da atualização diária do LSTM: retreino completo (Trainer.fit) x fine-tuning
+incremental (Trainer.fine_tune) depois de --new-bars pregões novos.
+
+Para cada tamanho de série: treina a base em série[:-new_bars], depois mede
+  - full_s:        fit completo na série inteira (early stopping desligado)
+  - incremental_s: fine_tune a partir da base (janelas novas + replay)
+e a loss (MSE, escala do scaler) de cada um nas últimas --eval-windows janelas.
+Os artefatos vão para um diretório temporário.
+
+    uv run python benchmarks/finetune_cost.py --sizes 1000 5000 20000 --epochs 20
+"""
+from __future__ import annotations
+import argparse
+import json
+import tempfile
+import time
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from ftc4.ml_models.lstm_model import train
+from ftc4.ml_models.lstm_model.store import ArtifactStore
+from ftc4.ml_models.lstm_model.train import Trainer, window_views
+
+
+def _series(n: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return np.cumsum(rng.normal(0, 0.01, n)) + np.sin(np.linspace(0, n / 20, n)) + 10
+
+
+@torch.no_grad()
+def _tail_loss(model: nn.Module, trainer: Trainer, series: np.ndarray, n_windows: int) -> float:
+    flat = torch.as_tensor(trainer.pp.transform(series).reshape(-1), dtype=torch.float32)
+    windows, targets = window_views(flat, trainer.pp.lookback)
+    model.eval()
+    return nn.functional.mse_loss(model(windows[-n_windows:].unsqueeze(-1)), targets[-n_windows:].unsqueeze(1)).item()
+
+
+def run(n: int, lookback: int, epochs: int, new_bars: int, ft_epochs: int, replay: int, eval_windows: int) -> dict:
+    series = _series(n)
+    ticker = f"BENCH_{n}"
+    Trainer(lookback=lookback, epochs=epochs, ticker=ticker, patience=None).fit(series[:-new_bars], device="cpu")
+
+    full = Trainer(lookback=lookback, epochs=epochs, ticker=ticker, patience=None)
+    t0 = time.perf_counter()
+    full_model = full.fit(series, device="cpu")
+    full_s = time.perf_counter() - t0
+
+    # a base de novo como versão ativa, para o fine-tuning partir dela
+    Trainer(lookback=lookback, epochs=epochs, ticker=ticker, patience=None).fit(series[:-new_bars], device="cpu")
+    inc = Trainer(lookback=lookback, epochs=epochs, ticker=ticker)
+    t0 = time.perf_counter()
+    inc_model = inc.fine_tune(series, device="cpu", epochs=ft_epochs, replay=replay)
+    inc_s = time.perf_counter() - t0
+
+    return {
+        "n": n,
+        "mode": inc.mode,
+        "full_s": round(full_s, 3),
+        "incremental_s": round(inc_s, 3),
+        "speedup": round(full_s / inc_s, 1),
+        "full_tail_loss": round(_tail_loss(full_model, full, series, eval_windows), 6),
+        "incremental_tail_loss": round(_tail_loss(inc_model, inc, series, eval_windows), 6),
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1_000, 5_000, 20_000])
+    parser.add_argument("--lookback", type=int, default=60)
+    parser.add_argument("--epochs", type=int, default=20, help="Épocas do treino completo")
+    parser.add_argument("--new-bars", type=int, default=1)
+    parser.add_argument("--ft-epochs", type=int, default=None, help="Padrão: FINETUNE_EPOCHS")
+    parser.add_argument("--replay", type=int, default=None, help="Padrão: FINETUNE_REPLAY")
+    parser.add_argument("--eval-windows", type=int, default=50)
+    parser.add_argument("--threads", type=int, default=None, help="torch.set_num_threads")
+    args = parser.parse_args(argv)
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    with tempfile.TemporaryDirectory() as tmp:
+        train.artifact_store = ArtifactStore(tmp)
+        for n in args.sizes:
+            print(json.dumps(run(n, args.lookback, args.epochs, args.new_bars, args.ft_epochs,
+                                 args.replay, args.eval_windows)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Utilitários compartilhados pela suíte de benchmarks (suite.py, load_test.py, compare.py):
+  - ambiente isolado (banco, artefatos e logs num diretório temporário);
+  - universo sintético de OHLCV (N tickers x M anos, determinístico);
+  - cronometragem com aquecimento e percentis;
+  - resultados em JSON (com ambiente e parâmetros) e comparação entre execuções.
+
+Não importa o ftc4 no topo: `isolate_environment()` precisa rodar antes, porque as
+configurações (DATA_DIR, ARTIFACTS_DIR, LOG_DIR) são lidas no import.
+"""
+from __future__ import annotations
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+TRADING_DAYS_PER_YEAR = 252
+
+
+def isolate_environment(prefix: str = "ftc4-bench-") -> Path:
+    """Aponta banco/artefatos/logs para um diretório temporário (variáveis já definidas prevalecem)."""
+    root = Path(tempfile.mkdtemp(prefix=prefix))
+    for var, sub in (("DATA_DIR", "data"), ("ARTIFACTS_DIR", "artifacts"), ("LOG_DIR", "logs")):
+        os.environ.setdefault(var, str(root / sub))
+        Path(os.environ[var]).mkdir(parents=True, exist_ok=True)
+    return root
+
+
+def bench_tickers(n: int, prefix: str = "SYN") -> list[str]:
+    return [f"{prefix}{i:04d}" for i in range(n)]
+
+
+def synthetic_universe(n_tickers: int, years: float, end: str = "2024-01-01", seed: int = 0,
+                       prefix: str = "SYN"):
+    """
+    Preços normalizados (colunas PRICE_COLUMNS) de `n_tickers` tickers sintéticos
+    cobrindo `years` anos até `end` (exclusivo). Mesmos argumentos => mesmos dados.
+    """
+    import pandas as pd
+    from ftc4.data_pipeline.sources.fake_source import synthetic_ohlcv
+    from ftc4.data_pipeline.validation.stock_market_prices import normalize_price_frame
+
+    end_day = date.fromisoformat(end)
+    start = np.busday_offset(end_day, -int(round(years * TRADING_DAYS_PER_YEAR)), roll="forward")
+    frames = [normalize_price_frame(synthetic_ohlcv(t, str(start), end, seed=seed), ticker=t)
+              for t in bench_tickers(n_tickers, prefix)]
+    return pd.concat(frames, ignore_index=True)
+
+
+def latency_summary(samples_s: list[float] | np.ndarray) -> dict[str, float]:
+    """Percentis em milissegundos."""
+    ms = np.asarray(samples_s, dtype=float) * 1000
+    if not len(ms):
+        return {}
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {"p50_ms": round(float(p50), 4), "p95_ms": round(float(p95), 4), "p99_ms": round(float(p99), 4),
+            "mean_ms": round(float(ms.mean()), 4), "max_ms": round(float(ms.max()), 4)}
+
+
+def measure(fn: Callable[..., Any], repeat: int = 5, warmup: int = 1,
+            setup: Callable[[], tuple] | None = None) -> dict:
+    """
+    Roda `fn(*setup())` `warmup` + `repeat` vezes; só as `repeat` entram na estatística.
+    `setup` (fora do tempo) prepara os argumentos de cada rodada, ex.: um banco vazio.
+    """
+    samples = []
+    for i in range(warmup + repeat):
+        args = setup() if setup is not None else ()
+        t0 = time.perf_counter()
+        fn(*args)
+        elapsed = time.perf_counter() - t0
+        if i >= warmup:
+            samples.append(elapsed)
+    return {"runs": repeat, "min_s": round(min(samples), 6), **latency_summary(samples)}
+
+
+def environment() -> dict:
+    """O que muda o resultado além do código: máquina, versões e commit."""
+    import torch
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=Path(__file__).parent, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "torch": torch.__version__,
+        "torch_threads": torch.get_num_threads(),
+    }
+
+
+def save_results(kind: str, params: dict, results: dict, out: Path | None = None) -> Path:
+    """Grava {kind, created_at, environment, params, results}; padrão: benchmarks/results/<kind>-<timestamp>.json."""
+    out = out or RESULTS_DIR / f"{kind}-{time.strftime('%Y%m%dT%H%M%S')}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    payload = {"kind": kind, "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "environment": environment(),
+               "params": params, "results": results}
+    out.write_text(json.dumps(payload, indent=2, ensure_ascii=False), encoding="utf-8")
+    return out
+
+
+def _direction(metric: str) -> int:
+    """+1: maior é melhor (vazão); -1: menor é melhor (tempo); 0: não comparável (ex.: max, ruidoso)."""
+    if metric.startswith("max_"):
+        return 0
+    if metric.endswith(("_per_s", "_rps")):
+        return 1
+    if metric.endswith(("_s", "_ms")):
+        return -1
+    return 0
+
+
+def compare(baseline: dict, current: dict, threshold: float = 0.1) -> list[dict]:
+    """
+    Métrica a métrica (benchmarks presentes nos dois arquivos): variação relativa e
+    `regression=True` quando piora mais que `threshold` (0.1 = 10%).
+    """
+    rows = []
+    for name, base in baseline["results"].items():
+        cur = current["results"].get(name)
+        if not isinstance(base, dict) or not isinstance(cur, dict):
+            continue
+        for metric, old in base.items():
+            new, direction = cur.get(metric), _direction(metric)
+            if not direction or not isinstance(old, (int, float)) or not isinstance(new, (int, float)) or not old:
+                continue
+            change = (new - old) / old
+            rows.append({"benchmark": name, "metric": metric, "baseline": old, "current": new,
+                         "change": round(change, 4), "regression": change * direction < -threshold})
+    return rows
@@ -0,0 +1,128 @@
+"""
+Carga HTTP na API pública rodando no próprio processo (httpx.ASGITransport, sem rede
+nem uvicorn): lifespan real, banco sintético (--tickers x --years) e um modelo treinado
+por ticker, tudo num diretório temporário.
+
+Cada cenário dispara --requests requisições com --concurrency clientes simultâneos e
+reporta vazão (req/s), p50/p95/p99 de latência e contagem por status:
+
+  health          GET /health
+  predict         GET /lstm/predict, tickers em rodízio
+  predict_batch   POST /lstm/predict_batch com --batch-size tickers
+
+Com --no-forecast-cache toda previsão roda o modelo (senão, a partir da 2ª por ticker
+o cache de previsões responde). Resultado em benchmarks/results/load-<timestamp>.json.
+
+    uv run python benchmarks/load_test.py --concurrency 16 --requests 1000
+    uv run python benchmarks/load_test.py --scenarios predict --no-forecast-cache
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import time
+from collections import Counter
+from pathlib import Path
+
+from harness import bench_tickers, isolate_environment, latency_summary, save_results, synthetic_universe
+
+SCENARIOS = ("health", "predict", "predict_batch")
+
+
+def _requests(args, tickers: list[str]) -> dict:
+    """Cenário -> função (cliente, i) que dispara a i-ésima requisição."""
+    def predict(client, i):
+        return client.get("/lstm/predict", params={"ticker": tickers[i % len(tickers)], "steps": args.steps})
+
+    def predict_batch(client, i):
+        batch = [tickers[(i + k) % len(tickers)] for k in range(min(args.batch_size, len(tickers)))]
+        return client.post("/lstm/predict_batch", json={"tickers": batch, "steps": args.steps})
+
+    return {"health": lambda client, i: client.get("/health"), "predict": predict, "predict_batch": predict_batch}
+
+
+async def run_scenario(client, send, total: int, concurrency: int) -> dict:
+    latencies: list[float] = []
+    statuses: Counter = Counter()
+    counter = iter(range(total))
+
+    async def worker():
+        for i in counter:   # iterador compartilhado: cada índice sai uma vez
+            t0 = time.perf_counter()
+            try:
+                r = await send(client, i)
+                statuses[str(r.status_code)] += 1
+            except Exception as e:
+                statuses[type(e).__name__] += 1
+            latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - t0
+    ok = sum(n for s, n in statuses.items() if s.startswith("2"))
+    return {"requests": total, "concurrency": concurrency, "wall_s": round(wall, 4),
+            "throughput_rps": round(total / wall, 2), "error_rate": round(1 - ok / total, 4),
+            "status": dict(statuses), **latency_summary(latencies)}
+
+
+async def run(args) -> dict:
+    import httpx
+    from sqlalchemy.orm import Session
+    from ftc4.api.public import app
+    from ftc4.data_pipeline.crud.stock_market_prices import upsert_price_frame
+    from ftc4.data_pipeline.database.connection import engine
+    from ftc4.ml_models.lstm_model.train import Trainer
+
+    tickers = bench_tickers(args.tickers)
+    results = {}
+    async with app.router.lifespan_context(app):
+        frame = synthetic_universe(args.tickers, args.years, seed=args.seed)
+        with Session(engine) as db:
+            upsert_price_frame(db, frame)
+        for ticker, group in frame.groupby("ticker"):
+            Trainer(lookback=args.lookback, epochs=args.epochs, ticker=ticker).fit(group["close"].to_numpy(), device="cpu")
+
+        senders = _requests(args, tickers)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            for name in args.scenarios:
+                send = senders[name]
+                for i in range(args.warmup):
+                    await send(client, i)
+                results[name] = await run_scenario(client, send, args.requests, args.concurrency)
+                print(json.dumps({"scenario": name, **results[name]}))
+    return results
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--tickers", type=int, default=8)
+    parser.add_argument("--years", type=float, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--lookback", type=int, default=60)
+    parser.add_argument("--epochs", type=int, default=2, help="Épocas do treino de cada ticker (só preparo)")
+    parser.add_argument("--steps", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=500, help="Requisições por cenário")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=10, help="Requisições descartadas por cenário")
+    parser.add_argument("--no-forecast-cache", action="store_true", help="Desliga o cache de previsões")
+    parser.add_argument("--out", type=Path, default=None, help="Arquivo JSON de saída")
+    args = parser.parse_args(argv)
+
+    root = isolate_environment()
+    if args.no_forecast_cache:
+        os.environ["FORECAST_CACHE_MAX_ENTRIES"] = "0"
+    try:
+        results = asyncio.run(run(args))
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    params = {k: v for k, v in vars(args).items() if k != "out"}
+    print(f"Resultados em {save_results('load', params, results, args.out)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Latência de leitura de séries enquanto uma ingestão em massa está rodando,
+comparando os perfis de conexão SQLite ("legacy" x "wal").
+A ingestão roda em outro processo (como a API admin ou a CLI sync_watchlist),
+então o que aparece na latência é a disputa de locks do SQLite, não o GIL.
+
+    uv run python benchmarks/sqlite_concurrency.py --rows 200000 --readers 4
+"""
+from __future__ import annotations
+import argparse
+import json
+import multiprocessing as mp
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from ftc4.data_pipeline.crud.stock_market_prices import PriceSeries, upsert_price_frame
+from ftc4.data_pipeline.database.connection import Base, make_engines
+from ftc4.data_pipeline.sources.fake_source import synthetic_ohlcv
+from ftc4.data_pipeline.validation.stock_market_prices import normalize_price_frame
+
+READ_TICKER = "READ"
+
+
+def _frame(tickers: list[str], start: str, end: str) -> pd.DataFrame:
+    return pd.concat(
+        [normalize_price_frame(synthetic_ohlcv(t, start, end), ticker=t) for t in tickers], ignore_index=True,
+    )
+
+
+def _ingest(path: str, profile: str, n_tickers: int, chunk_size: int, out) -> None:
+    writer, _ = make_engines(Path(path), profile=profile)
+    bulk = _frame([f"B{i:04d}" for i in range(n_tickers)], "2010-01-01", "2020-01-01")
+    out.put(("ready", len(bulk)))
+    t0 = time.perf_counter()
+    error = None
+    try:
+        with Session(writer) as db:
+            upsert_price_frame(db, bulk, chunk_size=chunk_size)
+    except OperationalError as e:
+        error = str(e.orig)
+    out.put(("done", time.perf_counter() - t0, error))
+
+
+def run_profile(profile: str, rows: int, readers: int, chunk_size: int, lookback: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        writer, reader = make_engines(Path(tmp) / "bench.db", profile=profile, read_pool_size=readers)
+        Base.metadata.create_all(writer)
+        with Session(writer) as db:
+            upsert_price_frame(db, _frame([READ_TICKER], "2010-01-01", "2020-01-01"))
+
+        # ~2600 pregões por ticker em 10 anos
+        n_tickers = max(1, rows // 2600)
+        ctx = mp.get_context("spawn")
+        events = ctx.Queue()
+        proc = ctx.Process(target=_ingest, args=(str(Path(tmp) / "bench.db"), profile, n_tickers, chunk_size, events))
+        proc.start()
+        _, ingest_rows = events.get()
+
+        latencies: list[float] = []
+        errors: list[str] = []
+        done = threading.Event()
+        lock = threading.Lock()
+
+        def read_loop():
+            local, errs = [], []
+            with Session(reader) as db:
+                series = PriceSeries(db, use_cache=False)
+                while not done.is_set():
+                    t0 = time.perf_counter()
+                    try:
+                        series.tail(READ_TICKER, lookback)
+                        local.append(time.perf_counter() - t0)
+                    except OperationalError as e:
+                        errs.append(str(e.orig))
+                        db.rollback()
+            with lock:
+                latencies.extend(local)
+                errors.extend(errs)
+
+        threads = [threading.Thread(target=read_loop) for _ in range(readers)]
+        for t in threads:
+            t.start()
+        _, ingest_s, ingest_error = events.get()
+        done.set()
+        for t in threads:
+            t.join()
+        proc.join()
+        writer.dispose()
+        reader.dispose()
+
+    lat_ms = np.array(latencies) * 1000
+    pct = (lambda q: round(float(np.percentile(lat_ms, q)), 3)) if len(lat_ms) else (lambda q: None)
+    return {
+        "profile": profile,
+        "ingest_rows": ingest_rows,
+        "ingest_s": round(ingest_s, 3),
+        "ingest_rows_per_s": round(ingest_rows / ingest_s),
+        "ingest_error": ingest_error,
+        "reads": len(latencies),
+        "read_errors": len(errors),
+        "read_p50_ms": pct(50),
+        "read_p95_ms": pct(95),
+        "read_p99_ms": pct(99),
+        "read_max_ms": pct(100),
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", nargs="+", default=["legacy", "wal"])
+    parser.add_argument("--rows", type=int, default=100_000, help="Linhas da ingestão concorrente")
+    parser.add_argument("--readers", type=int, default=4, help="Threads lendo séries")
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--lookback", type=int, default=60)
+    args = parser.parse_args(argv)
+    for profile in args.profiles:
+        print(json.dumps(run_profile(profile, args.rows, args.readers, args.chunk_size, args.lookback)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Microbenchmarks dos caminhos quentes sobre um universo sintético (--tickers x --years):
+
+  build_windows         SeriesPreprocessor.build_windows na série concatenada de todos os tickers
+  insert_many_prices    insert_many_prices de todas as linhas num banco vazio (WAL)
+  series_tail           PriceSeries.tail (--lookback pontos) de um ticker, direto no banco
+  series_range          PriceSeries.range (série inteira) de um ticker, direto no banco
+  series_tails          PriceSeries.tails de todos os tickers numa consulta
+  trainer_fit           Trainer.fit (--epochs épocas, sem early stopping) de um ticker
+  predict_next_<modo>   predict_next de --steps passos com o modelo treinado (window/stateful)
+
+Banco, artefatos e logs ficam num diretório temporário. O resultado vai para
+benchmarks/results/suite-<timestamp>.json (ou --out) e pode ser comparado com
+outra execução via benchmarks/compare.py.
+
+    uv run python benchmarks/suite.py --tickers 20 --years 5
+    uv run python benchmarks/suite.py --only build_windows series_tail --repeat 20
+"""
+from __future__ import annotations
+import argparse
+import json
+import shutil
+from pathlib import Path
+
+from harness import bench_tickers, isolate_environment, measure, save_results, synthetic_universe
+
+BENCHMARKS = ("build_windows", "insert_many_prices", "series_tail", "series_range", "series_tails",
+              "trainer_fit", "predict_next")
+
+
+def run(args, root: Path) -> dict:
+    # imports depois do isolamento: as configurações leem DATA_DIR/ARTIFACTS_DIR no import
+    import torch
+    from sqlalchemy.orm import Session
+    from ftc4.api.v1.schemas.stock_market_prices import StockPriceBase
+    from ftc4.data_pipeline.crud.stock_market_prices import PriceSeries, insert_many_prices, upsert_price_frame
+    from ftc4.data_pipeline.database.connection import Base, make_engines
+    from ftc4.ml_models.lstm_model.predict import predict_next
+    from ftc4.ml_models.lstm_model.preprocess import SeriesPreprocessor
+    from ftc4.ml_models.lstm_model.train import Trainer
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    selected = set(args.only or BENCHMARKS)
+    frame = synthetic_universe(args.tickers, args.years, seed=args.seed)
+    tickers = bench_tickers(args.tickers)
+    series = frame.loc[frame["ticker"] == tickers[0], "close"].to_numpy()
+    results: dict[str, dict] = {}
+
+    def record(name: str, stats: dict, **extra) -> None:
+        results[name] = {**stats, **extra}
+        print(json.dumps({"benchmark": name, **results[name]}))
+
+    if "build_windows" in selected:
+        pp = SeriesPreprocessor(lookback=args.lookback)
+        scaled = pp.fit_transform(frame["close"].to_numpy())
+        stats = measure(lambda: pp.build_windows(scaled), repeat=args.repeat)
+        record("build_windows", stats, points=len(scaled))
+
+    if "insert_many_prices" in selected:
+        payload = [StockPriceBase(**r) for r in frame.to_dict("records")]
+        counter = iter(range(10 ** 6))
+
+        def empty_db():
+            writer, _ = make_engines(root / f"insert_{next(counter)}.db")
+            Base.metadata.create_all(writer)
+            return Session(writer), writer
+
+        def insert(db, writer):
+            with db:
+                insert_many_prices(db, payload)
+            writer.dispose()
+
+        stats = measure(insert, repeat=max(1, args.repeat // 4), setup=empty_db)
+        record("insert_many_prices", stats, rows=len(payload), rows_per_s=round(len(payload) / stats["min_s"], 1))
+
+    if selected & {"series_tail", "series_range", "series_tails"}:
+        writer, reader = make_engines(root / "series.db")
+        Base.metadata.create_all(writer)
+        with Session(writer) as db:
+            upsert_price_frame(db, frame)
+        with Session(reader) as db:
+            prices = PriceSeries(db, use_cache=False)
+            queries = {
+                "series_tail": lambda: prices.tail(tickers[-1], args.lookback),
+                "series_range": lambda: prices.range(tickers[-1]),
+                "series_tails": lambda: prices.tails(tickers, args.lookback),
+            }
+            for name, query in queries.items():
+                if name in selected:
+                    rows = query()
+                    n_rows = sum(map(len, rows.values())) if isinstance(rows, dict) else len(rows)
+                    record(name, measure(query, repeat=args.repeat * 4), rows=n_rows)
+        writer.dispose()
+        reader.dispose()
+
+    if selected & {"trainer_fit", "predict_next"}:
+        ticker = "BENCHFIT"
+
+        def fit():
+            Trainer(lookback=args.lookback, epochs=args.epochs, ticker=ticker, patience=None).fit(series, device="cpu")
+
+        if "trainer_fit" in selected:
+            record("trainer_fit", measure(fit, repeat=max(1, args.repeat // 4)), points=len(series), epochs=args.epochs)
+        else:
+            fit()   # só o modelo para a predição
+        if "predict_next" in selected:
+            for mode in ("window", "stateful"):
+                stats = measure(lambda: predict_next(series, n_steps=args.steps, ticker=ticker, mode=mode),
+                                repeat=args.repeat * 4, warmup=3)
+                record(f"predict_next_{mode}", stats, steps=args.steps)
+    return results
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, default=10)
+    parser.add_argument("--years", type=float, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--lookback", type=int, default=60)
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--steps", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5, help="Rodadas medidas (consultas/predição usam 4x)")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, help="Só estes benchmarks")
+    parser.add_argument("--threads", type=int, default=None, help="torch.set_num_threads")
+    parser.add_argument("--out", type=Path, default=None, help="Arquivo JSON de saída")
+    args = parser.parse_args(argv)
+    root = isolate_environment()
+    try:
+        results = run(args, root)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    params = {k: v for k, v in vars(args).items() if k != "out"}
+    print(f"Resultados em {save_results('suite', params, results, args.out)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Throughput do treino do LSTM em séries sintéticas: caminho anterior (janelas montadas
+em loop Python + TensorDataset/DataLoader) x caminho atual (janelas por view + lotes
+por permutação de índices direto nos tensores).
+
+Mede, por tamanho de série:
+  - windowing_s: tempo para montar as janelas de treino (loop x view)
+  - epoch_s:     tempo de uma época limitada a --max-batches lotes (mesmo modelo/otimizador)
+
+    uv run python benchmarks/training_throughput.py --sizes 1000 10000 100000 1000000
+"""
+from __future__ import annotations
+import argparse
+import json
+import time
+
+import numpy as np
+import torch
+import torch.nn as nn
+from torch.utils.data import DataLoader, TensorDataset
+
+from ftc4.ml_models.lstm_model.model import LSTMForecaster
+from ftc4.ml_models.lstm_model.train import window_views
+
+
+def _series(n: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return (np.cumsum(rng.normal(0, 0.01, n)) + np.sin(np.linspace(0, n / 20, n))).astype(np.float32)
+
+
+# ---------------- caminho anterior ----------------
+def windows_loop(scaled: np.ndarray, lookback: int):
+    X, y = [], []
+    for i in range(lookback, len(scaled)):
+        X.append(scaled[i - lookback:i])
+        y.append(scaled[i])
+    X = np.array(X)
+    return X.reshape((X.shape[0], X.shape[1], 1)), np.array(y)
+
+
+def epoch_loader(X: np.ndarray, y: np.ndarray, batch_size: int, max_batches: int) -> float:
+    torch.manual_seed(0)
+    model = LSTMForecaster()
+    opt, loss_fn = torch.optim.Adam(model.parameters(), lr=1e-3), nn.MSELoss()
+    dl = DataLoader(TensorDataset(torch.tensor(X, dtype=torch.float32),
+                                  torch.tensor(y, dtype=torch.float32).unsqueeze(1)),
+                    batch_size=batch_size, shuffle=True)
+    t0 = time.perf_counter()
+    for i, (xb, yb) in enumerate(dl):
+        if i == max_batches:
+            break
+        opt.zero_grad()
+        loss = loss_fn(model(xb), yb)
+        loss.backward()
+        opt.step()
+        loss.item()
+    return time.perf_counter() - t0
+
+
+# ---------------- caminho atual ----------------
+def epoch_views(series: torch.Tensor, lookback: int, batch_size: int, max_batches: int) -> float:
+    torch.manual_seed(0)
+    model = LSTMForecaster()
+    opt, loss_fn = torch.optim.Adam(model.parameters(), lr=1e-3), nn.MSELoss()
+    t0 = time.perf_counter()
+    windows, targets = window_views(series, lookback)
+    perm = torch.randperm(len(targets))
+    total = torch.zeros(())
+    for i, start in enumerate(range(0, len(targets), batch_size)):
+        if i == max_batches:
+            break
+        idx = perm[start:start + batch_size]
+        opt.zero_grad()
+        loss = loss_fn(model(windows[idx].unsqueeze(-1)), targets[idx].unsqueeze(1))
+        loss.backward()
+        opt.step()
+        total += loss.detach()
+    total.item()
+    return time.perf_counter() - t0
+
+
+def run(n: int, lookback: int, batch_size: int, max_batches: int) -> dict:
+    series = _series(n)
+
+    t0 = time.perf_counter()
+    X, y = windows_loop(series, lookback)
+    loop_windowing = time.perf_counter() - t0
+    loop_epoch = epoch_loader(X, y, batch_size, max_batches)
+    loop_bytes = X.nbytes + y.nbytes
+    del X, y
+
+    t0 = time.perf_counter()
+    flat = torch.from_numpy(series)
+    windows, targets = window_views(flat, lookback)
+    view_windowing = time.perf_counter() - t0
+    view_epoch = epoch_views(flat, lookback, batch_size, max_batches)
+
+    batches = min(max_batches, -(-(n - lookback) // batch_size))
+    return {
+        "n": n,
+        "batches": batches,
+        "loop_windowing_s": round(loop_windowing, 4),
+        "view_windowing_s": round(view_windowing, 6),
+        "loop_window_bytes": loop_bytes,
+        "view_window_bytes": flat.nbytes,
+        "loader_epoch_s": round(loop_epoch, 4),
+        "views_epoch_s": round(view_epoch, 4),
+        "loader_batches_per_s": round(batches / loop_epoch, 1),
+        "views_batches_per_s": round(batches / view_epoch, 1),
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--lookback", type=int, default=60)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--max-batches", type=int, default=200, help="Lotes por época medida")
+    parser.add_argument("--threads", type=int, default=None, help="torch.set_num_threads")
+    args = parser.parse_args(argv)
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    for n in args.sizes:
+        print(json.dumps(run(n, args.lookback, args.batch_size, args.max_batches)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 from fastapi import FastAPI
 from ftc4.api.v1.routers.stock_market import stock_market_router 
+from ftc4.api.instrumentation import instrument_app
 from contextlib import asynccontextmanager
 from ftc4.data_pipeline.database.init_db import init_db
 
@@ -10,5 +11,6 @@ async def lifespan(app: FastAPI):
     yield
 
 app = FastAPI(title="Tech Challenge 4 - Admin API", version="1.0", lifespan=lifespan)
+instrument_app(app)
 
 app.include_router(stock_market_router, prefix='/stock', tags=["Stock Market"])
\ No newline at end of file
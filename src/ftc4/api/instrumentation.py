@@ -0,0 +1,79 @@
+from __future__ import annotations
+import asyncio
+import re
+import time
+
+from fastapi import FastAPI, Response
+
+from ftc4.common import metrics
+from ftc4.common.config import settings
+from ftc4.common.logger import get_logger
+from ftc4.common.profiler import SamplingProfiler, write_folded
+
+logger = get_logger(__name__)
+
+request_seconds = metrics.histogram(
+    "http_request_duration_seconds", "Latência das requisições HTTP (até o fim do corpo da resposta)",
+    ("method", "route", "status"),
+)
+slow_profiles = metrics.counter("http_slow_request_profiles_total", "Perfis gravados de requisições lentas", ("route",))
+
+profiler = SamplingProfiler(settings.PROFILE_INTERVAL_MS / 1000)
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI: latência por rota (o template, ex. /lstm/jobs/{job_id}, não o path bruto)
+    e, com PROFILE_SLOW_REQUEST_MS > 0, pilhas amostradas das requisições que passarem do limite.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        session = profiler.start() if settings.PROFILE_SLOW_REQUEST_MS > 0 else None
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - t0
+            route = getattr(scope.get("route"), "path", "unmatched")
+            request_seconds.observe(elapsed, method=scope["method"], route=route, status=status)
+            if session is not None:
+                samples = session.stop()
+                if elapsed * 1000 >= settings.PROFILE_SLOW_REQUEST_MS and samples:
+                    await _dump_profile(scope["method"], route, elapsed, samples)
+
+
+async def _dump_profile(method: str, route: str, elapsed: float, samples) -> None:
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root"
+    name = f"{time.strftime('%Y%m%dT%H%M%S')}_{method}_{slug}_{int(elapsed * 1000)}ms.folded"
+    try:
+        path = await asyncio.to_thread(write_folded, samples, settings.PROFILE_DIR / name)
+    except OSError as e:
+        logger.warning(f"Não foi possível gravar o perfil da requisição lenta {method} {route}: {e}")
+        return
+    slow_profiles.inc(route=route)
+    logger.warning("Requisição lenta %s %s (%.0f ms): perfil em %s", method, route, elapsed * 1000, path)
+
+
+def instrument_app(app: FastAPI) -> FastAPI:
+    """Middleware de métricas/profiler e rota /metrics (formato texto do Prometheus)."""
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/metrics", include_in_schema=False)
+    def metrics_endpoint():
+        return Response(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+    return app
@@ -1,9 +1,21 @@
-from fastapi import FastAPI
+import time
+
+_import_t0 = time.perf_counter()
+
+import asyncio
+from fastapi import FastAPI, Response
 from contextlib import asynccontextmanager
 
 from ftc4.data_pipeline.database.init_db import init_db
 from ftc4.api.v1.routers.stock_market import stock_market_router
 from ftc4.api.v1.routers.model_lstm import router as lstm_router
+from ftc4.api.startup import READY, startup
+from ftc4.api.instrumentation import instrument_app
+from ftc4.common.config import settings
+from ftc4.ml_models.lstm_model.jobs import training_jobs
+from ftc4.ml_models.lstm_model.batching import predict_batcher
+from ftc4.ml_models.lstm_model.executor import inference_executor
+from ftc4.data_pipeline.database.connection import async_read_engine
 from ftc4.common.logger import get_logger
 
 
@@ -11,10 +23,24 @@ logger = get_logger(__name__)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    t0 = time.perf_counter()
     init_db()
+    startup.mark("init_db_s", time.perf_counter() - t0)
+    # warm-up em segundo plano: a API já atende /health, e /ready fica 503 até terminar
+    warmup = asyncio.create_task(startup.warm_up()) if settings.WARMUP_ON_STARTUP else None
+    if warmup is None:
+        startup.set_ready()
     yield
+    if warmup is not None:
+        warmup.cancel()
+    training_jobs.shutdown()
+    await predict_batcher.shutdown()   # antes do executor que roda os lotes
+    inference_executor.shutdown()
+    await async_read_engine.dispose()
 
 app = FastAPI(title="Tech Challenge 4 - Public API", version="1.0", lifespan=lifespan)
+# Latência por rota + /metrics (Prometheus)
+instrument_app(app)
 
 # Checagem de estado de funcionamento da API
 @app.get("/health")
@@ -22,8 +48,17 @@ def health():
     logger.info({"status": "ok"})
     return {"status": "ok"}
 
+# Pronta para receber tráfego (load balancer): 503 até o fim do boot/warm-up
+@app.get("/ready")
+def ready(response: Response):
+    if startup.status != READY:
+        response.status_code = 503
+    return startup.report()
+
 # Reutiliza rotas de bolsa (inserção) para facilitar testes
 app.include_router(stock_market_router, prefix='/stock', tags=["Stock Market"])
 
 # Modelos LSTM
-app.include_router(lstm_router)
\ No newline at end of file
+app.include_router(lstm_router)
+
+startup.mark("app_import_s", time.perf_counter() - _import_t0)
@@ -0,0 +1,88 @@
+from __future__ import annotations
+import asyncio
+import time
+
+from ftc4.common.config import settings
+from ftc4.common.lazy import import_report, lazy_module, preload
+from ftc4.common.logger import get_logger
+from ftc4.ml_models.lstm_model.executor import inference_executor
+
+logger = get_logger(__name__)
+
+STARTING, WARMING, READY, FAILED = "starting", "warming", "ready", "failed"
+
+predict = lazy_module("ftc4.ml_models.lstm_model.predict")
+store = lazy_module("ftc4.ml_models.lstm_model.store")
+
+
+class StartupState:
+    """
+    Fases do boot da API e tempos de cada uma (import do app, init_db, warm-up).
+    /ready só responde 200 em READY: sem warm-up, logo após o init_db;
+    com warm-up, depois que os modelos quentes estão carregados e já rodaram um forward.
+    """
+
+    def __init__(self):
+        self.status = STARTING
+        self.created_at = time.perf_counter()
+        self.timings: dict[str, float] = {}
+        self.warmup: dict = {}
+        self.error: str | None = None
+
+    def mark(self, step: str, seconds: float) -> None:
+        self.timings[step] = round(seconds, 4)
+
+    def set_ready(self) -> None:
+        self.status = READY
+        self.mark("time_to_ready_s", time.perf_counter() - self.created_at)
+        logger.info({"startup": self.report()})
+
+    def report(self) -> dict:
+        return {
+            "status": self.status,
+            "timings": dict(self.timings),
+            "imports": import_report(),
+            "warmup": self.warmup,
+            "error": self.error,
+        }
+
+    async def warm_up(self) -> None:
+        """Importa as dependências pesadas e aquece os modelos no executor de inferência."""
+        self.status = WARMING
+        t0 = time.perf_counter()
+        try:
+            # import de torch/sklearn/pandas fora do event loop: /health segue respondendo
+            await asyncio.to_thread(preload)
+            keys = await asyncio.to_thread(hot_model_keys)
+            models, errors = {}, {}
+            for key in keys:
+                try:
+                    # no executor: inicializa as threads de inferência (e o torch delas) antes do tráfego
+                    models[key.ticker] = round(await inference_executor.run(predict.warm_model, key), 4)
+                except Exception as e:
+                    errors[key.ticker] = f"{type(e).__name__}: {e}"
+            self.warmup = {"models_s": models, "errors": errors}
+        except Exception as e:
+            self.status, self.error = FAILED, f"{type(e).__name__}: {e}"
+            logger.error(f"Warm-up falhou: {self.error}")
+            return
+        finally:
+            self.mark("warmup_s", time.perf_counter() - t0)
+        self.set_ready()
+
+
+def hot_model_keys() -> list:
+    """Versões ativas a pré-carregar: WARMUP_TICKERS ou as ativadas mais recentemente."""
+    limit = settings.WARMUP_MAX_MODELS
+    if not settings.WARMUP_TICKERS:
+        return store.artifact_store.active_keys(limit)
+    keys = []
+    for ticker in settings.WARMUP_TICKERS[:limit]:
+        try:
+            keys.append(predict.resolve_model_key(ticker))
+        except FileNotFoundError:
+            logger.warning(f"Warm-up: nenhum modelo treinado para {ticker}")
+    return keys
+
+
+startup = StartupState()
@@ -1,60 +1,267 @@
-from fastapi import APIRouter, HTTPException, Query, Depends
-from sqlalchemy.orm import Session
-from sqlalchemy import select
-import numpy as np
-
-from ftc4.data_pipeline.database.connection import get_db
-from ftc4.data_pipeline.orm_models.stock_market import StockPrice
-from ftc4.ml_models.lstm_model.train import Trainer
-from ftc4.ml_models.lstm_model.predict import predict_next
+import asyncio
+import json
+
+from fastapi import APIRouter, HTTPException, Query, Depends, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ftc4.data_pipeline.database.connection import get_async_read_db
+from ftc4.data_pipeline.crud.stock_market_prices import PriceSeries, get_data_versions
+from ftc4.api.v1.schemas.model_lstm import PredictBatchRequest, PredictBatchResponse, TrainBatchRequest
+from ftc4.common.config import settings
+from ftc4.ml_models.lstm_model.batching import predict_batcher
+from ftc4.ml_models.lstm_model.executor import InferenceBusy, inference_executor
+from ftc4.ml_models.lstm_model.forecast_cache import HIT, MISS, ForecastKey, forecast_cache
+from ftc4.ml_models.lstm_model.jobs import JobQueueFull, collect_series, sweep_changes, training_jobs
+from ftc4.ml_models.lstm_model.registry import model_registry
+from ftc4.common.lazy import lazy_module
 from ftc4.common.logger import get_logger
 
 logger = get_logger(__name__)
 
+# torch/scikit-learn entram no primeiro uso (ou no warm-up), não no import do app
+lstm_predict = lazy_module("ftc4.ml_models.lstm_model.predict")
+lstm_store = lazy_module("ftc4.ml_models.lstm_model.store")
+
 router = APIRouter(prefix="/lstm", tags=["LSTM"])
 
-@router.post("/train")
-def train_model(
+@router.post("/train", status_code=202)
+async def train_model(
     ticker: str = Query(..., description="Ticker, ex: NVDA"),
     lookback: int = Query(60, ge=5, le=200),
-    db: Session = Depends(get_db),
+    epochs: int | None = Query(None, ge=1, le=500, description="Épocas (padrão: 20 no treino completo, FINETUNE_EPOCHS no incremental)"),
+    incremental: bool = Query(False, description="Fine-tuning a partir do modelo ativo (só os dados novos + amostra do histórico)"),
+    early_stopping: bool = Query(False, description="Separa o fim da série para validação e para o treino sem melhora (EARLY_STOPPING_*)"),
+    db: AsyncSession = Depends(get_async_read_db),
 ):
     # carrega série do banco
-    q = (
-        select(StockPrice.close)
-        .where(StockPrice.ticker == ticker.upper())
-        .order_by(StockPrice.date.asc())
-    )
-    values = [float(x[0]) for x in db.execute(q).all()]
-    if len(values) < lookback + 5:
-        error_message = f"Série insuficiente para treino. Tamanho atual: {len(values)}, Requerido: {lookback + 5}."
+    series = await db.run_sync(lambda s: PriceSeries(s).range(ticker))
+    if len(series) < lookback + 5:
+        error_message = f"Série insuficiente para treino. Tamanho atual: {len(series)}, Requerido: {lookback + 5}."
         logger.error(error_message)
         raise HTTPException(status_code=400, detail="Série de dados insuficiente para o treinamento. Verifique o tamanho da sua entrada.")
 
-    series = np.array(values, dtype=float)
-    Trainer(lookback=lookback).fit(series)         # salva artefatos em /artifacts
-    return_msg = {"message": "Modelo treinado com sucesso", "ticker": ticker.upper(), "n_obs": len(series)}
+    # treino roda no process pool; a resposta volta na hora com o id do job
+    try:
+        # a primeira submissão sobe o process pool (spawn): fora do event loop
+        job, deduplicated = await asyncio.to_thread(
+            training_jobs.submit, ticker.upper(), lookback, series, epochs=epochs, incremental=incremental,
+            early_stopping=early_stopping,
+        )
+    except JobQueueFull as e:
+        logger.error(str(e))
+        raise HTTPException(status_code=429, detail="Fila de treino cheia. Tente novamente mais tarde.")
+    return_msg = {
+        "message": "Treino já em andamento" if deduplicated else "Treino enfileirado",
+        "job_id": job.id,
+        "status": job.status,
+        "deduplicated": deduplicated,
+        "ticker": job.ticker,
+        "n_obs": job.n_obs,
+    }
     logger.info(return_msg)
     return return_msg
 
 
+@router.get("/jobs/{job_id}")
+async def get_training_job(job_id: str):
+    """Status, loss e tempo por época de um job de treino."""
+    job = training_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return job.to_dict()
+
+
+@router.delete("/jobs/{job_id}")
+async def cancel_training_job(job_id: str):
+    job = training_jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    logger.info(f"Cancelamento solicitado para o job de treino {job_id}")
+    return job.to_dict()
+
+
+@router.post("/train_batch", status_code=202)
+async def train_batch(payload: TrainBatchRequest, db: AsyncSession = Depends(get_async_read_db)):
+    """
+    Varredura de treino: um job por ticker no process pool de treino (threads do torch
+    por processo fixas em TRAINING_TORCH_THREADS), cada modelo no seu slot de artefato.
+    Acompanhe por /lstm/sweeps/{sweep_id} ou /lstm/sweeps/{sweep_id}/stream.
+    """
+    series, errors = await db.run_sync(lambda s: collect_series(s, payload.tickers, payload.lookback))
+    if not series:
+        logger.error(f"Nenhum ticker com série suficiente para treino: {errors}")
+        raise HTTPException(status_code=400, detail={"message": "Nenhum ticker com série suficiente para treino", "errors": errors})
+    try:
+        sweep = await asyncio.to_thread(training_jobs.submit_sweep, series, payload.lookback, payload.epochs,
+                                         errors, payload.incremental, payload.early_stopping)
+    except JobQueueFull as e:
+        logger.error(str(e))
+        raise HTTPException(status_code=429, detail="Fila de treino cheia para esta varredura. Envie menos tickers ou tente mais tarde.")
+    return_msg = {
+        "message": "Varredura de treino enfileirada",
+        "sweep_id": sweep.id,
+        "jobs": sweep.job_ids,
+        "errors": sweep.errors,
+    }
+    logger.info(return_msg)
+    return return_msg
+
+
+@router.get("/sweeps/{sweep_id}")
+async def get_training_sweep(sweep_id: str):
+    """Tempo de parede total e tempo, épocas e loss por ticker."""
+    status = training_jobs.sweep_status(sweep_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Varredura não encontrada")
+    return status
+
+
+@router.get("/sweeps/{sweep_id}/stream")
+async def stream_training_sweep(sweep_id: str, interval_s: float = Query(1.0, ge=0.1, le=30)):
+    """NDJSON: uma linha por mudança de status/época de cada ticker e, no fim, o resumo da varredura."""
+    if training_jobs.sweep_status(sweep_id) is None:
+        raise HTTPException(status_code=404, detail="Varredura não encontrada")
+
+    async def events():
+        seen: dict = {}
+        while True:
+            status = training_jobs.sweep_status(sweep_id)
+            if status is None:
+                return
+            for change in sweep_changes(seen, status):
+                yield json.dumps(change) + "\n"
+            if status["status"] == "finished":
+                yield json.dumps({k: v for k, v in status.items() if k != "jobs"}) + "\n"
+                return
+            await asyncio.sleep(interval_s)
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+def _busy(e: InferenceBusy) -> HTTPException:
+    logger.error(str(e))
+    return HTTPException(status_code=503, detail="Servidor de inferência ocupado. Tente novamente mais tarde.")
+
+
+FORECAST_CACHE_HEADER = "X-Forecast-Cache"
+
+
 @router.get("/predict")
-def predict(
+async def predict(
+    response: Response,
     steps: int = Query(5, ge=1, le=30),
     ticker: str = Query(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
 ):
-    q = (
-        select(StockPrice.close)
-        .where(StockPrice.ticker == ticker.upper())
-        .order_by(StockPrice.date.asc())
-    )
-    values = [float(x[0]) for x in db.execute(q).all()]
-    if not values:
+    try:
+        key = lstm_predict.resolve_model_key(ticker.upper())
+    except FileNotFoundError:
+        logger.error(f"Nenhum modelo treinado disponível para {ticker.upper()}")
+        raise HTTPException(status_code=404, detail="Nenhum modelo treinado para este ticker")
+
+    # mesmos dados (última data + updated_at do watermark) e mesma versão de modelo => mesma previsão
+    last_date, updated_at = (await db.run_sync(lambda s: get_data_versions(s, [ticker]))).get(ticker.upper(), (None, None))
+    cache_key = ForecastKey(ticker.upper(), last_date, updated_at, key, steps)
+    cached = forecast_cache.get(cache_key)
+    if cached is not None:
+        response.headers[FORECAST_CACHE_HEADER] = HIT
+        return {"ticker": ticker.upper(), "steps": steps, "predictions": cached.tolist()}
+
+    # só a cauda necessária para a janela do modelo
+    values = await db.run_sync(lambda s: PriceSeries(s).tail(ticker, key.lookback))
+    if not len(values):
         error_message = "Sem dados no banco para este ticker"
         logger.error(error_message)
         raise HTTPException(status_code=404, detail="Sem dados no banco para este ticker")
+    if len(values) < key.lookback:
+        logger.error(f"Série de {ticker.upper()} menor que o lookback do modelo ({len(values)} < {key.lookback})")
+        raise HTTPException(status_code=400, detail="Série de dados insuficiente para a janela do modelo")
 
-    preds = predict_next(np.array(values, dtype=float), n_steps=steps)
-    logger.info(f"Os proximos {steps} valores de fechamento foram previstos. {str(preds.tolist()[0:3]).replace(']', ', ...]')}")
+    # forward do LSTM no executor dedicado (não compete com o threadpool das rotas leves);
+    # com micro-batching, pedidos simultâneos do mesmo modelo dividem o mesmo forward
+    try:
+        if settings.PREDICT_BATCHING:
+            preds = await predict_batcher.predict(key, values, steps)
+        else:
+            preds = await inference_executor.run(lstm_predict.predict_next, values, n_steps=steps, ticker=ticker.upper(), lookback=key.lookback)
+    except InferenceBusy as e:
+        raise _busy(e)
+    forecast_cache.put(cache_key, preds)
+    response.headers[FORECAST_CACHE_HEADER] = MISS
+    # argumentos formatados só na thread de escrita do log (ver common/logger)
+    logger.info("Os proximos %d valores de fechamento foram previstos. %s ...", steps, preds[:3])
     return {"ticker": ticker.upper(), "steps": steps, "predictions": preds.tolist()}
+
+
+@router.post("/predict_batch", response_model=PredictBatchResponse)
+async def predict_batch(payload: PredictBatchRequest, response: Response,
+                        db: AsyncSession = Depends(get_async_read_db)):
+    """
+    Previsão para vários tickers: uma consulta ao banco e um forward por passo para cada modelo.
+    X-Forecast-Cache: HIT (todos do cache), MISS (nenhum) ou PARTIAL.
+    """
+    errors: dict[str, str] = {}
+    keys: dict[str, ForecastKey] = {}
+    versions = await db.run_sync(lambda s: get_data_versions(s, payload.tickers))
+    for ticker in payload.tickers:
+        try:
+            keys[ticker] = ForecastKey(ticker, *versions.get(ticker, (None, None)),
+                                       lstm_predict.resolve_model_key(ticker), payload.steps)
+        except FileNotFoundError:
+            errors[ticker] = "Nenhum modelo treinado para este ticker"
+
+    cached = {t: p for t, k in keys.items() if (p := forecast_cache.get(k)) is not None}
+    lookbacks = {t: k.model.lookback for t, k in keys.items() if t not in cached}
+
+    # uma consulta só com a cauda de todos os tickers
+    series = (
+        await db.run_sync(lambda s: PriceSeries(s).tails(list(lookbacks), max(lookbacks.values())))
+        if lookbacks else {}
+    )
+    for ticker in lookbacks:
+        if ticker not in series:
+            errors[ticker] = "Sem dados no banco para este ticker"
+
+    preds: dict = {}
+    if series:
+        try:
+            preds, model_errors = await inference_executor.run(lstm_predict.predict_next_batch, series, n_steps=payload.steps)
+        except InferenceBusy as e:
+            raise _busy(e)
+        errors.update(model_errors)
+        for ticker, p in preds.items():
+            forecast_cache.put(keys[ticker], p)
+
+    response.headers[FORECAST_CACHE_HEADER] = HIT if not preds and cached else MISS if not cached else "PARTIAL"
+    logger.info("Previsão em lote: %d tickers ok (%d do cache), %d com erro.", len(preds) + len(cached), len(cached), len(errors))
+    return PredictBatchResponse(
+        steps=payload.steps,
+        predictions={t: p.tolist() for t, p in {**cached, **preds}.items()},
+        errors=errors,
+    )
+
+
+@router.get("/export_report")
+async def export_report(ticker: str = Query(...), lookback: int | None = Query(None, ge=5, le=200)):
+    """Acurácia e latência das variantes TorchScript/int8 do modelo ativo contra o eager."""
+    try:
+        key = lstm_predict.resolve_model_key(ticker.upper(), lookback)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Nenhum modelo treinado para este ticker")
+    report = lstm_store.artifact_store.export_report(key)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Modelo sem variantes exportadas")
+    return {"ticker": key.ticker, "lookback": key.lookback, "version": key.version,
+            "serving_variant": settings.LSTM_SERVING_VARIANT, **report}
+
+
+@router.get("/registry")
+async def registry_stats():
+    """Contadores do cache de modelos em memória (hits, misses, tempo de carga), do executor, do micro-batching e do cache de previsões."""
+    return {
+        **model_registry.stats(),
+        "inference": inference_executor.stats(),
+        "batching": predict_batcher.stats(),
+        "forecast_cache": forecast_cache.stats(),
+    }
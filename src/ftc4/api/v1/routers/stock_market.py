@@ -1,12 +1,13 @@
-import pandas as pd
-import logging
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from ftc4.data_pipeline.database.connection import get_db
-from ftc4.api.v1.schemas.stock_market_prices import StockMarketPriceBatch, StockPriceBase
-from ftc4.data_pipeline.sources.yfinance_source import fetch_stock_market_prices
+from datetime import date
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.orm import Session, sessionmaker
+from ftc4.data_pipeline.database.connection import get_db, get_session_factory
+from ftc4.api.v1.schemas.stock_market_prices import StockMarketPriceBatch, WatchlistSyncRequest
 from ftc4.data_pipeline.crud.stock_market_prices import insert_many_prices
-from datetime import datetime
+from ftc4.data_pipeline.ingest import NO_NEW_DATA, UP_TO_DATE, IngestError, SyncMode, ingest_ticker
+from ftc4.data_pipeline.sources.factory import get_price_fetcher
+from ftc4.data_pipeline.streaming import StreamFormat, StreamIngestError, ingest_stream_async
+from ftc4.data_pipeline.watchlist import sync_watchlist
 
 # Importa a função do logger
 from ftc4.common.logger import get_logger
@@ -23,108 +24,38 @@ stock_market_router = APIRouter()
 @stock_market_router.post("/fetch_insert")
 def fetch_and_insert(
     ticker: str = Query(..., description="Ticker, ex: NVDA"),
-    start_date: str = Query(..., description="YYYY-MM-DD"),
-    end_date: str | None = Query(None, description="YYYY-MM-DD"),
+    start_date: date = Query(..., description="YYYY-MM-DD"),
+    end_date: date | None = Query(None, description="YYYY-MM-DD"),
+    mode: SyncMode = Query("full", description="full: baixa o período inteiro; delta: só o que falta no banco"),
     db: Session = Depends(get_db),
 ):
     try:
-        logger.info(f"Iniciando coleta para {ticker} de {start_date} até {end_date or 'hoje'}.")
-        
-        # ... (Seu código de busca, normalização e validação aqui) ...
-        # (Seus passos 1 a 6 são mantidos intactos)
-        
-        # 1) Busca no yfinance
-        df = fetch_stock_market_prices(ticker, start_date, end_date)
+        logger.info(f"Iniciando coleta ({mode}) para {ticker} de {start_date} até {end_date or 'hoje'}.")
 
-        # 2) Normaliza colunas esperadas
-        #    (se vier indexado por data, traz pro corpo)
-        if "Date" not in df.columns and df.index.name == "Date":
-            df = df.reset_index()
+        # Busca -> normalização -> validação vetorizada -> upsert em lote
+        result = ingest_ticker(db, ticker, start_date, end_date, fetch=get_price_fetcher(), mode=mode)
 
-        rename_map = {
-            "Date": "date", "Close": "close", "High": "high",
-            "Low": "low", "Open": "open", "Volume": "volume"
-        }
-        # algumas versões trazem em minúsculas, reforça mapeamento
-        lower_map = {c.lower(): c for c in df.columns}
-        df.columns = [lower_map.get(c.lower(), c) for c in df.columns]
-        df = df.rename(columns=rename_map)
+        if result.status == UP_TO_DATE:
+            logger.info(f"{result.ticker} já está atualizado; download ignorado.")
+            return {"message": "Ticker já atualizado", **result.as_dict()}
+        if result.status == NO_NEW_DATA:
+            logger.info(f"{result.ticker}: a fonte não tem dados novos no período pedido (ex.: só feriados).")
+            return {"message": "Nenhum dado novo na fonte", **result.as_dict()}
+        if result.rejected:
+            logger.warning(f"Coleta para {ticker}: {result.rejected.get('total', 0)} registros rejeitados {result.rejected}")
 
-        # 3) Checagens mínimas
-        required = ["date", "close", "high", "low", "open"]
-        if any(col not in df.columns for col in required):
-            missing = [c for c in required if c not in df.columns]
-            # Opcional: Logar erro específico antes de levantar HTTPException
-            logger.error(f"Erro de dados para {ticker}: Colunas ausentes do yfinance: {missing}")
-            raise HTTPException(status_code=500, detail=f"Colunas ausentes do yfinance: {missing}")
-
-        if df.empty:
-            logger.warning(f"Coleta para {ticker} não retornou dados no período.")
-            raise HTTPException(status_code=404, detail="Sem dados retornados para o período informado.")
-
-        # 4) Limpeza de NaN e tipos
-        df["date"] = pd.to_datetime(df["date"], errors="coerce")
-        df = df.dropna(subset=["date", "close", "high", "low", "open"]).copy()
-        if df.empty:
-            logger.error(f"Coleta para {ticker}: Todos os registros foram removidos por NaN em OHLC.")
-            raise HTTPException(status_code=400, detail="Todos os registros vieram com NaN em OHLC.")
-
-        for c in ["close", "high", "low", "open"]:
-            df[c] = pd.to_numeric(df[c], errors="coerce")
-
-        # volume pode ser float/NaN: normaliza pra int
-        if "volume" not in df.columns:
-            df["volume"] = 0
-        df["volume"] = pd.to_numeric(df["volume"], errors="coerce").fillna(0).astype(int)
-
-        # 5) Adiciona ticker em upper e ordena
-        df["ticker"] = ticker.upper()
-        df = df.sort_values("date")
-
-        # 6) Constrói payload p/ Pydantic
-        data = []
-        for _, r in df.iterrows():
-            # Tenta converter, se der erro, loga e pula o registro (erros silenciosos aqui!)
-            try:
-                data.append(
-                    StockPriceBase(
-                        date=r["date"].to_pydatetime(),
-                        ticker=r["ticker"],
-                        close=float(r["close"]),
-                        high=float(r["high"]),
-                        low=float(r["low"]),
-                        open=float(r["open"]),
-                        volume=int(r["volume"]),
-                    )
-                )
-            except Exception as item_e:
-                # Loga o registro problemático e o erro, mas não interrompe o loop
-                logger.error(f"Erro ao converter registro para Pydantic (Ticker: {r.get('ticker')}, Data: {r.get('date')}): {item_e}")
-        
-        if not data:
-            logger.error(f"Coleta para {ticker}: Nenhum registro válido após limpeza/validação/conversão.")
-            raise HTTPException(status_code=400, detail="Nenhum registro válido após limpeza/validação.")
-
-        # 7) Persiste
-        insert_many_prices(db, data)
-        
         logger.info(
-            f"Coleta e inserção de {len(data)} registros para {ticker.upper()} concluída com sucesso. "
-            f"Período: {df['date'].min().strftime('%Y-%m-%d')} a {df['date'].max().strftime('%Y-%m-%d')}."
+            f"Coleta e inserção de {result.records} registros para {result.ticker} concluída com sucesso "
+            f"(inseridos={result.upsert.inserted}, atualizados={result.upsert.updated}, ignorados={result.upsert.skipped}). "
+            f"Período: {result.first_date} a {result.last_date}."
         )
-        return {
-            "message": "Coletado e inserido com sucesso",
-            "ticker": ticker.upper(),
-            "records": len(data),
-            "first_date": df["date"].min().strftime("%Y-%m-%d"),
-            "last_date": df["date"].max().strftime("%Y-%m-%d"),
-        }
-    except HTTPException:
-        # Repassa exceções HTTPException já lançadas (e possivelmente logadas no passo 3/4)
-        raise
+        return {"message": "Coletado e inserido com sucesso", **result.as_dict()}
+    except IngestError as e:
+        logger.error(f"Coleta para {ticker}: {e}")
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
-        # 2. Loga o erro GERAL com stack trace completa (catch-all)
-        # Isso capturará erros em 'fetch_stock_market_prices' ou 'insert_many_prices'
+        # Loga o erro GERAL com stack trace completa (catch-all)
+        # Isso capturará erros na fonte de dados ou no upsert
         logger.exception(f"Erro inesperado no fetch_insert para ticker={ticker}")
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -134,12 +65,52 @@ def fetch_and_insert(
 @stock_market_router.post("/insert_batch")
 def insert_batch(payload: StockMarketPriceBatch, db: Session = Depends(get_db)):
     try:
-        insert_many_prices(db, payload.data)
+        result = insert_many_prices(db, payload.data)
         # Opcional: Logar sucesso com nível INFO, útil para auditoria
         logger.info(f"Lote de {len(payload.data)} registros inserido com sucesso via /insert_batch.")
-        return {"message": "Lote inserido com sucesso", "records": len(payload.data)}
+        return {"message": "Lote inserido com sucesso", "records": len(payload.data), **result.as_dict()}
     except Exception as e:
         # 2. Loga o erro com stack trace completa
         # O 'exc_info=True' ou usar logger.exception() faz isso automaticamente.
         logger.exception("Erro ao inserir lote via /insert_batch.")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+# -----------------------------------------------
+# Rota 2b: insert_stream (NDJSON/CSV incremental)
+# -----------------------------------------------
+@stock_market_router.post("/insert_stream")
+async def insert_stream(
+    request: Request,
+    format: StreamFormat | None = Query(None, description="ndjson ou csv (padrão: pelo Content-Type)"),
+    chunk_size: int | None = Query(None, ge=1, le=100_000, description="Registros por chunk/commit"),
+    session_factory: sessionmaker = Depends(get_session_factory),
+):
+    # Lê o corpo em pedaços: memória limitada a um chunk (e a uma linha de até INGEST_MAX_LINE_BYTES),
+    # qualquer que seja o tamanho do upload; cada chunk grava numa sessão própria, na thread de trabalho
+    fmt = format or ("csv" if "csv" in request.headers.get("content-type", "") else "ndjson")
+    try:
+        report = await ingest_stream_async(session_factory, request.stream(), fmt=fmt, chunk_size=chunk_size)
+    except StreamIngestError as e:
+        logger.exception("Erro ao inserir stream via /insert_stream.")
+        raise HTTPException(status_code=e.status_code, detail={"error": str(e), **e.report.as_dict()})
+    summary = report.as_dict()
+    logger.info(
+        f"Stream {fmt} via /insert_stream: {summary['received']} recebidos, {summary['accepted']} aceitos, "
+        f"{summary['rejected']} rejeitados em {len(report.chunks)} chunk(s)."
+    )
+    return {"message": "Stream processado", **summary}
+
+# -----------------------------------------------
+# Rota 3: sync_watchlist
+# -----------------------------------------------
+@stock_market_router.post("/sync_watchlist")
+def sync_watchlist_route(payload: WatchlistSyncRequest, db: Session = Depends(get_db)):
+    try:
+        report = sync_watchlist(
+            db, payload.tickers, payload.start_date, payload.end_date,
+            fetch=get_price_fetcher(), mode=payload.mode, max_concurrency=payload.max_concurrency,
+        )
+        return {"message": "Watchlist sincronizada", **report.as_dict()}
+    except Exception as e:
+        logger.exception("Erro ao sincronizar watchlist.")
+        raise HTTPException(status_code=500, detail=str(e))
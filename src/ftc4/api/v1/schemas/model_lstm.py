@@ -0,0 +1,42 @@
+from __future__ import annotations
+from pydantic import BaseModel, Field, field_validator
+from typing import Dict, List, Optional
+
+
+def _normalize_tickers(v: List[str]) -> List[str]:
+    # normaliza e remove duplicados mantendo a ordem
+    tickers = list(dict.fromkeys(t.strip().upper() for t in v if t.strip()))
+    if not tickers:
+        raise ValueError("Informe ao menos um ticker")
+    return tickers
+
+
+class PredictBatchRequest(BaseModel):
+    """Entrada de /lstm/predict_batch"""
+    tickers: List[str] = Field(..., min_length=1, max_length=500, description="Tickers, ex: ['NVDA', 'AAPL']")
+    steps: int = Field(5, ge=1, le=30, description="Passos à frente")
+
+    @field_validator("tickers")
+    @classmethod
+    def tickers_upper(cls, v: List[str]) -> List[str]:
+        return _normalize_tickers(v)
+
+
+class TrainBatchRequest(BaseModel):
+    """Entrada de /lstm/train_batch (um modelo por ticker, treinados em paralelo)"""
+    tickers: List[str] = Field(..., min_length=1, max_length=500, description="Tickers, ex: ['NVDA', 'AAPL']")
+    lookback: int = Field(60, ge=5, le=200)
+    epochs: Optional[int] = Field(None, ge=1, le=500, description="Épocas (padrão: 20 no treino completo, FINETUNE_EPOCHS no incremental)")
+    incremental: bool = Field(False, description="Fine-tuning a partir dos modelos ativos")
+    early_stopping: bool = Field(False, description="Separa o fim da série para validação e para sem melhora")
+
+    @field_validator("tickers")
+    @classmethod
+    def tickers_upper(cls, v: List[str]) -> List[str]:
+        return _normalize_tickers(v)
+
+
+class PredictBatchResponse(BaseModel):
+    steps: int
+    predictions: Dict[str, List[float]] = Field(default_factory=dict, description="Previsões por ticker")
+    errors: Dict[str, str] = Field(default_factory=dict, description="Erro por ticker")
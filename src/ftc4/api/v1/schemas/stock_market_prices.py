@@ -1,7 +1,7 @@
 from __future__ import annotations
 from pydantic import BaseModel, Field, field_validator, model_validator
-from datetime import datetime
-from typing import List
+from datetime import date, datetime
+from typing import List, Literal
 
 class StockPriceBase(BaseModel):
     """Schema base para StockPrice"""
@@ -34,3 +34,12 @@ class StockPriceBase(BaseModel):
 
 class StockMarketPriceBatch(BaseModel):
     data: List[StockPriceBase]
+
+
+class WatchlistSyncRequest(BaseModel):
+    """Entrada de /stock/sync_watchlist"""
+    tickers: List[str] = Field(..., min_length=1, max_length=5000, description="Tickers da watchlist")
+    start_date: date = Field(..., description="Início do período (YYYY-MM-DD)")
+    end_date: date | None = Field(None, description="Fim do período, exclusivo (padrão: hoje)")
+    mode: Literal["full", "delta"] = Field("delta", description="delta: baixa só o que falta no banco")
+    max_concurrency: int | None = Field(None, ge=1, le=64, description="Downloads simultâneos")
@@ -6,6 +6,9 @@ from dataclasses import dataclass
 # Load .env variables to Environ
 load_dotenv(override=True)
 
+# Variantes servíveis do LSTM: "eager" usa os pesos; as demais são exportadas após o treino
+LSTM_VARIANTS = ("eager", "torchscript", "int8")
+
 
 @dataclass(frozen=True)
 class Settings:
@@ -21,8 +24,120 @@ class Settings:
     ARTIFACTS_DIR: Path = Path(os.getenv("ARTIFACTS_DIR", DATABASE_DIR / "artifacts")).resolve()
     ML_MODELS_DIR: Path = Path(ARTIFACTS_DIR / "ml_models").resolve()
 
+    # SQLite: perfil de conexão ("wal" ou "legacy") e pragmas
+    SQLITE_PROFILE: str = os.getenv("SQLITE_PROFILE", "wal")
+    SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000))
+    SQLITE_CACHE_SIZE_KB: int = int(os.getenv("SQLITE_CACHE_SIZE_KB", 65536))
+    SQLITE_MMAP_MB: int = int(os.getenv("SQLITE_MMAP_MB", 256))
+    SQLITE_READ_POOL_SIZE: int = int(os.getenv("SQLITE_READ_POOL_SIZE", 4))
+    # Tempo máximo esperando a vez do escritor único
+    SQLITE_WRITER_TIMEOUT_S: float = float(os.getenv("SQLITE_WRITER_TIMEOUT_S", 30))
+
     # Logs
     LOG_DIR: Path = Path(os.getenv("LOG_DIR", BASE_DIR / "logs")).resolve()
+    # Logging: rotação ("size" por LOG_MAX_MB ou "time" por LOG_ROTATE_WHEN), cópias mantidas,
+    # amostragem de INFO (global e por prefixo de logger: "ftc4.api.v1.routers.model_lstm=0.1,...")
+    LOG_ROTATION: str = os.getenv("LOG_ROTATION", "size")
+    LOG_MAX_MB: float = float(os.getenv("LOG_MAX_MB", 10))
+    LOG_ROTATE_WHEN: str = os.getenv("LOG_ROTATE_WHEN", "midnight")
+    LOG_BACKUP_COUNT: int = int(os.getenv("LOG_BACKUP_COUNT", 5))
+    LOG_INFO_SAMPLE_RATE: float = float(os.getenv("LOG_INFO_SAMPLE_RATE", 1.0))
+    LOG_SAMPLE_RATES: str = os.getenv("LOG_SAMPLE_RATES", "")
+    LOG_RICH_LOCALS: bool = os.getenv("LOG_RICH_LOCALS", "0").lower() in ("1", "true", "yes")
+    # Profiler de amostragem das requisições lentas (opt-in): grava pilhas "folded" das
+    # requisições acima de PROFILE_SLOW_REQUEST_MS (0 = desligado) em PROFILE_DIR
+    PROFILE_SLOW_REQUEST_MS: float = float(os.getenv("PROFILE_SLOW_REQUEST_MS", 0))
+    PROFILE_INTERVAL_MS: float = float(os.getenv("PROFILE_INTERVAL_MS", 5))
+    PROFILE_DIR: Path = Path(os.getenv("PROFILE_DIR", LOG_DIR / "profiles")).resolve()
+
+    # Ingestão: linhas por executemany/commit no upsert em lote
+    INGEST_CHUNK_SIZE: int = int(os.getenv("INGEST_CHUNK_SIZE", 5000))
+    # /insert_stream: tamanho máximo de uma linha (o pedaço sem quebra de linha fica em buffer)
+    INGEST_MAX_LINE_BYTES: int = int(os.getenv("INGEST_MAX_LINE_BYTES", 64 * 1024))
+
+    # Fonte de preços ("yfinance", "local" ou "fake" para rodar offline) e ingestão de watchlist
+    PRICE_SOURCE: str = os.getenv("PRICE_SOURCE", "yfinance")
+    PRICE_LOCAL_DIR: Path = Path(os.getenv("PRICE_LOCAL_DIR", DATABASE_DIR / "prices")).resolve()
+    # Cache Parquet dos downloads brutos (por ticker/ano)
+    PRICE_CACHE_ENABLED: bool = os.getenv("PRICE_CACHE_ENABLED", "1").lower() in ("1", "true", "yes")
+    PRICE_CACHE_DIR: Path = Path(os.getenv("PRICE_CACHE_DIR", DATABASE_DIR / "cache" / "prices")).resolve()
+    WATCHLIST_MAX_CONCURRENCY: int = int(os.getenv("WATCHLIST_MAX_CONCURRENCY", 8))
+    WATCHLIST_RETRIES: int = int(os.getenv("WATCHLIST_RETRIES", 3))
+    WATCHLIST_BACKOFF_S: float = float(os.getenv("WATCHLIST_BACKOFF_S", 0.5))
+
+    # Cache colunar de séries por ticker (leituras de treino/predição sem consultar o banco)
+    SERIES_CACHE_MAX_MB: float = float(os.getenv("SERIES_CACHE_MAX_MB", 64))
+    # Intervalo mínimo entre conferências de escrita externa (updated_at do watermark)
+    SERIES_CACHE_CHECK_S: float = float(os.getenv("SERIES_CACHE_CHECK_S", 1.0))
+
+    # Cache de modelos em memória (registry)
+    MODEL_CACHE_MAX_ENTRIES: int = int(os.getenv("MODEL_CACHE_MAX_ENTRIES", 8))
+    MODEL_CACHE_MAX_MB: float = float(os.getenv("MODEL_CACHE_MAX_MB", 256))
+
+    # Versões de artefatos mantidas por (ticker, lookback)
+    ARTIFACT_KEEP_VERSIONS: int = int(os.getenv("ARTIFACT_KEEP_VERSIONS", 3))
+
+    # Inferência recursiva: "window" (reexecuta a janela a cada passo) ou "stateful" (incremental)
+    LSTM_INFERENCE_MODE: str = os.getenv("LSTM_INFERENCE_MODE", "window")
+    # Variante servida: eager | torchscript | int8 (exportadas após o treino, com relatório de acurácia/latência)
+    LSTM_SERVING_VARIANT: str = os.getenv("LSTM_SERVING_VARIANT", "eager")
+    # Exportação opcional (ex.: "torchscript,int8"): custa ~1 s por treino/fine-tuning com o benchmark de latência
+    LSTM_EXPORT_VARIANTS: tuple = tuple(
+        v.strip() for v in os.getenv("LSTM_EXPORT_VARIANTS", "").split(",") if v.strip()
+    )
+    LSTM_EXPORT_REPORT_REPS: int = int(os.getenv("LSTM_EXPORT_REPORT_REPS", 20))
+
+    # Warm-up no boot da API (/ready só responde 200 depois dele): modelos dos tickers
+    # listados ou, sem lista, os ativados mais recentemente
+    WARMUP_ON_STARTUP: bool = os.getenv("WARMUP_ON_STARTUP", "0").lower() in ("1", "true", "yes")
+    WARMUP_TICKERS: tuple = tuple(t.strip().upper() for t in os.getenv("WARMUP_TICKERS", "").split(",") if t.strip())
+    WARMUP_MAX_MODELS: int = int(os.getenv("WARMUP_MAX_MODELS", 8))
+
+    # Executor dedicado de inferência (torch fora do threadpool padrão)
+    INFERENCE_MAX_WORKERS: int = int(os.getenv("INFERENCE_MAX_WORKERS", 2))
+    # padrão: núcleos divididos entre os workers (K workers x T threads <= núcleos)
+    INFERENCE_TORCH_THREADS: int = int(os.getenv(
+        "INFERENCE_TORCH_THREADS", max(1, (os.cpu_count() or 2) // int(os.getenv("INFERENCE_MAX_WORKERS", 2)))
+    ))
+    INFERENCE_MAX_PENDING: int = int(os.getenv("INFERENCE_MAX_PENDING", 64))
+
+    # Micro-batching de /lstm/predict: agrupa pedidos concorrentes do mesmo modelo
+    PREDICT_BATCHING: bool = os.getenv("PREDICT_BATCHING", "1").lower() in ("1", "true", "yes")
+    PREDICT_MAX_BATCH_SIZE: int = int(os.getenv("PREDICT_MAX_BATCH_SIZE", 32))
+    PREDICT_MAX_WAIT_MS: float = float(os.getenv("PREDICT_MAX_WAIT_MS", 5))
+
+    # Cache de previsões por (ticker, última data + updated_at do watermark, versão do modelo, passos)
+    FORECAST_CACHE_MAX_ENTRIES: int = int(os.getenv("FORECAST_CACHE_MAX_ENTRIES", 4096))
+    FORECAST_CACHE_TTL_S: float = float(os.getenv("FORECAST_CACHE_TTL_S", 3600))
+
+    # Fila de jobs de treino (process pool)
+    TRAINING_MAX_WORKERS: int = int(os.getenv("TRAINING_MAX_WORKERS", 2))
+    TRAINING_MAX_PENDING: int = int(os.getenv("TRAINING_MAX_PENDING", 16))
+    TRAINING_TORCH_THREADS: int = int(os.getenv("TRAINING_TORCH_THREADS", max(1, (os.cpu_count() or 2) // 2)))
+    TRAINING_JOBS_HISTORY: int = int(os.getenv("TRAINING_JOBS_HISTORY", 200))
+    # Fine-tuning incremental (warm start): épocas, amostra de histórico e drift tolerado do scaler
+    FINETUNE_EPOCHS: int = int(os.getenv("FINETUNE_EPOCHS", 3))
+    FINETUNE_REPLAY: int = int(os.getenv("FINETUNE_REPLAY", 512))
+    FINETUNE_DRIFT_TOL: float = float(os.getenv("FINETUNE_DRIFT_TOL", 0.05))
+    # Early stopping (opcional por pedido): fração final da série usada como validação e paciência em épocas
+    EARLY_STOPPING_VAL_SPLIT: float = float(os.getenv("EARLY_STOPPING_VAL_SPLIT", 0.1))
+    EARLY_STOPPING_PATIENCE: int = int(os.getenv("EARLY_STOPPING_PATIENCE", 3))
+    # Varredura de treino (vários tickers): pela API usa o pool acima; a CLI sobe o seu
+    SWEEP_TORCH_THREADS: int = int(os.getenv("SWEEP_TORCH_THREADS", 1))
+    SWEEP_MAX_WORKERS: int = int(os.getenv("SWEEP_MAX_WORKERS", max(1, (os.cpu_count() or 1) // SWEEP_TORCH_THREADS)))
+    # /lstm/train_batch: recusa (429) a varredura se pendentes + jobs novos passarem disto
+    SWEEP_MAX_PENDING: int = int(os.getenv("SWEEP_MAX_PENDING", 64))
+
+    def __post_init__(self):
+        # Falha no boot, e não a cada job de treino (a exportação roda depois de salvar a versão)
+        if self.LSTM_SERVING_VARIANT not in LSTM_VARIANTS:
+            raise ValueError(
+                f"LSTM_SERVING_VARIANT inválida: {self.LSTM_SERVING_VARIANT!r}. Use uma de {LSTM_VARIANTS}"
+            )
+        exportable = LSTM_VARIANTS[1:]
+        invalid = [v for v in self.LSTM_EXPORT_VARIANTS if v not in exportable]
+        if invalid:
+            raise ValueError(f"LSTM_EXPORT_VARIANTS inválida(s): {invalid}. Use itens de {exportable}")
 
 # Instanciando configurações
 settings = Settings()
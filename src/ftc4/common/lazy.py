@@ -0,0 +1,73 @@
+from __future__ import annotations
+import importlib
+import sys
+import threading
+import time
+import types
+from typing import Iterable
+
+# Dependências cujo import domina o boot da API; não devem ser carregadas ao importar o app
+HEAVY_MODULES = ("torch", "sklearn", "pandas", "pyarrow", "yfinance")
+
+_proxies: dict[str, "LazyModule"] = {}
+_import_times: dict[str, float] = {}
+_lock = threading.RLock()   # reentrante: um import preguiçoso pode disparar outro
+
+
+class LazyModule(types.ModuleType):
+    """
+    Proxy de módulo: o import real acontece no primeiro acesso a um atributo
+    (ex.: `pd.DataFrame`), e o tempo desse primeiro import fica no relatório.
+    Anotações não disparam o import nos módulos com `from __future__ import annotations`.
+    """
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__["_lazy_target"] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.__dict__["_lazy_target"] is not None
+
+    def load(self) -> types.ModuleType:
+        module = self.__dict__["_lazy_target"]
+        if module is None:
+            with _lock:
+                module = self.__dict__["_lazy_target"]
+                if module is None:
+                    cold = self.__name__ not in sys.modules
+                    t0 = time.perf_counter()
+                    module = importlib.import_module(self.__name__)
+                    if cold:
+                        _import_times[self.__name__] = time.perf_counter() - t0
+                    self.__dict__["_lazy_target"] = module
+        return module
+
+    def __getattr__(self, attr: str):
+        return getattr(self.load(), attr)
+
+
+def lazy_module(name: str) -> LazyModule:
+    """Proxy compartilhado para `name` (um por módulo no processo)."""
+    with _lock:
+        proxy = _proxies.get(name)
+        if proxy is None:
+            proxy = _proxies[name] = LazyModule(name)
+        return proxy
+
+
+def preload(names: Iterable[str] | None = None) -> dict[str, float]:
+    """Carrega os módulos preguiçosos indicados (ou todos os registrados); retorna os tempos de import."""
+    for name in list(names if names is not None else _proxies):
+        lazy_module(name).load()
+    return dict(_import_times)
+
+
+def import_report() -> dict:
+    """Tempos dos imports preguiçosos já feitos, o que ainda não foi carregado e quais pesados estão em memória."""
+    with _lock:
+        return {
+            "lazy_imports_s": {k: round(v, 4) for k, v in _import_times.items()},
+            "not_loaded": sorted(n for n, p in _proxies.items() if not p.loaded),
+            "heavy_loaded": [m for m in HEAVY_MODULES if m in sys.modules],
+        }
@@ -1,7 +1,13 @@
 from __future__ import annotations
 
+import atexit
 import logging
+import logging.handlers
+import multiprocessing
+import queue
+import random
 import sys
+import threading
 from pathlib import Path
 
 from rich.logging import RichHandler
@@ -43,68 +49,113 @@ class _RequestContextFilter(logging.Filter):
         return True
 
 
+class _SamplingFilter(logging.Filter):
+    """
+    Amostragem de eventos INFO/DEBUG: mantém cada um com a taxa do prefixo de logger
+    mais específico (ou a taxa padrão). WARNING e acima passam sempre.
+    """
+    def __init__(self, default_rate: float = 1.0, rates: dict[str, float] | None = None):
+        super().__init__()
+        self.default_rate = default_rate
+        # prefixos mais longos primeiro: o mais específico vence
+        self.rates = sorted((rates or {}).items(), key=lambda kv: len(kv[0]), reverse=True)
+
+    def rate_for(self, name: str) -> float:
+        for prefix, rate in self.rates:
+            if name == prefix or name.startswith(prefix + "."):
+                return rate
+        return self.default_rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rate_for(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    Enfileira o próprio LogRecord: a fila é do mesmo processo, então não há pickle
+    e a formatação (msg % args, tracebacks) fica para a thread do QueueListener.
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def parse_sample_rates(spec: str) -> dict[str, float]:
+    """"ftc4.api=0.1,ftc4.data_pipeline.ingest=0.5" -> {prefixo: taxa}."""
+    rates = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, rate = item.split("=", 1)
+            rates[name.strip()] = float(rate)
+    return rates
+
+
 def _ensure_log_dir(path: Path) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
 
 
-def get_logger(name: str) -> logging.Logger:
+def _file_handler(path: Path, rotation: str) -> logging.Handler:
+    _ensure_log_dir(path)
+    # Processos filhos (jobs de treino) só acrescentam: rotacionar o mesmo arquivo
+    # a partir de vários processos não é seguro; quem rotaciona é o processo principal
+    if multiprocessing.parent_process() is not None or rotation == "none":
+        return logging.FileHandler(path, encoding="utf-8")
+    if rotation == "time":
+        return logging.handlers.TimedRotatingFileHandler(
+            path, when=settings.LOG_ROTATE_WHEN, backupCount=settings.LOG_BACKUP_COUNT, encoding="utf-8",
+        )
+    return logging.handlers.RotatingFileHandler(
+        path, maxBytes=int(settings.LOG_MAX_MB * 1024 ** 2), backupCount=settings.LOG_BACKUP_COUNT, encoding="utf-8",
+    )
+
+
+def build_handlers(log_dir: Path, rotation: str = "size", console: bool = True) -> list[logging.Handler]:
     """
-    Configura e retorna um logger com:
+    Handlers de saída (rodam na thread do QueueListener):
       - Console bonito (RichHandler).
       - Arquivo texto clássico (app.log).
       - Arquivo JSON por linha (app.jsonl) para análise estruturada.
-    Evita handlers duplicados.
     """
-    logger = logging.getLogger(name)
-    logger.setLevel(DEFAULT_LOG_LEVEL)
-
-    if logger.handlers:
-        return logger  # já configurado
-
-    # --- Filtro de contexto (request_id) disponível para TODOS os handlers ---
-    context_filter = _RequestContextFilter()
+    handlers: list[logging.Handler] = []
 
     # -------------------------
     # 1) Console (RichHandler)
     # -------------------------
-    rich_handler = RichHandler(
-        show_time=True,
-        show_level=True,
-        show_path=False,
-        markup=False,               # evita precisar escapar colchetes; ligue se você usa [bold]
-        rich_tracebacks=True,
-        tracebacks_show_locals=True # depuração top: mostra variáveis locais no stack
-    )
-    # Formato simples: Rich cuida do resto
-    rich_handler.setFormatter(logging.Formatter("%(name)s: %(message)s"))
-    rich_handler.addFilter(context_filter)
-    logger.addHandler(rich_handler)
+    if console:
+        rich_handler = RichHandler(
+            show_time=True,
+            show_level=True,
+            show_path=False,
+            markup=False,               # evita precisar escapar colchetes; ligue se você usa [bold]
+            rich_tracebacks=True,
+            tracebacks_show_locals=settings.LOG_RICH_LOCALS,  # variáveis locais no stack: caro, só p/ depuração
+        )
+        # Formato simples: Rich cuida do resto
+        rich_handler.setFormatter(logging.Formatter("%(name)s: %(message)s"))
+        handlers.append(rich_handler)
 
     # --------------------------------------
     # 2) Arquivo texto clássico (app.log)
     # --------------------------------------
     try:
-        log_text_path = settings.LOG_DIR / "app.log"
-        _ensure_log_dir(log_text_path)
-        file_handler = logging.FileHandler(log_text_path, encoding="utf-8")
+        file_handler = _file_handler(log_dir / "app.log", rotation)
         file_handler.setLevel(logging.INFO)
         file_handler.setFormatter(logging.Formatter(
             "[%(asctime)s] [%(levelname)s] %(name)s "
             "[rid=%(request_id)s] %(message)s",
             datefmt="%Y-%m-%d %H:%M:%S",
         ))
-        file_handler.addFilter(context_filter)
-        logger.addHandler(file_handler)
+        handlers.append(file_handler)
     except Exception as e:
-        logger.warning(f"Atenção: Não foi possível configurar o FileHandler texto: {e}")
+        print(f"Atenção: Não foi possível configurar o FileHandler texto: {e}", file=sys.stderr)
 
     # ---------------------------------------------------
     # 3) Arquivo estruturado JSON (app.jsonl por linha)
     # ---------------------------------------------------
     try:
-        log_json_path = settings.LOG_DIR / "app.jsonl"
-        _ensure_log_dir(log_json_path)
-        json_handler = logging.FileHandler(log_json_path, encoding="utf-8")
+        json_handler = _file_handler(log_dir / "app.jsonl", rotation)
         json_handler.setLevel(logging.INFO)
 
         # Campos padrão + quaisquer 'extra' que você passar nos .info(..., extra={...})
@@ -114,15 +165,76 @@ def get_logger(name: str) -> logging.Logger:
             json_indent=None,  # uma linha por evento (ideal p/ ingestão)
         )
         json_handler.setFormatter(json_formatter)
-        json_handler.addFilter(context_filter)
-        logger.addHandler(json_handler)
+        handlers.append(json_handler)
     except Exception as e:
-        logger.warning(f"Atenção: Não foi possível configurar o FileHandler JSON: {e}")
+        print(f"Atenção: Não foi possível configurar o FileHandler JSON: {e}", file=sys.stderr)
+
+    return handlers
+
+
+def build_pipeline(handlers: list[logging.Handler], default_rate: float = 1.0,
+                   rates: dict[str, float] | None = None) -> tuple[logging.Handler, logging.handlers.QueueListener]:
+    """
+    QueueHandler (lado de quem loga: contexto + amostragem + put na fila) e o
+    QueueListener que escreve nos `handlers` numa thread própria. O listener já sai iniciado.
+    """
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = _QueueHandler(log_queue)
+    # Filtros rodam na thread de quem loga: request_id do contexto da requisição
+    # e descarte barato dos eventos não amostrados, antes de enfileirar
+    queue_handler.addFilter(_SamplingFilter(default_rate, rates))
+    queue_handler.addFilter(_RequestContextFilter())
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return queue_handler, listener
+
+
+_listener: logging.handlers.QueueListener | None = None
+_queue_handler: logging.Handler | None = None
+_configure_lock = threading.Lock()
+
+
+def _configure() -> None:
+    """Pipeline único no logger raiz: todos os loggers de módulo propagam para ele."""
+    global _listener, _queue_handler
+    with _configure_lock:
+        if _listener is not None:
+            return
+        handlers = build_handlers(settings.LOG_DIR, settings.LOG_ROTATION)
+        _queue_handler, _listener = build_pipeline(
+            handlers, settings.LOG_INFO_SAMPLE_RATE, parse_sample_rates(settings.LOG_SAMPLE_RATES),
+        )
+        logging.getLogger().addHandler(_queue_handler)
+
+        # ----------------------------------------------------
+        # Harmonizar níveis de uvicorn/fastapi (se quiser)
+        # ----------------------------------------------------
+        for name_ in ("uvicorn", "uvicorn.error", "uvicorn.access", "fastapi"):
+            logging.getLogger(name_).setLevel(logging.INFO)
+
+        # Esvazia a fila antes de o processo terminar
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Para o listener depois de escrever o que ainda está na fila."""
+    global _listener, _queue_handler
+    with _configure_lock:
+        if _listener is not None:
+            logging.getLogger().removeHandler(_queue_handler)
+            _listener.stop()
+            for handler in _listener.handlers:
+                handler.close()
+            _listener = _queue_handler = None
 
-    # ----------------------------------------------------
-    # 4) Harmonizar níveis de uvicorn/fastapi (se quiser)
-    # ----------------------------------------------------
-    for name_ in ("uvicorn", "uvicorn.error", "uvicorn.access", "fastapi"):
-        logging.getLogger(name_).setLevel(logging.INFO)
 
+def get_logger(name: str) -> logging.Logger:
+    """
+    Retorna o logger do módulo; a saída é o pipeline compartilhado do logger raiz
+    (configurado uma vez por processo), então logar custa um put na fila.
+    Mensagens com argumentos (`logger.info("x=%s", x)`) só são formatadas na thread de escrita.
+    """
+    _configure()
+    logger = logging.getLogger(name)
+    logger.setLevel(DEFAULT_LOG_LEVEL)
     return logger
@@ -0,0 +1,87 @@
+from __future__ import annotations
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+
+def _frame_label(frame) -> str:
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}:{frame.f_code.co_name}"
+
+
+def fold_stack(frame, thread_name: str) -> str:
+    """Pilha no formato "folded" (raiz;...;folha), com o nome da thread como raiz."""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.append(thread_name.replace(" ", "_"))
+    return ";".join(reversed(labels))
+
+
+class ProfileSession:
+    """Amostras coletadas enquanto a sessão está ativa (pilha folded -> contagem)."""
+
+    def __init__(self, profiler: "SamplingProfiler"):
+        self.profiler = profiler
+        self.samples: Counter[str] = Counter()
+        self.started = time.perf_counter()
+
+    def stop(self) -> Counter[str]:
+        self.profiler._remove(self)
+        return self.samples
+
+
+class SamplingProfiler:
+    """
+    Profiler de amostragem em thread própria: a cada `interval_s` lê as pilhas de todas as
+    threads do processo (sys._current_frames) e soma em cada sessão ativa. A thread só roda
+    enquanto há sessões; sessões simultâneas recebem as mesmas amostras.
+    A saída (`write_folded`) abre no flamegraph.pl, speedscope ou inferno.
+    """
+
+    def __init__(self, interval_s: float = 0.005):
+        self.interval_s = interval_s
+        self._sessions: list[ProfileSession] = []
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> ProfileSession:
+        session = ProfileSession(self)
+        with self._lock:
+            self._sessions.append(session)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="ftc4-profiler", daemon=True)
+                self._thread.start()
+        return session
+
+    def _remove(self, session: ProfileSession) -> None:
+        with self._lock:
+            if session in self._sessions:
+                self._sessions.remove(session)
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while True:
+            with self._lock:
+                sessions = list(self._sessions)
+                if not sessions:
+                    self._thread = None
+                    return
+            names = {t.ident: t.name for t in threading.enumerate()}
+            stacks = [fold_stack(frame, names.get(tid, str(tid)))
+                      for tid, frame in sys._current_frames().items() if tid != me]
+            for session in sessions:
+                session.samples.update(stacks)
+            time.sleep(self.interval_s)
+
+
+def write_folded(samples: Counter[str], path: Path) -> Path:
+    """Grava as amostras como linhas "pilha contagem"."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for stack, count in samples.most_common():
+            f.write(f"{stack} {count}\n")
+    return path
@@ -1,7 +1,294 @@
+from dataclasses import asdict, dataclass
+from datetime import date, datetime
+from itertools import islice
+from typing import Iterable, Mapping
+import numpy as np
+from sqlalchemy import Float, func, or_, select, tuple_, type_coerce
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
-from ftc4.data_pipeline.orm_models.stock_market import StockPrice
+from ftc4.common import metrics
+from ftc4.common.config import settings
+from ftc4.data_pipeline.orm_models.stock_market import StockPrice, TickerWatermark
+from ftc4.data_pipeline.series_cache import SeriesCache, cache_for, stage_rows
 
-def insert_many_prices(db: Session, data_list: list):
-    db_prices = [StockPrice(**item.dict()) for item in data_list]
-    db.add_all(db_prices)
+SERIES_COLUMNS = ("open", "high", "low", "close", "volume")
+PRICE_COLUMNS = ("date", "ticker") + SERIES_COLUMNS
+
+# mesmo contador das escritas (database.connection): o rowcount do sqlite3 não conta SELECT
+rows_total = metrics.counter("db_rows_total", "Linhas escritas (rowcount) e lidas nas consultas de série", ("op",))
+
+
+@dataclass
+class UpsertResult:
+    inserted: int = 0
+    updated: int = 0
+    skipped: int = 0     # já existiam idênticas ou repetidas no próprio lote
+    chunks: int = 0
+
+    @property
+    def received(self) -> int:
+        return self.inserted + self.updated + self.skipped
+
+    def __iadd__(self, other: "UpsertResult") -> "UpsertResult":
+        self.inserted += other.inserted
+        self.updated += other.updated
+        self.skipped += other.skipped
+        self.chunks += other.chunks
+        return self
+
+    def as_dict(self) -> dict:
+        return {**asdict(self), "received": self.received}
+
+
+def _upsert_statement():
+    table = StockPrice.__table__
+    stmt = sqlite_insert(table)
+    values = {c: stmt.excluded[c] for c in SERIES_COLUMNS}
+    # DO UPDATE só quando algum valor mudou: reenvio de dados idênticos conta como "skipped"
+    changed = or_(*[table.c[c].is_distinct_from(stmt.excluded[c]) for c in SERIES_COLUMNS])
+    return stmt.on_conflict_do_update(index_elements=["ticker", "date"], set_=values, where=changed)
+
+
+def _normalize_row(row: Mapping) -> dict:
+    d = row["date"]
+    return {
+        **{c: row[c] for c in SERIES_COLUMNS},
+        "date": d.date() if isinstance(d, datetime) else d,
+        "ticker": row["ticker"].upper(),
+    }
+
+
+def _upsert_chunk(db: Session, chunk: list[dict]) -> UpsertResult:
+    # repetições dentro do lote: vale a última
+    by_key = {(r["ticker"], r["date"]): r for r in chunk}
+    existing = db.execute(
+        select(func.count()).select_from(StockPrice)
+        .where(tuple_(StockPrice.ticker, StockPrice.date).in_(list(by_key)))
+    ).scalar_one()
+
+    changed = db.execute(_upsert_statement(), list(by_key.values())).rowcount
+    inserted = len(by_key) - existing
+    updated = changed - inserted
+    if changed:
+        stamp = _advance_watermarks(db, by_key)
+        # cache colunar: aplicado no commit desta transação
+        stage_rows(db, by_key.values(), stamp)
+    return UpsertResult(
+        inserted=inserted,
+        updated=updated,
+        skipped=(existing - updated) + (len(chunk) - len(by_key)),
+        chunks=1,
+    )
+
+
+def _advance_watermarks(db: Session, keys) -> datetime:
+    """Estende first/last_date de cada ticker do chunk (mesma transação do upsert)."""
+    ranges: dict[str, list[date]] = {}
+    for ticker, d in keys:
+        lo_hi = ranges.setdefault(ticker, [d, d])
+        lo_hi[0], lo_hi[1] = min(lo_hi[0], d), max(lo_hi[1], d)
+
+    table = TickerWatermark.__table__
+    stmt = sqlite_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["ticker"],
+        set_={
+            "first_date": func.min(table.c.first_date, stmt.excluded.first_date),
+            "last_date": func.max(table.c.last_date, stmt.excluded.last_date),
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    now = datetime.now()
+    db.execute(stmt, [
+        {"ticker": t, "first_date": lo, "last_date": hi, "updated_at": now} for t, (lo, hi) in ranges.items()
+    ])
+    return now
+
+
+def get_watermark(db: Session, ticker: str) -> TickerWatermark | None:
+    """
+    Faixa armazenada do ticker via PK. Se o ticker tem preços mas ainda não tem
+    watermark (dados antigos), calcula uma única vez a partir de stock_prices e persiste.
+    """
+    ticker = ticker.upper()
+    wm = db.get(TickerWatermark, ticker)
+    if wm is not None:
+        return wm
+    first, last = db.execute(
+        select(func.min(StockPrice.date), func.max(StockPrice.date)).where(StockPrice.ticker == ticker)
+    ).one()
+    if last is None:
+        return None
+    wm = TickerWatermark(ticker=ticker, first_date=first, last_date=last, updated_at=datetime.now())
+    db.add(wm)
+    db.commit()
+    return wm
+
+
+def get_watermarks(db: Session, tickers: list[str]) -> dict[str, TickerWatermark]:
+    """Watermarks de vários tickers em uma consulta (tickers sem watermark ficam de fora)."""
+    rows = db.scalars(select(TickerWatermark).where(TickerWatermark.ticker.in_([t.upper() for t in tickers])))
+    return {wm.ticker: wm for wm in rows}
+
+
+def get_data_versions(db: Session, tickers: list[str]) -> dict[str, tuple[date, datetime]]:
+    """
+    (última data, updated_at) de cada ticker (PK de ticker_watermarks; só leitura).
+    Toda escrita de preços renova o updated_at, inclusive correções que não mudam a
+    última data e escritas de outros processos.
+    """
+    rows = db.execute(
+        select(TickerWatermark.ticker, TickerWatermark.last_date, TickerWatermark.updated_at)
+        .where(TickerWatermark.ticker.in_([t.upper() for t in tickers]))
+    ).all()
+    return {ticker: (last_date, updated_at) for ticker, last_date, updated_at in rows}
+
+
+def backfill_watermarks(db: Session) -> int:
+    """Cria watermarks para tickers que já têm preços e ainda não têm watermark (um GROUP BY)."""
+    known = select(TickerWatermark.ticker)
+    rows = db.execute(
+        select(StockPrice.ticker, func.min(StockPrice.date), func.max(StockPrice.date))
+        .where(StockPrice.ticker.not_in(known))
+        .group_by(StockPrice.ticker)
+    ).all()
+    now = datetime.now()
+    db.add_all(TickerWatermark(ticker=t, first_date=lo, last_date=hi, updated_at=now) for t, lo, hi in rows)
     db.commit()
+    return len(rows)
+
+
+def upsert_prices(db: Session, rows: Iterable[Mapping], chunk_size: int | None = None,
+                  commit_per_chunk: bool = True) -> UpsertResult:
+    """
+    Insere/atualiza preços em lote (INSERT ... ON CONFLICT(ticker, date) DO UPDATE),
+    com executemany por chunk. Com `commit_per_chunk` cada chunk é uma transação;
+    caso contrário tudo é confirmado no final.
+    `rows`: mapeamentos com date, ticker, open, high, low, close, volume.
+    """
+    chunk_size = chunk_size or settings.INGEST_CHUNK_SIZE
+    result = UpsertResult()
+    it = iter(rows)
+    try:
+        while True:
+            chunk = [_normalize_row(r) for r in islice(it, chunk_size)]
+            if not chunk:
+                break
+            result += _upsert_chunk(db, chunk)
+            if commit_per_chunk:
+                db.commit()
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return result
+
+
+def insert_many_prices(db: Session, data_list: list, chunk_size: int | None = None) -> UpsertResult:
+    return upsert_prices(db, (item.model_dump() for item in data_list), chunk_size=chunk_size)
+
+
+def upsert_price_frame(db: Session, frame, chunk_size: int | None = None,
+                       commit_per_chunk: bool = True) -> UpsertResult:
+    """
+    Upsert direto de um DataFrame já validado (colunas PRICE_COLUMNS),
+    sem instanciar modelos Pydantic/ORM por linha.
+    """
+    columns = {c: frame[c].tolist() for c in SERIES_COLUMNS + ("ticker",)}
+    columns["date"] = frame["date"].dt.date.tolist()
+    names = list(columns)
+    rows = (dict(zip(names, values)) for values in zip(*columns.values()))
+    return upsert_prices(db, rows, chunk_size=chunk_size, commit_per_chunk=commit_per_chunk)
+
+
+def _float_column(column: str):
+    if column not in SERIES_COLUMNS:
+        raise ValueError(f"Coluna inválida: {column}. Use uma de {SERIES_COLUMNS}")
+    # type_coerce evita o processamento DECIMAL -> Decimal por linha (o SQLite já devolve float)
+    return type_coerce(getattr(StockPrice, column), Float).label(column)
+
+
+class PriceSeries:
+    """
+    Leitura de séries de preço direto em arrays NumPy (sem objetos ORM nem Decimal).
+    Se a sessão é atendida por um SeriesCache, as leituras são fatias (só leitura) do
+    cache colunar; senão, consultas que usam o índice composto (ticker, date).
+    """
+
+    def __init__(self, db: Session, use_cache: bool = True):
+        self.db = db
+        self.cache: SeriesCache | None = cache_for(db) if use_cache else None
+
+    def _fetch(self, stmt) -> np.ndarray:
+        values = np.fromiter(self.db.execute(stmt).scalars(), dtype=np.float64)
+        rows_total.inc(len(values), op="select")
+        return values
+
+    def _cached(self, ticker: str, column: str):
+        _float_column(column)  # valida o nome da coluna
+        snap = self.cache.get(self.db, ticker)
+        if snap is None:
+            return None, np.empty(0, dtype=np.float64)
+        return snap, snap.column(column)
+
+    def tail(self, ticker: str, n: int, column: str = "close") -> np.ndarray:
+        """Últimos `n` valores do ticker, em ordem cronológica."""
+        if self.cache is not None:
+            _, values = self._cached(ticker, column)
+            return values[len(values) - min(max(n, 0), len(values)):]
+        stmt = (
+            select(_float_column(column))
+            .where(StockPrice.ticker == ticker.upper())
+            .order_by(StockPrice.date.desc())
+            .limit(n)
+        )
+        return self._fetch(stmt)[::-1].copy()
+
+    def range(self, ticker: str, start: date | None = None, end: date | None = None,
+              column: str = "close") -> np.ndarray:
+        """Valores do ticker entre `start` e `end` (inclusivos; None = sem limite), em ordem cronológica."""
+        if self.cache is not None:
+            snap, values = self._cached(ticker, column)
+            if snap is None:
+                return values
+            lo = np.searchsorted(snap.dates, start.toordinal(), "left") if start is not None else 0
+            hi = np.searchsorted(snap.dates, end.toordinal(), "right") if end is not None else len(values)
+            return values[lo:hi]
+        stmt = select(_float_column(column)).where(StockPrice.ticker == ticker.upper())
+        if start is not None:
+            stmt = stmt.where(StockPrice.date >= start)
+        if end is not None:
+            stmt = stmt.where(StockPrice.date <= end)
+        return self._fetch(stmt.order_by(StockPrice.date.asc()))
+
+    def tails(self, tickers: list[str], n: int, column: str = "close") -> dict[str, np.ndarray]:
+        """
+        Últimos `n` valores de cada ticker em uma única consulta.
+        Tickers sem dados não aparecem no resultado.
+        """
+        if self.cache is not None:
+            out = {}
+            for ticker in dict.fromkeys(t.upper() for t in tickers):
+                values = self.tail(ticker, n, column)
+                if len(values):
+                    out[ticker] = values
+            return out
+        rn = func.row_number().over(partition_by=StockPrice.ticker, order_by=StockPrice.date.desc()).label("rn")
+        sub = (
+            select(StockPrice.ticker, StockPrice.date, _float_column(column), rn)
+            .where(StockPrice.ticker.in_([t.upper() for t in tickers]))
+            .subquery()
+        )
+        stmt = select(sub.c.ticker, sub.c[column]).where(sub.c.rn <= n).order_by(sub.c.ticker, sub.c.date.asc())
+
+        rows = self.db.execute(stmt).all()
+        rows_total.inc(len(rows), op="select")
+        if not rows:
+            return {}
+        names = np.array([r[0] for r in rows], dtype=object)
+        values = np.fromiter((r[1] for r in rows), dtype=np.float64, count=len(rows))
+        # linhas já vêm agrupadas por ticker: fatia cada bloco contíguo
+        bounds = np.flatnonzero(names[1:] != names[:-1]) + 1
+        starts = np.concatenate(([0], bounds))
+        ends = np.concatenate((bounds, [len(rows)]))
+        return {names[s]: values[s:e] for s, e in zip(starts, ends)}
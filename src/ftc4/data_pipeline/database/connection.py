@@ -1,19 +1,144 @@
-from sqlalchemy import create_engine
+import time
+from pathlib import Path
+from typing import Tuple
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase, sessionmaker, scoped_session
+from ftc4.common import metrics
 from ftc4.common.config import settings
 from sqlalchemy import URL
 from ftc4.common.logger import get_logger
 
 logger = get_logger(__name__)
 
+query_seconds = metrics.histogram(
+    "db_query_duration_seconds", "Tempo de execução das consultas SQL (cursor.execute)",
+    ("engine", "op"), buckets=metrics.FAST_BUCKETS + (0.25, 1.0, 5.0),
+)
+rows_total = metrics.counter("db_rows_total", "Linhas escritas (rowcount) e lidas nas consultas de série", ("op",))
+session_seconds = metrics.histogram("db_session_duration_seconds", "Duração das sessões de get_db/get_read_db", ("session",))
+
+# Perfis de conexão SQLite (SQLITE_PROFILE):
+#   legacy -> padrão do driver (journal DELETE, sem busy_timeout), um pool compartilhado
+#   wal    -> WAL + pragmas abaixo; leitores em pool próprio (query_only) e um único escritor
+SQLITE_PROFILES = {
+    "legacy": {},
+    "wal": {
+        "journal_mode": "WAL",          # leitores não bloqueiam o escritor (e vice-versa)
+        "synchronous": "NORMAL",        # seguro com WAL; fsync só no checkpoint
+        "busy_timeout": settings.SQLITE_BUSY_TIMEOUT_MS,
+        "cache_size": -settings.SQLITE_CACHE_SIZE_KB,   # negativo = KiB
+        "mmap_size": settings.SQLITE_MMAP_MB * 1024 ** 2,
+        "temp_store": "MEMORY",
+    },
+}
+
+
+def _apply_pragmas(engine: Engine, pragmas: dict, read_only: bool = False) -> None:
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_conn, _record):
+        cursor = dbapi_conn.cursor()
+        for name, value in pragmas.items():
+            # journal_mode é persistente no arquivo: quem define é o escritor
+            if read_only and name == "journal_mode":
+                continue
+            cursor.execute(f"PRAGMA {name}={value}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+
+def _begin_immediate(engine: Engine) -> None:
+    # Transação de escrita pega o lock já no BEGIN: evita "database is locked" ao
+    # promover um BEGIN DEFERRED de leitura para escrita com outro processo escrevendo
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_conn, _record):
+        dbapi_conn.isolation_level = None   # transação controlada pelo evento abaixo
+
+    @event.listens_for(engine, "begin")
+    def _on_begin(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def instrument_engine(engine: Engine, name: str) -> None:
+    """Tempo por consulta (rótulo = primeira palavra do SQL) e linhas afetadas pelas escritas."""
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info["query_t0"] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_t0"]
+        op = (statement.split(None, 1) or ["?"])[0].lower()
+        query_seconds.observe(elapsed, engine=name, op=op)
+        # SELECT no sqlite3 tem rowcount -1; as leituras de série contam as linhas no crud
+        if cursor.rowcount > 0:
+            rows_total.inc(cursor.rowcount, op=op)
+
+
+def make_engines(path: Path, profile: str = "wal", read_pool_size: int = 4,
+                 writer_timeout_s: float = 30.0) -> Tuple[Engine, Engine]:
+    """
+    Cria (escritor, leitor) para o arquivo SQLite conforme o perfil.
+    No perfil "wal" o escritor tem uma única conexão (escritas serializadas no processo,
+    a fila é o pool) e o leitor é um pool separado somente leitura.
+    No perfil "legacy" os dois são o mesmo engine.
+    """
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"Perfil SQLite desconhecido: {profile}. Use um de {list(SQLITE_PROFILES)}")
+    url = URL.create(drivername='sqlite', database=Path(path).as_posix())
+    connect_args = {"check_same_thread": False}
+    if profile == "legacy":
+        legacy = create_engine(url, echo=False, connect_args=connect_args)
+        instrument_engine(legacy, "legacy")
+        return legacy, legacy
+
+    pragmas = SQLITE_PROFILES[profile]
+    writer = create_engine(url, echo=False, connect_args=connect_args,
+                           pool_size=1, max_overflow=0, pool_timeout=writer_timeout_s)
+    _apply_pragmas(writer, pragmas)
+    _begin_immediate(writer)
+
+    reader = create_engine(url, echo=False, connect_args=connect_args,
+                           pool_size=read_pool_size, max_overflow=read_pool_size)
+    _apply_pragmas(reader, pragmas, read_only=True)
+    instrument_engine(writer, "writer")
+    instrument_engine(reader, "reader")
+    return writer, reader
+
+
+def make_async_read_engine(path: Path, profile: str = "wal", pool_size: int = 4) -> AsyncEngine:
+    """Engine somente leitura via aiosqlite para as rotas async (mesmos pragmas do leitor síncrono)."""
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"Perfil SQLite desconhecido: {profile}. Use um de {list(SQLITE_PROFILES)}")
+    url = URL.create(drivername='sqlite+aiosqlite', database=Path(path).as_posix())
+    async_engine = create_async_engine(url, echo=False, pool_size=pool_size, max_overflow=pool_size)
+    _apply_pragmas(async_engine.sync_engine, SQLITE_PROFILES[profile], read_only=True)
+    instrument_engine(async_engine.sync_engine, "async_reader")
+    return async_engine
+
+
 # URL do SQLite
 url = URL.create(drivername='sqlite', database=settings.DATABASE_PATH.as_posix())
 
-# Criando o engine com echo opcional
-engine = create_engine(url, echo=False, connect_args={"check_same_thread": False})
+# Engine de escrita (e leitura no perfil legacy) e engine só de leitura
+engine, read_engine = make_engines(
+    settings.DATABASE_PATH,
+    profile=settings.SQLITE_PROFILE,
+    read_pool_size=settings.SQLITE_READ_POOL_SIZE,
+    writer_timeout_s=settings.SQLITE_WRITER_TIMEOUT_S,
+)
+
+# Leitura assíncrona (aiosqlite): as rotas async não ocupam o threadpool para consultar
+async_read_engine = make_async_read_engine(
+    settings.DATABASE_PATH, profile=settings.SQLITE_PROFILE, pool_size=settings.SQLITE_READ_POOL_SIZE,
+)
 
 # Gerador de sessão (tipado e thread-safe) (garante que cada thread tenha sua própria sessão)
 SessionLocal = scoped_session(sessionmaker(bind=engine, autoflush=False, autocommit=False))
+ReadSessionLocal = scoped_session(sessionmaker(bind=read_engine, autoflush=False, autocommit=False))
+AsyncReadSessionLocal = async_sessionmaker(async_read_engine, autoflush=False, expire_on_commit=False)
 
 # Nova forma de criar Base (API 2.0)
 class Base(DeclarativeBase):
@@ -23,12 +148,35 @@ def get_db():
     """Função para gestão de sessões independentes"""
     db = SessionLocal()
     try:
-        yield db
+        with session_seconds.time(session="write"):
+            yield db
+    finally:
+        db.close()
+
+def get_session_factory() -> sessionmaker:
+    """
+    Fábrica de sessões de escrita simples (não escopadas por thread), para rotas que
+    gravam em threads de trabalho (asyncio.to_thread): cada uma abre e fecha a sua.
+    """
+    return SessionLocal.session_factory
+
+def get_read_db():
+    """Sessão somente leitura (rotas de consulta/predição; não disputa o escritor)"""
+    db = ReadSessionLocal()
+    try:
+        with session_seconds.time(session="read"):
+            yield db
     finally:
         db.close()
 
+async def get_async_read_db():
+    """Sessão assíncrona somente leitura; código síncrono do crud roda via `await db.run_sync(...)`"""
+    async with AsyncReadSessionLocal() as db:
+        with session_seconds.time(session="async_read"):
+            yield db
+
 
 if __name__ == "__main__":
     logger.info(url)
     logger.info(engine)
-
+    logger.info(read_engine)
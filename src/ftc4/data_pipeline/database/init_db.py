@@ -1,5 +1,7 @@
 import importlib
 from pathlib import Path
+from sqlalchemy import delete, func, inspect, select
+from sqlalchemy.orm import Session
 from ftc4.data_pipeline.database.connection import Base, engine
 from ftc4.common.config import settings
 from ftc4.common.logger import get_logger
@@ -11,14 +13,49 @@ def import_all_models():
     Carrega todos os modelos ORM disponíveis para que o SQLAlchemy
     reconheça as tabelas na chamada Base.metadata.create_all.
     """
-    models_path = (Path(__file__).parents[2] / "orm_models").resolve()
+    models_path = (Path(__file__).parents[1] / "orm_models").resolve()
     for file in models_path.glob("*.py"):
         if file.name.startswith("__"):
             continue
-        module = f"data_pipeline.orm_models.{file.stem}"
+        module = f"ftc4.data_pipeline.orm_models.{file.stem}"
         importlib.import_module(module)
 
 
+def _deduplicate(bind, table, columns) -> int:
+    """Remove linhas repetidas em `columns`, mantendo a de maior PK (a mais recente)."""
+    pk = list(table.primary_key.columns)[0]
+    keep = select(func.max(pk)).group_by(*[table.c[c] for c in columns])
+    with bind.begin() as conn:
+        return conn.execute(delete(table).where(pk.not_in(keep))).rowcount
+
+
+def create_missing_indexes(bind=engine):
+    """
+    create_all não cria índices novos em tabelas já existentes;
+    aqui criamos os índices declarados nos modelos que ainda não estão no banco
+    (ou que existem com unicidade diferente da declarada).
+    Antes de um índice único, duplicatas antigas são removidas.
+    """
+    insp = inspect(bind)
+    existing_tables = set(insp.get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {ix["name"]: bool(ix["unique"]) for ix in insp.get_indexes(table.name)}
+        for index in table.indexes:
+            if existing.get(index.name) == bool(index.unique):
+                continue
+            if index.name in existing:
+                logger.info(f"Recriando índice {index.name} (unique={index.unique})...")
+                index.drop(bind)
+            if index.unique:
+                removed = _deduplicate(bind, table, [c.name for c in index.columns])
+                if removed:
+                    logger.warning(f"{removed} linhas duplicadas removidas de {table.name} antes do índice {index.name}")
+            logger.info(f"Criando índice {index.name} em {table.name}...")
+            index.create(bind)
+
+
 def init_db():
     logger.info("Verificando diretório do banco de dados...")
     settings.DATABASE_DIR.mkdir(exist_ok=True)
@@ -28,6 +65,13 @@ def init_db():
 
     logger.info("Verifica e cria todas as tabelas no banco...")
     Base.metadata.create_all(engine)
+    create_missing_indexes()
+
+    from ftc4.data_pipeline.crud.stock_market_prices import backfill_watermarks
+    with Session(engine) as db:
+        created = backfill_watermarks(db)
+    if created:
+        logger.info(f"Watermarks criados para {created} tickers já existentes.")
 
 if __name__ == "__main__":
     init_db()
\ No newline at end of file
@@ -0,0 +1,160 @@
+from __future__ import annotations
+import time
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Callable, Literal
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from ftc4.common import metrics
+from ftc4.common.lazy import lazy_module
+from ftc4.data_pipeline.crud.stock_market_prices import UpsertResult, get_watermark, upsert_price_frame
+from ftc4.data_pipeline.orm_models.stock_market import TickerWatermark
+from ftc4.data_pipeline.validation.stock_market_prices import (
+    FrameValidation, missing_columns, normalize_price_frame, validate_price_frame,
+)
+
+pd = lazy_module("pandas")
+
+# (ticker, start "YYYY-MM-DD", end "YYYY-MM-DD" exclusivo) -> DataFrame bruto
+FetchFn = Callable[[str, str, str], "pd.DataFrame"]
+SyncMode = Literal["full", "delta"]
+
+# Desfecho de uma ingestão: gravou registros, nada a baixar (watermark já cobre o período)
+# ou baixou e a fonte não tinha nada novo (ex.: cauda só com feriados)
+INGESTED, UP_TO_DATE, NO_NEW_DATA = "ingested", "up_to_date", "no_new_data"
+
+stage_seconds = metrics.histogram("ingest_stage_seconds", "Tempo de cada etapa da ingestão de um ticker", ("stage",))
+ingest_rows = metrics.counter("ingest_rows_total", "Registros válidos gravados pela ingestão", ("mode",))
+rows_per_second = metrics.histogram(
+    "ingest_rows_per_second", "Vazão da ingestão por ticker (registros válidos / tempo total)",
+    buckets=(100, 500, 1_000, 5_000, 10_000, 50_000, 100_000, 500_000),
+)
+
+
+class IngestError(Exception):
+    """Falha de ingestão com status HTTP sugerido."""
+    status_code = 500
+
+
+class MissingColumnsError(IngestError):
+    status_code = 500
+
+
+class NoDataError(IngestError):
+    status_code = 404
+
+
+class NoValidRowsError(IngestError):
+    status_code = 400
+
+
+@dataclass
+class IngestResult:
+    ticker: str
+    mode: str
+    status: str = INGESTED
+    ranges: list[tuple[date, date]] = field(default_factory=list)  # intervalos baixados [início, fim)
+    records: int = 0
+    upsert: UpsertResult = field(default_factory=UpsertResult)
+    rejected: dict[str, int] = field(default_factory=dict)
+    first_date: date | None = None
+    last_date: date | None = None
+
+    @property
+    def skipped_download(self) -> bool:
+        return not self.ranges
+
+    def as_dict(self) -> dict:
+        return {
+            "ticker": self.ticker,
+            "mode": self.mode,
+            "status": self.status,
+            "records": self.records,
+            **self.upsert.as_dict(),
+            "rejected": self.rejected,
+            "skipped_download": self.skipped_download,
+            "fetched_ranges": [[s.isoformat(), e.isoformat()] for s, e in self.ranges],
+            "first_date": self.first_date.isoformat() if self.first_date else None,
+            "last_date": self.last_date.isoformat() if self.last_date else None,
+        }
+
+
+def plan_fetch_ranges(watermark: TickerWatermark | None, start: date, end: date) -> list[tuple[date, date]]:
+    """
+    Intervalos [início, fim) que faltam para cobrir start..end, dado o que já está no banco:
+    o trecho antes de first_date e a cauda depois de last_date. Intervalos só com fim de semana
+    são descartados (não há pregão). Lista vazia = ticker já atualizado.
+    """
+    if watermark is None:
+        return [(start, end)] if start < end else []
+    gaps = []
+    if start < watermark.first_date:
+        gaps.append((start, min(watermark.first_date, end)))
+    tail_start = max(start, watermark.last_date + timedelta(days=1))
+    if tail_start < end:
+        gaps.append((tail_start, end))
+    return [(s, e) for s, e in gaps if np.busday_count(s, e) > 0]
+
+
+def fetch_ranges(fetch: FetchFn, ticker: str, ranges: list[tuple[date, date]]) -> list[pd.DataFrame]:
+    """Baixa cada intervalo [início, fim); descarta retornos vazios."""
+    frames = [fetch(ticker, s.isoformat(), e.isoformat()) for s, e in ranges]
+    return [f for f in frames if f is not None and not f.empty]
+
+
+def prepare_frames(ticker: str, frames: list[pd.DataFrame]) -> FrameValidation:
+    """Confere colunas, normaliza e valida (vetorizado) os frames brutos de um ticker."""
+    for f in frames:
+        missing = missing_columns(f)
+        if missing:
+            raise MissingColumnsError(f"Colunas ausentes da fonte: {missing}")
+    df = pd.concat([normalize_price_frame(f, ticker=ticker) for f in frames], ignore_index=True)
+    return validate_price_frame(df)
+
+
+def ingest_ticker(db: Session, ticker: str, start: date, end: date | None, fetch: FetchFn,
+                  mode: SyncMode = "full") -> IngestResult:
+    """
+    Baixa, valida (vetorizado) e faz upsert dos preços de um ticker.
+    mode="delta" consulta o watermark e baixa só o que falta (ou nada, se já estiver atualizado).
+    """
+    ticker = ticker.upper()
+    end = end or date.today()
+    result = IngestResult(ticker=ticker, mode=mode)
+    if mode == "delta":
+        result.ranges = plan_fetch_ranges(get_watermark(db, ticker), start, end)
+        # encerra a transação da leitura: no escritor ela segura o lock (BEGIN IMMEDIATE)
+        # e a única conexão durante o download; o lock volta só no upsert
+        db.commit()
+        if not result.ranges:
+            result.status = UP_TO_DATE
+            return result
+    else:
+        result.ranges = [(start, end)]
+
+    t0 = time.perf_counter()
+    with stage_seconds.time(stage="fetch"):
+        frames = fetch_ranges(fetch, ticker, result.ranges)
+    if not frames:
+        if mode == "delta":
+            result.status = NO_NEW_DATA   # nada novo publicado na fonte ainda
+            return result
+        raise NoDataError("Sem dados retornados para o período informado.")
+
+    with stage_seconds.time(stage="validate"):
+        validation = prepare_frames(ticker, frames)
+    df = validation.frame
+    result.rejected = validation.rejected
+    if df.empty:
+        raise NoValidRowsError("Nenhum registro válido após limpeza/validação.")
+
+    with stage_seconds.time(stage="upsert"):
+        result.upsert = upsert_price_frame(db, df)
+    result.records = len(df)
+    ingest_rows.inc(len(df), mode=mode)
+    rows_per_second.observe(len(df) / max(time.perf_counter() - t0, 1e-9))
+    result.first_date = df["date"].min().date()
+    result.last_date = df["date"].max().date()
+    return result
@@ -1,10 +1,14 @@
-from sqlalchemy import Column, Integer, String, Date
+from sqlalchemy import Column, Integer, String, Date, DateTime, Index
 from sqlalchemy.types import DECIMAL
 from ftc4.data_pipeline.database.connection import Base
 
 
 class StockPrice(Base):
     __tablename__ = 'stock_prices'
+    __table_args__ = (
+        # Um preço por (ticker, data); também atende as consultas de série (filtro por ticker, ordem por data)
+        Index("ix_stock_prices_ticker_date", "ticker", "date", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     date = Column(Date, nullable=False, index=True)
@@ -18,4 +22,18 @@ class StockPrice(Base):
     def __repr__(self):
         return (f"<StockPrice(date={self.date}, ticker={self.ticker}, "
                 f"close={self.close}, high={self.high}, low={self.low}, "
-                f"open={self.open}, volume={self.volume})>")
\ No newline at end of file
+                f"open={self.open}, volume={self.volume})>")
+
+
+class TickerWatermark(Base):
+    """Faixa de datas já armazenada por ticker (consulta por PK em vez de MIN/MAX em stock_prices)."""
+    __tablename__ = 'ticker_watermarks'
+
+    ticker = Column(String(16), primary_key=True)
+    first_date = Column(Date, nullable=False)
+    last_date = Column(Date, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
+
+    def __repr__(self):
+        return (f"<TickerWatermark(ticker={self.ticker}, first_date={self.first_date}, "
+                f"last_date={self.last_date})>")
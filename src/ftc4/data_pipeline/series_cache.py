@@ -0,0 +1,290 @@
+from __future__ import annotations
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Callable, Iterable, Mapping
+
+import numpy as np
+from sqlalchemy import Float, event, select, type_coerce
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from ftc4.common.config import settings
+from ftc4.data_pipeline.orm_models.stock_market import StockPrice, TickerWatermark
+
+COLUMNS = ("open", "high", "low", "close", "volume")
+_COLUMN_INDEX = {c: i for i, c in enumerate(COLUMNS)}
+_STAGED_KEY = "series_cache_staged"
+_MIN_CAPACITY = 64
+
+
+@dataclass(frozen=True)
+class SeriesSnapshot:
+    """Visão imutável de um ticker: `dates` (ordinais) e `values` (5, n) só leitura."""
+    dates: np.ndarray
+    values: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def column(self, name: str) -> np.ndarray:
+        if name not in _COLUMN_INDEX:
+            raise ValueError(f"Coluna inválida: {name}. Use uma de {COLUMNS}")
+        return self.values[_COLUMN_INDEX[name]]
+
+
+class TickerSeries:
+    """
+    Série de um ticker em arrays contíguos com folga no fim (append amortizado).
+    Só a região [0, n) é visível; appends escrevem além dela e trocas de valores
+    existentes geram arrays novos, então snapshots já entregues nunca mudam.
+    """
+
+    def __init__(self, dates: np.ndarray, values: np.ndarray, updated_at: datetime | None):
+        self._reset(dates, values)
+        self.updated_at = updated_at
+        self.checked_at = time.monotonic()
+
+    def _reset(self, dates: np.ndarray, values: np.ndarray) -> None:
+        self.n = len(dates)
+        capacity = max(_MIN_CAPACITY, self.n + self.n // 4)
+        self._dates = np.empty(capacity, dtype=np.int64)
+        self._values = np.empty((len(COLUMNS), capacity), dtype=np.float64)
+        self._dates[:self.n] = dates
+        self._values[:, :self.n] = values
+
+    @property
+    def nbytes(self) -> int:
+        return self._dates.nbytes + self._values.nbytes
+
+    def snapshot(self) -> SeriesSnapshot:
+        dates, values = self._dates[:self.n], self._values[:, :self.n]
+        dates.flags.writeable = False
+        values.flags.writeable = False
+        return SeriesSnapshot(dates, values)
+
+    def merge(self, dates: np.ndarray, values: np.ndarray) -> None:
+        """Aplica linhas novas/atualizadas (datas únicas, ordenadas)."""
+        if not len(dates):
+            return
+        if self.n == 0 or dates[0] > self._dates[self.n - 1]:
+            self._append(dates, values)
+            return
+        # Caminho geral (backfill/atualização): reconstrói em arrays novos
+        old_dates, old_values = self._dates[:self.n], self._values[:, :self.n]
+        keep = ~np.isin(old_dates, dates)
+        all_dates = np.concatenate((old_dates[keep], dates))
+        all_values = np.concatenate((old_values[:, keep], values), axis=1)
+        order = np.argsort(all_dates, kind="stable")
+        self._reset(all_dates[order], all_values[:, order])
+
+    def _append(self, dates: np.ndarray, values: np.ndarray) -> None:
+        end = self.n + len(dates)
+        if end > len(self._dates):
+            capacity = max(end, 2 * len(self._dates))
+            new_dates = np.empty(capacity, dtype=np.int64)
+            new_values = np.empty((len(COLUMNS), capacity), dtype=np.float64)
+            new_dates[:self.n] = self._dates[:self.n]
+            new_values[:, :self.n] = self._values[:, :self.n]
+            self._dates, self._values = new_dates, new_values
+        self._dates[self.n:end] = dates
+        self._values[:, self.n:end] = values
+        self.n = end
+
+
+def _rows_to_arrays(rows: Iterable[Mapping]) -> dict[str, tuple[np.ndarray, np.ndarray]]:
+    """Agrupa linhas (date, ticker, OHLCV) por ticker em (ordinais, valores) ordenados por data."""
+    by_ticker: dict[str, dict[int, tuple]] = {}
+    for r in rows:
+        by_ticker.setdefault(r["ticker"], {})[r["date"].toordinal()] = tuple(float(r[c]) for c in COLUMNS)
+    out = {}
+    for ticker, by_date in by_ticker.items():
+        dates = np.fromiter(by_date, dtype=np.int64, count=len(by_date))
+        values = np.array(list(by_date.values()), dtype=np.float64).T
+        order = np.argsort(dates)
+        out[ticker] = (dates[order], values[:, order])
+    return out
+
+
+class SeriesCache:
+    """
+    Cache colunar por ticker (ordinais de data + OHLCV em float64) ligado a um banco
+    (um ou mais engines do mesmo arquivo, ex.: escritor e leitor).
+      - Carga preguiçosa no primeiro acesso; depois as leituras são fatias.
+      - Os upserts de crud/stock_market_prices registram as linhas na sessão e elas
+        são aplicadas no commit (descartadas no rollback): append, não invalidação.
+      - Escritas de outros processos são detectadas pelo `updated_at` do watermark,
+        conferido no máximo a cada `check_interval_s` por ticker.
+      - Despejo LRU pelo teto de memória.
+    """
+
+    def __init__(self, engines: Engine | Iterable[Engine], max_bytes: int = 64 * 1024 ** 2,
+                 check_interval_s: float = 1.0):
+        self.engines = (engines,) if isinstance(engines, Engine) else tuple(engines)
+        self.max_bytes = max_bytes
+        self.check_interval_s = check_interval_s
+        self._entries: "OrderedDict[str, TickerSeries]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.appends = 0
+        self.evictions = 0
+        _caches.add(self)
+
+    def serves(self, db: Session) -> bool:
+        bind = db.get_bind()
+        return any(bind is e for e in self.engines)
+
+    # ---------------- leitura ----------------
+    def get(self, db: Session, ticker: str) -> SeriesSnapshot | None:
+        """Snapshot do ticker (None se não há preços)."""
+        ticker = ticker.upper()
+        with self._lock:
+            entry = self._entries.get(ticker)
+            if entry is not None and time.monotonic() - entry.checked_at < self.check_interval_s:
+                self._entries.move_to_end(ticker)
+                self.hits += 1
+                return entry.snapshot()
+
+        updated_at = db.execute(
+            select(TickerWatermark.updated_at).where(TickerWatermark.ticker == ticker)
+        ).scalar()
+        with self._lock:
+            entry = self._entries.get(ticker)
+            if entry is not None and entry.updated_at == updated_at:
+                entry.checked_at = time.monotonic()
+                self._entries.move_to_end(ticker)
+                self.hits += 1
+                return entry.snapshot()
+            if entry is None:
+                self.misses += 1
+            else:
+                self.reloads += 1
+
+        entry = self._load(db, ticker, updated_at)
+        if entry is None:
+            return None
+        with self._lock:
+            self._entries[ticker] = entry
+            self._entries.move_to_end(ticker)
+            self._evict()
+            return entry.snapshot()
+
+    def _load(self, db: Session, ticker: str, updated_at: datetime | None) -> TickerSeries | None:
+        cols = [type_coerce(getattr(StockPrice, c), Float) for c in COLUMNS]
+        rows = db.execute(
+            select(StockPrice.date, *cols).where(StockPrice.ticker == ticker).order_by(StockPrice.date.asc())
+        ).all()
+        if not rows:
+            return None
+        dates = np.fromiter((r[0].toordinal() for r in rows), dtype=np.int64, count=len(rows))
+        values = np.array([r[1:] for r in rows], dtype=np.float64).T
+        return TickerSeries(dates, values, updated_at)
+
+    # ---------------- escrita (via eventos da sessão) ----------------
+    def apply(self, rows: list[Mapping], stamp: datetime | None) -> None:
+        with self._lock:
+            for ticker, (dates, values) in _rows_to_arrays(rows).items():
+                entry = self._entries.get(ticker)
+                if entry is None:
+                    continue  # não carregado: será lido do banco no primeiro acesso
+                entry.merge(dates, values)
+                entry.updated_at = stamp
+                self.appends += 1
+            self._evict()
+
+    def invalidate(self, ticker: str | None = None) -> None:
+        with self._lock:
+            if ticker is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(ticker.upper(), None)
+
+    def _evict(self) -> None:
+        while len(self._entries) > 1 and self.nbytes > self.max_bytes:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    @property
+    def nbytes(self) -> int:
+        return sum(e.nbytes for e in self._entries.values())
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses + self.reloads
+            return {
+                "tickers": len(self._entries),
+                "nbytes": self.nbytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "reloads": self.reloads,
+                "appends": self.appends,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+# Caches vivos (um por banco); o stage só guarda linhas se algum cache atende a sessão
+_caches: "weakref.WeakSet[SeriesCache]" = weakref.WeakSet()
+
+# Chamados após cada commit com os tickers gravados (ex.: invalidar caches derivados)
+_commit_listeners: list[Callable[[set[str]], None]] = []
+
+
+def on_prices_committed(listener: Callable[[set[str]], None]) -> Callable[[set[str]], None]:
+    """Registra `listener(tickers)`, chamado após o commit de preços gravados por upsert_prices."""
+    _commit_listeners.append(listener)
+    return listener
+
+
+def cache_for(db: Session) -> SeriesCache | None:
+    for cache in list(_caches):
+        if cache.serves(db):
+            return cache
+    return None
+
+
+def stage_rows(db: Session, rows: Iterable[Mapping], stamp: datetime) -> None:
+    """Guarda linhas gravadas na transação corrente; aplicadas ao cache no commit."""
+    if not _commit_listeners and cache_for(db) is None:
+        return
+    staged = db.info.setdefault(_STAGED_KEY, [])
+    staged.append((list(rows), stamp))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_staged(session: Session) -> None:
+    staged = session.info.pop(_STAGED_KEY, None)
+    if not staged:
+        return
+    cache = cache_for(session)
+    if cache is not None:
+        for rows, stamp in staged:
+            cache.apply(rows, stamp)
+    if _commit_listeners:
+        tickers = {r["ticker"] for rows, _ in staged for r in rows}
+        for listener in _commit_listeners:
+            listener(tickers)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_staged(session: Session) -> None:
+    session.info.pop(_STAGED_KEY, None)
+
+
+def _default_cache() -> SeriesCache:
+    from ftc4.data_pipeline.database.connection import async_read_engine, engine, read_engine
+
+    return SeriesCache(
+        # AsyncSession.run_sync entrega uma Session ligada ao sync_engine do engine async
+        {engine, read_engine, async_read_engine.sync_engine},
+        max_bytes=int(settings.SERIES_CACHE_MAX_MB * 1024 ** 2),
+        check_interval_s=settings.SERIES_CACHE_CHECK_S,
+    )
+
+
+series_cache = _default_cache()
@@ -0,0 +1,46 @@
+from __future__ import annotations
+from abc import ABC, abstractmethod
+from datetime import date
+
+from ftc4.common.lazy import lazy_module
+from ftc4.data_pipeline.validation.stock_market_prices import FRAME_COLUMNS, normalize_price_frame
+
+pd = lazy_module("pandas")
+
+
+def to_date(value) -> date:
+    """Aceita date, datetime, Timestamp ou "YYYY-MM-DD"."""
+    return pd.Timestamp(value).date()
+
+
+def empty_price_frame() -> pd.DataFrame:
+    return normalize_price_frame(pd.DataFrame(columns=FRAME_COLUMNS))
+
+
+class PriceSource(ABC):
+    """
+    Fonte de preços diários. `fetch` devolve o frame já normalizado
+    (colunas FRAME_COLUMNS, uma linha por pregão em [start, end), ordenado por data).
+    A instância também é chamável com a assinatura de FetchFn (ticker, start, end=None),
+    então pode ser passada direto para ingest_ticker / sync_watchlist.
+    """
+
+    name: str = "base"
+
+    @abstractmethod
+    def fetch(self, ticker: str, start: date, end: date) -> pd.DataFrame:
+        ...
+
+    def __call__(self, ticker: str, start_date, end_date=None) -> pd.DataFrame:
+        end = to_date(end_date) if end_date is not None else date.today()
+        return self.fetch(ticker.upper(), to_date(start_date), end)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}()"
+
+
+def clip_frame(df: pd.DataFrame, start: date, end: date) -> pd.DataFrame:
+    """Linhas com data em [start, end), ordenadas e sem datas repetidas."""
+    mask = (df["date"] >= pd.Timestamp(start)) & (df["date"] < pd.Timestamp(end))
+    out = df.loc[mask].drop_duplicates("date", keep="last").sort_values("date")
+    return out.reset_index(drop=True)
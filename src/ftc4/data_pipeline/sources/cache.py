@@ -0,0 +1,162 @@
+from __future__ import annotations
+import json
+import os
+import threading
+import uuid
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from ftc4.common.logger import get_logger
+from ftc4.data_pipeline.sources.base import PriceSource, clip_frame, empty_price_frame
+from ftc4.data_pipeline.validation.stock_market_prices import FRAME_COLUMNS
+
+logger = get_logger(__name__)
+
+COVERAGE_FILE = "coverage.json"
+
+Interval = tuple[date, date]  # [início, fim)
+
+
+def merge_intervals(intervals: list[Interval]) -> list[Interval]:
+    """Une intervalos [início, fim) sobrepostos ou adjacentes."""
+    merged: list[Interval] = []
+    for s, e in sorted(i for i in intervals if i[0] < i[1]):
+        if merged and s <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], e))
+        else:
+            merged.append((s, e))
+    return merged
+
+
+def subtract_intervals(start: date, end: date, covered: list[Interval]) -> list[Interval]:
+    """Partes de [start, end) que não estão em `covered` (já unido e ordenado)."""
+    gaps, cursor = [], start
+    for s, e in covered:
+        if e <= cursor:
+            continue
+        if s >= end:
+            break
+        if s > cursor:
+            gaps.append((cursor, s))
+        cursor = max(cursor, e)
+    if cursor < end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+class CachedPriceSource(PriceSource):
+    """
+    Decorator de cache em disco para qualquer PriceSource:
+
+        <root>/<TICKER>/<ano>.parquet   # frames normalizados, um arquivo por ano
+        <root>/<TICKER>/coverage.json   # intervalos [início, fim) já consultados na fonte
+
+    A cobertura é guardada à parte porque ausência de linha (feriado, fim de semana)
+    não significa intervalo não baixado. Só os trechos não cobertos vão para a fonte;
+    o dia corrente nunca é marcado como coberto (o pregão pode não ter fechado), nem um
+    intervalo com dias úteis que voltou vazio (falha da fonte; é consultado de novo).
+    Preços ajustados mudam após splits/dividendos: use `invalidate(ticker)` para
+    forçar novo download do histórico.
+    """
+
+    name = "cached"
+
+    def __init__(self, inner: PriceSource, root: Path):
+        self.inner = inner
+        self.root = Path(root)
+        self._lock = threading.Lock()
+        self._ticker_locks: dict[str, threading.Lock] = {}
+        self.hits = 0      # consultas atendidas só pelo cache
+        self.misses = 0    # consultas que precisaram da fonte
+
+    # ---------------- caminhos / metadados ----------------
+    def ticker_dir(self, ticker: str) -> Path:
+        return self.root / ticker.upper()
+
+    def coverage(self, ticker: str) -> list[Interval]:
+        path = self.ticker_dir(ticker) / COVERAGE_FILE
+        if not path.exists():
+            return []
+        raw = json.loads(path.read_text(encoding="utf-8"))
+        return [(date.fromisoformat(s), date.fromisoformat(e)) for s, e in raw]
+
+    def _write_coverage(self, ticker: str, intervals: list[Interval]) -> None:
+        path = self.ticker_dir(ticker) / COVERAGE_FILE
+        tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        tmp.write_text(json.dumps([[s.isoformat(), e.isoformat()] for s, e in intervals]), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def _year_path(self, ticker: str, year: int) -> Path:
+        return self.ticker_dir(ticker) / f"{year}.parquet"
+
+    def invalidate(self, ticker: str | None = None) -> None:
+        import shutil
+
+        targets = [self.ticker_dir(ticker)] if ticker else [p for p in self.root.glob("*") if p.is_dir()]
+        for path in targets:
+            shutil.rmtree(path, ignore_errors=True)
+
+    # ---------------- leitura / escrita ----------------
+    def _read_years(self, ticker: str, start: date, end: date) -> pd.DataFrame:
+        last = end - timedelta(days=1)
+        frames = [
+            pd.read_parquet(path)
+            for year in range(start.year, last.year + 1)
+            if (path := self._year_path(ticker, year)).exists()
+        ]
+        if not frames:
+            return empty_price_frame()
+        return clip_frame(pd.concat(frames, ignore_index=True), start, end)
+
+    def _write_years(self, ticker: str, df: pd.DataFrame) -> None:
+        folder = self.ticker_dir(ticker)
+        folder.mkdir(parents=True, exist_ok=True)
+        df = df[FRAME_COLUMNS]
+        for year, part in df.groupby(df["date"].dt.year):
+            path = self._year_path(ticker, int(year))
+            if path.exists():
+                part = pd.concat([pd.read_parquet(path), part], ignore_index=True)
+            part = part.drop_duplicates("date", keep="last").sort_values("date").reset_index(drop=True)
+            tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+            part.to_parquet(tmp, index=False)
+            os.replace(tmp, path)
+
+    def _ticker_lock(self, ticker: str) -> threading.Lock:
+        with self._lock:
+            return self._ticker_locks.setdefault(ticker, threading.Lock())
+
+    # ---------------- PriceSource ----------------
+    def fetch(self, ticker: str, start: date, end: date) -> pd.DataFrame:
+        ticker = ticker.upper()
+        if start >= end:
+            return empty_price_frame()
+        with self._ticker_lock(ticker):
+            covered = self.coverage(ticker)
+            gaps = subtract_intervals(start, end, covered)
+            if gaps:
+                self.misses += 1
+                fetched, done, today = [], [], date.today()
+                for s, e in gaps:
+                    frame = self.inner.fetch(ticker, s, e)
+                    # yfinance devolve frame vazio em falha de rede/rate limit: sem linhas, o
+                    # intervalo só conta como coberto se não tiver dia útil; senão fica em aberto
+                    if not frame.empty:
+                        fetched.append(frame)
+                    elif np.busday_count(s, e) > 0:
+                        continue
+                    done.append((s, min(e, today)))
+                if fetched:
+                    self._write_years(ticker, pd.concat(fetched, ignore_index=True))
+                if done:
+                    self._write_coverage(ticker, merge_intervals(covered + done))
+                logger.info(f"Cache de preços {ticker}: {len(done)}/{len(gaps)} intervalo(s) coberto(s) "
+                            f"com {self.inner!r}")
+            else:
+                self.hits += 1
+            return self._read_years(ticker, start, end)
+
+    def __repr__(self) -> str:
+        return f"CachedPriceSource({self.inner!r}, {str(self.root)!r})"
@@ -0,0 +1,40 @@
+from __future__ import annotations
+from functools import lru_cache
+
+from ftc4.common.config import settings
+from ftc4.data_pipeline.sources.base import PriceSource
+
+
+def get_price_source(name: str | None = None, cache: bool | None = None) -> PriceSource:
+    """
+    Fonte de preços por nome (padrão: settings.PRICE_SOURCE): "yfinance", "local" ou "fake".
+    Com cache (padrão: settings.PRICE_CACHE_ENABLED) a fonte é envolvida pelo cache Parquet,
+    exceto a "fake", que já é local.
+    """
+    name = (name or settings.PRICE_SOURCE).lower()
+    if name == "fake":
+        from ftc4.data_pipeline.sources.fake_source import FakePriceSource
+        return FakePriceSource()
+    return _build_source(name, settings.PRICE_CACHE_ENABLED if cache is None else cache)
+
+
+@lru_cache(maxsize=None)
+def _build_source(name: str, cache: bool) -> PriceSource:
+    # Uma instância por configuração: os locks por ticker do cache valem para o processo todo
+    if name == "yfinance":
+        from ftc4.data_pipeline.sources.yfinance_source import YFinanceSource
+        source: PriceSource = YFinanceSource()
+    elif name == "local":
+        from ftc4.data_pipeline.sources.local_source import LocalDirectorySource
+        source = LocalDirectorySource(settings.PRICE_LOCAL_DIR)
+    else:
+        raise ValueError(f"Fonte de preços desconhecida: {name}")
+
+    if cache:
+        from ftc4.data_pipeline.sources.cache import CachedPriceSource
+        source = CachedPriceSource(source, settings.PRICE_CACHE_DIR / source.name)
+    return source
+
+
+# Compatível com FetchFn: toda PriceSource é chamável como (ticker, start, end)
+get_price_fetcher = get_price_source
@@ -0,0 +1,69 @@
+from __future__ import annotations
+import time
+import zlib
+from collections import Counter
+
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from ftc4.data_pipeline.sources.base import PriceSource, clip_frame
+from ftc4.data_pipeline.validation.stock_market_prices import normalize_price_frame
+
+
+def synthetic_ohlcv(ticker: str, start, end, seed: int = 0) -> pd.DataFrame:
+    """
+    OHLCV sintético e determinístico (passeio aleatório geométrico em dias úteis [start, end)).
+    O mesmo ticker/seed gera sempre os mesmos valores para a mesma data, então janelas
+    sobrepostas são consistentes entre si.
+    """
+    days = pd.bdate_range(start, end, inclusive="left")
+    if days.empty:
+        return pd.DataFrame(columns=["Date", "Open", "High", "Low", "Close", "Volume"])
+
+    # série "global" do ticker a partir de 2000-01-03, fatiada no período pedido
+    origin = np.datetime64("2000-01-03")
+    offsets = np.busday_count(origin, days.values.astype("datetime64[D]"))
+    n = int(offsets.max()) + 1
+    # um gerador por componente: o prefixo de cada sequência não depende de `n`
+    key = zlib.crc32(ticker.upper().encode())
+    r_ret, r_open, r_spread, r_vol = (
+        np.random.default_rng(s) for s in np.random.SeedSequence([key, seed]).spawn(4)
+    )
+    base = 20 + key % 200
+    close_all = base * np.exp(np.cumsum(r_ret.normal(0.0003, 0.02, n)))
+    spread = np.abs(r_spread.normal(0, 0.01, (n, 2)))
+    volume_all = r_vol.integers(10_000, 5_000_000, n)
+
+    close = close_all[offsets]
+    open_ = close * (1 + r_open.normal(0, 0.005, n)[offsets])
+    high = np.maximum(open_, close) * (1 + spread[offsets, 0])
+    low = np.minimum(open_, close) * (1 - spread[offsets, 1])
+    return pd.DataFrame({
+        "Date": days, "Open": open_, "High": high, "Low": low, "Close": close, "Volume": volume_all[offsets],
+    })
+
+
+class FakePriceSource(PriceSource):
+    """
+    Fonte offline e determinística para testes e benchmarks sem rede.
+    Permite simular latência e falhas transitórias.
+    """
+
+    name = "fake"
+
+    def __init__(self, seed: int = 0, latency_s: float = 0.0, fail_times: int = 0):
+        self.seed = seed
+        self.latency_s = latency_s
+        self.fail_times = fail_times      # nº de falhas por ticker antes de responder
+        self.calls: Counter = Counter()
+
+    def fetch(self, ticker: str, start: date, end: date) -> pd.DataFrame:
+        self.calls[ticker] += 1
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        if self.calls[ticker] <= self.fail_times:
+            raise ConnectionError(f"Falha simulada para {ticker}")
+        df = synthetic_ohlcv(ticker, start, end, seed=self.seed)
+        return clip_frame(normalize_price_frame(df, ticker=ticker), start, end)
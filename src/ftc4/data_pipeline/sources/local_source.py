@@ -0,0 +1,41 @@
+from __future__ import annotations
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+
+from ftc4.data_pipeline.sources.base import PriceSource, clip_frame, empty_price_frame
+from ftc4.data_pipeline.validation.stock_market_prices import normalize_price_frame
+
+
+class LocalDirectorySource(PriceSource):
+    """
+    Lê preços de um diretório local, um arquivo por ticker: `<root>/<TICKER>.parquet`
+    ou `<root>/<TICKER>.csv` (colunas no formato do yfinance ou já normalizadas).
+    Útil para replay offline e testes.
+    """
+
+    name = "local"
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    def path_for(self, ticker: str) -> Path | None:
+        for suffix in (".parquet", ".csv"):
+            path = self.root / f"{ticker.upper()}{suffix}"
+            if path.exists():
+                return path
+        return None
+
+    def fetch(self, ticker: str, start: date, end: date) -> pd.DataFrame:
+        path = self.path_for(ticker)
+        if path is None:
+            return empty_price_frame()
+        if path.suffix == ".parquet":
+            df = pd.read_parquet(path)
+        else:
+            df = pd.read_csv(path)
+        return clip_frame(normalize_price_frame(df, ticker=ticker.upper()), start, end)
+
+    def __repr__(self) -> str:
+        return f"LocalDirectorySource({str(self.root)!r})"
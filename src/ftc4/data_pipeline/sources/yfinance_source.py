@@ -1,9 +1,32 @@
-import yfinance as yf
-from datetime import datetime
+from __future__ import annotations
+from datetime import date, datetime
+
+import pandas as pd
+
+from ftc4.data_pipeline.sources.base import PriceSource, clip_frame, empty_price_frame
+from ftc4.data_pipeline.validation.stock_market_prices import normalize_price_frame
+
+
+class YFinanceSource(PriceSource):
+    """Preços ajustados (auto_adjust) do Yahoo Finance."""
+
+    name = "yfinance"
+
+    def fetch(self, ticker: str, start: date, end: date) -> pd.DataFrame:
+        import yfinance as yf
+
+        df = yf.download(ticker, start=start.isoformat(), end=end.isoformat(),
+                         auto_adjust=True, progress=False)
+        if df is None or df.empty:
+            return empty_price_frame()
+        # Um ticker só: seleciona o nível em vez de empilhar (stack) o frame inteiro
+        if isinstance(df.columns, pd.MultiIndex):
+            df = df.xs(ticker, axis=1, level=-1, drop_level=True)
+        df = df.rename_axis("Date").reset_index()
+        return clip_frame(normalize_price_frame(df, ticker=ticker), start, end)
+
 
 def fetch_stock_market_prices(ticker, start_date, end_date=None):
     if end_date is None:
         end_date = datetime.today().strftime('%Y-%m-%d')
-    df = yf.download(ticker, start=start_date, end=end_date, auto_adjust=True)
-    df = df.stack(level=1, future_stack=True).reset_index()
-    return df
+    return YFinanceSource()(ticker, start_date, end_date)
@@ -0,0 +1,208 @@
+from __future__ import annotations
+import asyncio
+import csv
+import json
+from dataclasses import asdict, dataclass, field
+from typing import AsyncIterable, Callable, Iterable, Iterator, Literal
+
+from sqlalchemy.orm import Session
+
+from ftc4.common.config import settings
+from ftc4.common.lazy import lazy_module
+from ftc4.data_pipeline.crud.stock_market_prices import upsert_price_frame
+from ftc4.data_pipeline.ingest import IngestError
+from ftc4.data_pipeline.validation.stock_market_prices import normalize_price_frame, validate_price_frame
+
+pd = lazy_module("pandas")
+
+StreamFormat = Literal["ndjson", "csv"]
+
+# Linha que não pôde ser lida como registro (JSON inválido, CSV com nº de campos errado, ...)
+INVALID_RECORD = "registro_invalido"
+
+
+class LineTooLongError(IngestError):
+    """Linha maior que o limite: o corpo não tem quebras de linha onde deveria."""
+    status_code = 413
+
+
+class StreamIngestError(IngestError):
+    """Falha no meio do stream; `report` traz os chunks já confirmados."""
+    status_code = 500
+
+    def __init__(self, message: str, report: "StreamIngestReport", status_code: int | None = None):
+        super().__init__(message)
+        self.report = report
+        if status_code is not None:
+            self.status_code = status_code
+
+
+@dataclass
+class ChunkReport:
+    index: int
+    received: int = 0
+    accepted: int = 0
+    inserted: int = 0
+    updated: int = 0
+    skipped: int = 0
+    rejected: dict[str, int] = field(default_factory=dict)  # regra -> nº de linhas
+
+
+@dataclass
+class StreamIngestReport:
+    format: str
+    chunks: list[ChunkReport] = field(default_factory=list)
+
+    def as_dict(self) -> dict:
+        totals = {k: sum(getattr(c, k) for c in self.chunks)
+                  for k in ("received", "accepted", "inserted", "updated", "skipped")}
+        return {
+            "format": self.format,
+            **totals,
+            "rejected": totals["received"] - totals["accepted"],
+            "chunks": [asdict(c) for c in self.chunks],
+        }
+
+
+class RecordParser:
+    """
+    Converte o corpo da requisição (bytes, em pedaços de qualquer tamanho) em registros,
+    uma linha por vez: só a linha incompleta do fim de cada pedaço fica em buffer.
+    Linhas inválidas viram None (contadas como rejeitadas, sem derrubar o lote).
+    Uma linha incompleta maior que `max_line_bytes` levanta LineTooLongError, para o
+    buffer não crescer sem limite com um corpo sem quebras de linha.
+    CSV: a primeira linha é o cabeçalho; campos com quebra de linha não são suportados.
+    """
+
+    def __init__(self, fmt: StreamFormat = "ndjson", max_line_bytes: int | None = None):
+        if fmt not in ("ndjson", "csv"):
+            raise ValueError(f"Formato não suportado: {fmt}")
+        self.fmt = fmt
+        self.max_line_bytes = max_line_bytes or settings.INGEST_MAX_LINE_BYTES
+        self._buffer = b""
+        self._header: list[str] | None = None
+
+    def feed(self, data: bytes) -> Iterator[dict | None]:
+        self._buffer += data
+        *lines, self._buffer = self._buffer.split(b"\n")
+        if len(self._buffer) > self.max_line_bytes:
+            raise LineTooLongError(f"Linha com mais de {self.max_line_bytes} bytes sem quebra de linha")
+        for line in lines:
+            yield from self._parse_line(line)
+
+    def close(self) -> Iterator[dict | None]:
+        line, self._buffer = self._buffer, b""
+        yield from self._parse_line(line)
+
+    def _parse_line(self, raw: bytes) -> Iterator[dict | None]:
+        line = raw.decode("utf-8", errors="replace").strip()
+        if not line:
+            return
+        if self.fmt == "ndjson":
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                yield None
+                return
+            yield record if isinstance(record, dict) else None
+            return
+
+        values = next(csv.reader([line]))
+        if self._header is None:
+            self._header = [v.strip().lower() for v in values]
+            return
+        yield dict(zip(self._header, values)) if len(values) == len(self._header) else None
+
+
+def ingest_chunk(db: Session, records: list[dict | None], index: int) -> ChunkReport:
+    """Normaliza, valida (vetorizado) e faz upsert de um chunk numa única transação."""
+    report = ChunkReport(index=index, received=len(records))
+    valid = [r for r in records if r is not None]
+    if len(valid) < len(records):
+        report.rejected[INVALID_RECORD] = len(records) - len(valid)
+
+    if valid:
+        validation = validate_price_frame(normalize_price_frame(pd.DataFrame.from_records(valid)))
+        for rule, n in validation.rejected.items():
+            if rule != "total":
+                report.rejected[rule] = report.rejected.get(rule, 0) + n
+        if not validation.frame.empty:
+            upsert = upsert_price_frame(db, validation.frame, chunk_size=len(validation.frame))
+            report.accepted = len(validation.frame)
+            report.inserted, report.updated, report.skipped = upsert.inserted, upsert.updated, upsert.skipped
+    return report
+
+
+def iter_record_chunks(parser: RecordParser, data: Iterable[bytes], chunk_size: int) -> Iterator[list[dict | None]]:
+    pending: list[dict | None] = []
+    for piece in data:
+        for record in parser.feed(piece):
+            pending.append(record)
+            if len(pending) == chunk_size:
+                yield pending
+                pending = []
+    pending.extend(parser.close())
+    if pending:
+        yield pending
+
+
+def ingest_stream(db: Session, data: Iterable[bytes], fmt: StreamFormat = "ndjson",
+                  chunk_size: int | None = None) -> StreamIngestReport:
+    """
+    Ingestão incremental de NDJSON/CSV: memória limitada a um chunk de registros,
+    independente do tamanho total. Cada chunk é validado e confirmado separadamente.
+    """
+    chunk_size = chunk_size or settings.INGEST_CHUNK_SIZE
+    report = StreamIngestReport(format=fmt)
+    try:
+        for records in iter_record_chunks(RecordParser(fmt), data, chunk_size):
+            _ingest_into(report, db, records)
+    except LineTooLongError as e:
+        raise _line_too_long(e, report) from e
+    return report
+
+
+async def ingest_stream_async(session_factory: Callable[[], Session], data: AsyncIterable[bytes],
+                              fmt: StreamFormat = "ndjson", chunk_size: int | None = None) -> StreamIngestReport:
+    """
+    Versão para o corpo de uma requisição (ex.: `request.stream()`): a leitura/parsing
+    roda no event loop e cada chunk completo vai para uma thread (SQLite é bloqueante),
+    com uma sessão própria aberta lá (`session_factory`): sessões não são thread-safe,
+    e a escopada por thread da requisição seria compartilhada entre streams.
+    """
+    chunk_size = chunk_size or settings.INGEST_CHUNK_SIZE
+    parser = RecordParser(fmt)
+    report = StreamIngestReport(format=fmt)
+    pending: list[dict | None] = []
+    try:
+        async for piece in data:
+            for record in parser.feed(piece):
+                pending.append(record)
+                if len(pending) == chunk_size:
+                    await asyncio.to_thread(_ingest_in_session, report, session_factory, pending)
+                    pending = []
+    except LineTooLongError as e:
+        raise _line_too_long(e, report) from e
+    pending.extend(parser.close())
+    if pending:
+        await asyncio.to_thread(_ingest_in_session, report, session_factory, pending)
+    return report
+
+
+def _line_too_long(e: LineTooLongError, report: StreamIngestReport) -> StreamIngestError:
+    return StreamIngestError(f"{e} ({len(report.chunks)} chunk(s) já confirmados)", report,
+                             status_code=e.status_code)
+
+
+def _ingest_in_session(report: StreamIngestReport, session_factory: Callable[[], Session],
+                       records: list[dict | None]) -> None:
+    with session_factory() as db:
+        _ingest_into(report, db, records)
+
+
+def _ingest_into(report: StreamIngestReport, db: Session, records: list[dict | None]) -> None:
+    index = len(report.chunks)
+    try:
+        report.chunks.append(ingest_chunk(db, records, index))
+    except Exception as e:
+        raise StreamIngestError(f"Falha no chunk {index} ({index} chunk(s) já confirmados): {e}", report) from e
@@ -0,0 +1,87 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+import numpy as np
+
+from ftc4.common.lazy import lazy_module
+
+pd = lazy_module("pandas")   # import real no primeiro uso (ver ftc4.common.lazy)
+
+PRICE_FIELDS = ["open", "high", "low", "close"]
+FRAME_COLUMNS = ["date", "ticker", "open", "high", "low", "close", "volume"]
+TICKER_MAX_LEN = 16  # mesmo limite de StockPriceBase / coluna ticker
+
+
+@dataclass
+class FrameValidation:
+    frame: pd.DataFrame                                  # linhas válidas, colunas FRAME_COLUMNS
+    rejected: dict[str, int] = field(default_factory=dict)  # regra -> nº de linhas que a violaram
+
+    @property
+    def n_rejected(self) -> int:
+        return self.rejected.get("total", 0)
+
+
+def normalize_price_frame(df: pd.DataFrame, ticker: str | None = None) -> pd.DataFrame:
+    """
+    Padroniza nomes de colunas (date, open, high, low, close, volume, ticker) e tipos.
+    Valores não convertíveis viram NaN/NaT e são tratados na validação.
+    """
+    # se vier indexado por data, traz pro corpo
+    if str(df.index.name).lower() == "date":
+        df = df.reset_index()
+
+    # yfinance usa "Date", "Close", ...; algumas versões trazem em minúsculas
+    df = df.rename(columns=lambda c: str(c).lower())
+
+    out = pd.DataFrame(index=df.index)
+    out["date"] = pd.to_datetime(df["date"], errors="coerce") if "date" in df.columns else pd.NaT
+    if ticker is not None:
+        out["ticker"] = ticker
+    else:
+        out["ticker"] = df["ticker"] if "ticker" in df.columns else ""
+    for c in PRICE_FIELDS:
+        out[c] = pd.to_numeric(df[c], errors="coerce") if c in df.columns else np.nan
+    # volume pode ser float/NaN: normaliza pra int
+    volume = pd.to_numeric(df["volume"], errors="coerce") if "volume" in df.columns else 0
+    out["volume"] = pd.Series(volume, index=df.index).fillna(0).astype("int64")
+    return out
+
+
+def missing_columns(df: pd.DataFrame) -> list[str]:
+    """Colunas obrigatórias ausentes (após normalizar nomes)."""
+    cols = {str(c).lower() for c in df.columns} | {str(df.index.name).lower()}
+    return [c for c in ["date", "close", "high", "low", "open"] if c not in cols]
+
+
+def validate_price_frame(df: pd.DataFrame) -> FrameValidation:
+    """
+    Aplica as regras de StockPriceBase como máscaras vetorizadas sobre o frame inteiro:
+    preços > 0, high >= low, low <= open/close <= high, volume >= 0 e ticker 1..16 caracteres
+    (normalizado com strip/upper). Rejeições são contadas por regra (uma linha pode violar
+    várias); o frame retornado contém só as linhas válidas, ordenadas por data.
+    """
+    ticker = df["ticker"].astype(str).str.strip().str.upper()
+    o, h, l, c = (df[col].to_numpy(dtype=float) for col in ("open", "high", "low", "close"))
+
+    # NaN falha em qualquer comparação; é contado só como "valores_ausentes"
+    missing = df["date"].isna().to_numpy() | np.isnan(np.c_[o, h, l, c]).any(axis=1)
+    with np.errstate(invalid="ignore"):
+        masks = {
+            "valores_ausentes": missing,
+            "preco_nao_positivo": ~missing & ~((o > 0) & (h > 0) & (l > 0) & (c > 0)),
+            "high_menor_que_low": h < l,
+            "low_maior_que_open_close": (l > o) | (l > c),
+            "high_menor_que_open_close": (h < o) | (h < c),
+            "volume_negativo": df["volume"].to_numpy() < 0,
+            "ticker_invalido": ~ticker.str.len().between(1, TICKER_MAX_LEN).to_numpy(),
+        }
+
+    bad = np.logical_or.reduce(list(masks.values()))
+    rejected = {rule: int(m.sum()) for rule, m in masks.items() if m.any()}
+    if bad.any():
+        rejected["total"] = int(bad.sum())
+
+    clean = df.loc[~bad, FRAME_COLUMNS].copy()
+    clean["ticker"] = ticker[~bad]
+    clean = clean.sort_values("date", kind="stable")
+    return FrameValidation(frame=clean, rejected=rejected)
@@ -0,0 +1,145 @@
+from __future__ import annotations
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import date
+
+from sqlalchemy.orm import Session
+
+from ftc4.common.config import settings
+from ftc4.common.lazy import lazy_module
+from ftc4.common.logger import get_logger
+from ftc4.data_pipeline.crud.stock_market_prices import UpsertResult, get_watermarks, upsert_price_frame
+from ftc4.data_pipeline.ingest import FetchFn, SyncMode, fetch_ranges, plan_fetch_ranges, prepare_frames
+
+pd = lazy_module("pandas")
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class WatchlistReport:
+    tickers: int = 0
+    fetched: list[str] = field(default_factory=list)
+    up_to_date: list[str] = field(default_factory=list)
+    empty: list[str] = field(default_factory=list)
+    failed: dict[str, str] = field(default_factory=dict)
+    rows: int = 0
+    rejected: int = 0
+    retries: int = 0
+    commits: int = 0
+    upsert: UpsertResult = field(default_factory=UpsertResult)
+    elapsed_s: float = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "tickers": self.tickers,
+            "fetched": len(self.fetched),
+            "up_to_date": len(self.up_to_date),
+            "empty": len(self.empty),
+            "failed": self.failed,
+            "rows": self.rows,
+            "rejected": self.rejected,
+            "retries": self.retries,
+            "commits": self.commits,
+            **self.upsert.as_dict(),
+            "elapsed_s": round(self.elapsed_s, 3),
+            "rows_per_s": round(self.rows / self.elapsed_s, 1) if self.elapsed_s else None,
+        }
+
+
+def _fetch_with_retry(fetch: FetchFn, ticker: str, ranges, retries: int, backoff_s: float):
+    """Baixa e valida um ticker, com backoff exponencial (+ jitter) em caso de exceção."""
+    attempt = 0
+    while True:
+        try:
+            frames = fetch_ranges(fetch, ticker, ranges)
+            return (prepare_frames(ticker, frames) if frames else None), attempt
+        except Exception:
+            if attempt >= retries:
+                raise
+            time.sleep(backoff_s * 2 ** attempt + random.uniform(0, backoff_s))
+            attempt += 1
+
+
+def sync_watchlist(
+    db: Session,
+    tickers: list[str],
+    start: date,
+    end: date | None = None,
+    fetch: FetchFn | None = None,
+    mode: SyncMode = "delta",
+    max_concurrency: int | None = None,
+    retries: int | None = None,
+    backoff_s: float | None = None,
+    batch_rows: int | None = None,
+) -> WatchlistReport:
+    """
+    Ingestão de vários tickers: downloads em paralelo (limitados por `max_concurrency`)
+    e um único escritor (esta thread) que acumula os frames validados e grava
+    em transações de ~`batch_rows` linhas.
+    """
+    if fetch is None:
+        from ftc4.data_pipeline.sources.factory import get_price_fetcher
+        fetch = get_price_fetcher()
+    max_concurrency = max_concurrency or settings.WATCHLIST_MAX_CONCURRENCY
+    retries = settings.WATCHLIST_RETRIES if retries is None else retries
+    backoff_s = settings.WATCHLIST_BACKOFF_S if backoff_s is None else backoff_s
+    batch_rows = batch_rows or settings.INGEST_CHUNK_SIZE
+
+    t0 = time.perf_counter()
+    end = end or date.today()
+    tickers = list(dict.fromkeys(t.strip().upper() for t in tickers if t.strip()))
+    report = WatchlistReport(tickers=len(tickers))
+
+    # planejamento: watermarks de todos os tickers em uma consulta
+    watermarks = get_watermarks(db, tickers) if mode == "delta" else {}
+    plans = {t: plan_fetch_ranges(watermarks.get(t), start, end) for t in tickers}
+    report.up_to_date = [t for t, r in plans.items() if not r]
+    db.commit()   # libera o escritor enquanto os downloads rodam (ver ingest_ticker)
+
+    pending: list[pd.DataFrame] = []
+    pending_rows = 0
+
+    def flush():
+        nonlocal pending, pending_rows
+        if not pending:
+            return
+        frame = pd.concat(pending, ignore_index=True)
+        report.upsert += upsert_price_frame(db, frame, chunk_size=max(batch_rows, len(frame)), commit_per_chunk=False)
+        report.commits += 1
+        pending, pending_rows = [], 0
+
+    with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="watchlist-fetch") as pool:
+        futures = {
+            pool.submit(_fetch_with_retry, fetch, t, ranges, retries, backoff_s): t
+            for t, ranges in plans.items() if ranges
+        }
+        for future in as_completed(futures):
+            ticker = futures[future]
+            try:
+                validation, attempts = future.result()
+            except Exception as e:
+                report.failed[ticker] = f"{type(e).__name__}: {e}"
+                logger.error(f"Watchlist: falha ao coletar {ticker}: {e}")
+                continue
+            report.retries += attempts
+            if validation is None or validation.frame.empty:
+                report.empty.append(ticker)
+                continue
+            report.fetched.append(ticker)
+            report.rows += len(validation.frame)
+            report.rejected += validation.n_rejected
+            pending.append(validation.frame)
+            pending_rows += len(validation.frame)
+            if pending_rows >= batch_rows:
+                flush()
+        flush()
+
+    report.elapsed_s = time.perf_counter() - t0
+    logger.info(
+        f"Watchlist: {len(report.fetched)} coletados, {len(report.up_to_date)} já atualizados, "
+        f"{len(report.failed)} falhas, {report.rows} linhas em {report.elapsed_s:.2f}s"
+    )
+    return report
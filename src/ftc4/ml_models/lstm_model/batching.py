@@ -0,0 +1,125 @@
+from __future__ import annotations
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Hashable
+
+import numpy as np
+
+from ftc4.common.config import settings
+from ftc4.common.lazy import lazy_module
+from ftc4.ml_models.lstm_model.executor import InferenceExecutor, inference_executor
+
+if TYPE_CHECKING:
+    from ftc4.ml_models.lstm_model.store import ArtifactKey
+
+# torch só é importado no primeiro lote (ou no warm-up)
+predict = lazy_module("ftc4.ml_models.lstm_model.predict")
+
+
+@dataclass
+class _Pending:
+    key: ArtifactKey
+    mode: str | None
+    items: list[tuple[np.ndarray, int, float, asyncio.Future]] = field(default_factory=list)
+    timer: asyncio.TimerHandle | None = None
+
+
+class MicroBatcher:
+    """
+    Agrupa previsões concorrentes que usam o mesmo modelo (mesma versão e modo):
+    o grupo é disparado ao atingir `max_batch_size` ou após `max_wait_ms` desde
+    o primeiro pedido, e roda um forward por passo recursivo para todos
+    (via forecast_windows, no executor de inferência). Pedidos com `steps` diferentes
+    entram no mesmo grupo: roda-se o maior e cada um recebe o prefixo que pediu.
+    Deve ser usado a partir do event loop (rotas async).
+    """
+
+    def __init__(self, max_batch_size: int = 32, max_wait_ms: float = 5.0,
+                 executor: InferenceExecutor = inference_executor, wait_window: int = 1024):
+        self.max_batch_size = max_batch_size
+        self.max_wait_s = max_wait_ms / 1000
+        self.executor = executor
+        self._pending: dict[Hashable, _Pending] = {}
+        # o event loop só guarda referências fracas às tasks: sem esta, um lote em voo
+        # pode ser coletado e os pedidos dele ficam esperando para sempre
+        self._tasks: set[asyncio.Task] = set()
+        self._waits: deque[float] = deque(maxlen=wait_window)   # espera na fila (s), janela recente
+        self.requests = 0
+        self.batches = 0
+        self.batched_requests = 0
+        self.full_batches = 0
+
+    async def predict(self, key: ArtifactKey, series: np.ndarray, n_steps: int, mode: str | None = None) -> np.ndarray:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        group = (key, mode)
+        pending = self._pending.get(group)
+        if pending is None:
+            pending = self._pending[group] = _Pending(key, mode)
+            pending.timer = loop.call_later(self.max_wait_s, self._flush, group)
+        pending.items.append((series, n_steps, time.perf_counter(), future))
+        self.requests += 1
+        if len(pending.items) >= self.max_batch_size:
+            self._flush(group)
+        return await future
+
+    def _flush(self, group: Hashable) -> None:
+        pending = self._pending.pop(group, None)
+        if pending is None:
+            return
+        if pending.timer is not None:
+            pending.timer.cancel()
+        now = time.perf_counter()
+        self._waits.extend(now - t for _, _, t, _ in pending.items)
+        self.batches += 1
+        self.batched_requests += len(pending.items)
+        self.full_batches += len(pending.items) >= self.max_batch_size
+        task = asyncio.get_running_loop().create_task(self._run(pending))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, pending: _Pending) -> None:
+        futures = [f for *_, f in pending.items]
+        steps = max(n for _, n, _, _ in pending.items)
+        try:
+            preds = await self.executor.run(
+                predict.forecast_windows, pending.key, [s for s, *_ in pending.items], steps, pending.mode,
+            )
+        except Exception as e:
+            for f in futures:
+                if not f.done():
+                    f.set_exception(e)
+            return
+        for (_, n, _, f), row in zip(pending.items, preds):
+            if not f.done():   # cliente pode ter desistido (cancelamento)
+                f.set_result(row[:n])
+
+    async def shutdown(self) -> None:
+        """Dispara os grupos ainda na janela de espera e aguarda os lotes em voo."""
+        for group in list(self._pending):
+            self._flush(group)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        waits_ms = np.array(self._waits) * 1000 if self._waits else np.zeros(0)
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_s * 1000,
+            "requests": self.requests,
+            "batches": self.batches,
+            "avg_batch_size": self.batched_requests / self.batches if self.batches else 0.0,
+            "fill_rate": self.batched_requests / (self.batches * self.max_batch_size) if self.batches else 0.0,
+            "full_batches": self.full_batches,
+            "queue_wait_ms_avg": round(float(waits_ms.mean()), 3) if len(waits_ms) else 0.0,
+            "queue_wait_ms_p95": round(float(np.percentile(waits_ms, 95)), 3) if len(waits_ms) else 0.0,
+            "queue_wait_ms_max": round(float(waits_ms.max()), 3) if len(waits_ms) else 0.0,
+        }
+
+
+predict_batcher = MicroBatcher(
+    max_batch_size=settings.PREDICT_MAX_BATCH_SIZE,
+    max_wait_ms=settings.PREDICT_MAX_WAIT_MS,
+)
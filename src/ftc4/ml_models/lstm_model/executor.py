@@ -0,0 +1,92 @@
+from __future__ import annotations
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from ftc4.common.config import settings
+from ftc4.common.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class InferenceBusy(Exception):
+    """Limite de inferências pendentes atingido."""
+
+
+def _init_worker(torch_threads: int) -> None:
+    import torch
+    # Vale para as regiões paralelas disparadas por esta thread: K workers x T threads
+    torch.set_num_threads(torch_threads)
+
+
+class InferenceExecutor:
+    """
+    Pool dedicado e limitado para trabalho de torch (previsões), separado do threadpool
+    padrão do FastAPI/AnyIO: rotas leves (consultas, status de jobs) não esperam atrás
+    de forwards do LSTM, e cada worker usa só `torch_threads` threads intra-op.
+    Acima de `max_pending` chamadas em andamento, `run` levanta InferenceBusy.
+    """
+
+    def __init__(self, max_workers: int = 2, torch_threads: int = 1, max_pending: int = 64):
+        self.max_workers = max_workers
+        self.torch_threads = torch_threads
+        self.max_pending = max_pending
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.rejected = 0
+        self.busy_s = 0.0
+
+    def _ensure_started(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="lstm-inference",
+                    initializer=_init_worker, initargs=(self.torch_threads,),
+                )
+            return self._executor
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise InferenceBusy(f"Limite de {self.max_pending} inferências pendentes atingido")
+        try:
+            executor = self._ensure_started()
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(executor, self._timed, fn, args, kwargs)
+        finally:
+            self._slots.release()
+
+    def _timed(self, fn: Callable[..., Any], args: tuple, kwargs: dict) -> Any:
+        t0 = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self.busy_s += time.perf_counter() - t0
+            self.completed += 1
+
+    def stats(self) -> dict:
+        return {
+            "max_workers": self.max_workers,
+            "torch_threads": self.torch_threads,
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "busy_s": round(self.busy_s, 6),
+        }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+
+
+inference_executor = InferenceExecutor(
+    max_workers=settings.INFERENCE_MAX_WORKERS,
+    torch_threads=settings.INFERENCE_TORCH_THREADS,
+    max_pending=settings.INFERENCE_MAX_PENDING,
+)
@@ -0,0 +1,111 @@
+from __future__ import annotations
+import time
+import warnings
+from typing import Any
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from ftc4.common.config import settings
+from ftc4.common.logger import get_logger
+from ftc4.ml_models.lstm_model.predict import _window_forecast
+from ftc4.ml_models.lstm_model.store import VARIANT_FILES, ArtifactKey, artifact_store
+
+logger = get_logger(__name__)
+
+
+def quantize_int8(model: nn.Module) -> nn.Module:
+    """Quantização dinâmica int8 de LSTM/Linear (pesos int8, ativações quantizadas por chamada)."""
+    with warnings.catch_warnings():
+        # torch.ao.quantization está marcado como depreciado em favor do torchao (dependência extra)
+        warnings.simplefilter("ignore")
+        return torch.ao.quantization.quantize_dynamic(model, {nn.LSTM, nn.Linear}, dtype=torch.qint8)
+
+
+def compile_variants(model: nn.Module, variants: tuple[str, ...] = tuple(VARIANT_FILES)) -> dict[str, torch.jit.ScriptModule]:
+    """TorchScript (fp32) e/ou int8 + TorchScript de uma cópia do modelo em CPU/eval."""
+    model = model.cpu().eval()
+    compiled = {}
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        for variant in variants:
+            if variant == "torchscript":
+                compiled[variant] = torch.jit.script(model)
+            elif variant == "int8":
+                compiled[variant] = torch.jit.script(quantize_int8(model))
+            else:
+                raise ValueError(f"Variante de exportação inválida: {variant}. Use uma de {tuple(VARIANT_FILES)}")
+    return compiled
+
+
+def _latency_ms(model: nn.Module, window: torch.Tensor, steps: int, reps: int) -> dict[str, float]:
+    for _ in range(2):   # aquecimento (otimizações do TorchScript no primeiro uso)
+        _window_forecast(model, window, steps)
+    samples = []
+    for _ in range(reps):
+        t0 = time.perf_counter()
+        _window_forecast(model, window, steps)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return {"p50": round(float(np.percentile(samples, 50)), 4), "p95": round(float(np.percentile(samples, 95)), 4)}
+
+
+@torch.no_grad()
+def build_report(eager: nn.Module, compiled: dict[str, nn.Module], pp: Any, series: np.ndarray,
+                 steps: int = 5, n_windows: int = 256, batch_sizes: tuple[int, ...] = (1, 32),
+                 reps: int = 20) -> dict:
+    """
+    Compara cada variante com o eager nas últimas `n_windows` janelas da série:
+      - acurácia (escala original): MAE de um passo contra o real, diferença de MAE,
+        diferença máxima/média das previsões e da previsão recursiva de `steps` passos;
+      - latência da previsão recursiva (`steps` passos, modo window) por tamanho de lote.
+    """
+    eager = eager.cpu().eval()
+    X, y = pp.build_windows(pp.transform(np.asarray(series, dtype=float)))
+    windows = torch.tensor(X[-n_windows:], dtype=torch.float32)
+    actual = pp.inverse_transform(y[-n_windows:])
+    models = {"eager": eager, **compiled}
+
+    one_step = {name: pp.inverse_transform(m(windows).numpy()) for name, m in models.items()}
+    recursive = {name: pp.inverse_transform(_window_forecast(m, windows[-1:], steps).numpy())
+                 for name, m in models.items()}
+    report: dict = {"n_windows": len(windows), "steps": steps, "variants": {}}
+    eager_mae = float(np.abs(one_step["eager"] - actual).mean())
+    for name, model in models.items():
+        mae = float(np.abs(one_step[name] - actual).mean())
+        delta = np.abs(one_step[name] - one_step["eager"])
+        entry = {
+            "mae": round(mae, 6),
+            "mae_delta": round(mae - eager_mae, 6),
+            "max_abs_delta": round(float(delta.max()), 6),
+            "mean_abs_delta": round(float(delta.mean()), 6),
+            "recursive_max_abs_delta": round(float(np.abs(recursive[name] - recursive["eager"]).max()), 6),
+            "latency_ms": {},
+        }
+        for bs in batch_sizes:
+            window = windows[-1:].expand(bs, -1, -1).contiguous()
+            entry["latency_ms"][f"batch_{bs}"] = _latency_ms(model, window, steps, reps)
+        report["variants"][name] = entry
+
+    base = report["variants"]["eager"]["latency_ms"]
+    for entry in report["variants"].values():
+        entry["speedup_p50"] = {b: round(base[b]["p50"] / lat["p50"], 2) for b, lat in entry["latency_ms"].items()}
+    return report
+
+
+def export_variants(model: nn.Module, pp: Any, key: ArtifactKey, series: np.ndarray,
+                    variants: tuple[str, ...] | None = None) -> dict | None:
+    """Exporta as variantes na versão `key` e grava o relatório de acurácia/latência ao lado."""
+    variants = settings.LSTM_EXPORT_VARIANTS if variants is None else variants
+    if not variants:
+        return None
+    t0 = time.perf_counter()
+    compiled = compile_variants(model, variants)
+    for variant, module in compiled.items():
+        artifact_store.save_variant(key, variant, module)
+    report = build_report(model, compiled, pp, series, reps=settings.LSTM_EXPORT_REPORT_REPS)
+    report["export_s"] = round(time.perf_counter() - t0, 3)
+    artifact_store.save_export_report(key, report)
+    summary = {v: (e["mae_delta"], e["speedup_p50"]["batch_1"]) for v, e in report["variants"].items() if v != "eager"}
+    logger.info(f"Variantes exportadas para {key} (mae_delta, speedup lote 1): {summary}")
+    return report
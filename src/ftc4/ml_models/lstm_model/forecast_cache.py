@@ -0,0 +1,116 @@
+from __future__ import annotations
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import TYPE_CHECKING, Hashable, Iterable
+
+import numpy as np
+
+from ftc4.common.config import settings
+from ftc4.data_pipeline.series_cache import on_prices_committed
+
+if TYPE_CHECKING:
+    from ftc4.ml_models.lstm_model.store import ArtifactKey
+
+HIT, MISS = "HIT", "MISS"
+
+
+@dataclass(frozen=True)
+class ForecastKey:
+    ticker: str
+    last_date: date | None      # última data no banco: dado novo muda a chave
+    updated_at: datetime | None # escrita no watermark: correções e escritas de outros processos mudam a chave
+    model: ArtifactKey          # versão ativa do modelo: retreino muda a chave
+    steps: int
+    mode: str | None = None
+
+
+class ForecastCache:
+    """
+    Previsões já calculadas por (ticker, última data + updated_at do watermark, versão
+    do modelo, passos, modo).
+      - TTL por entrada e despejo LRU por número de entradas.
+      - Invalidação explícita por ticker (escrita de preços neste processo) e por slot de
+        modelo (retreino); a chave já muda nos dois casos (inclusive escritas da CLI ou de
+        outro worker), a invalidação só libera as entradas antigas na hora.
+    """
+
+    def __init__(self, max_entries: int = 4096, ttl_s: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._entries: "OrderedDict[ForecastKey, tuple[float, np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: ForecastKey) -> np.ndarray | None:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            stored_at, preds = item
+            if time.monotonic() - stored_at > self.ttl_s:
+                del self._entries[key]
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return preds
+
+    def put(self, key: ForecastKey, preds: np.ndarray) -> None:
+        preds = np.array(preds, dtype=float)
+        preds.flags.writeable = False
+        with self._lock:
+            self._entries[key] = (time.monotonic(), preds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _drop(self, match) -> int:
+        with self._lock:
+            stale = [k for k in self._entries if match(k)]
+            for k in stale:
+                del self._entries[k]
+            self.invalidations += len(stale)
+            return len(stale)
+
+    def invalidate_tickers(self, tickers: Iterable[str]) -> int:
+        tickers = {t.upper() for t in tickers}
+        return self._drop(lambda k: k.ticker in tickers)
+
+    def invalidate_model(self, slot: Hashable) -> int:
+        """Entradas calculadas com qualquer versão do slot (ticker, lookback) do modelo."""
+        return self._drop(lambda k: k.model.slot == slot)
+
+    def clear(self) -> None:
+        self._drop(lambda k: True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+forecast_cache = ForecastCache(
+    max_entries=settings.FORECAST_CACHE_MAX_ENTRIES,
+    ttl_s=settings.FORECAST_CACHE_TTL_S,
+)
+
+# Preços gravados (upsert_prices/insert_many_prices) neste processo invalidam as previsões do ticker
+on_prices_committed(forecast_cache.invalidate_tickers)
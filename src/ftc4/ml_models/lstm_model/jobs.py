@@ -0,0 +1,407 @@
+from __future__ import annotations
+import multiprocessing as mp
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+import numpy as np
+
+from ftc4.common import metrics
+from ftc4.common.config import settings
+from ftc4.common.logger import get_logger
+from ftc4.ml_models.lstm_model.training_metrics import record_epoch
+
+logger = get_logger(__name__)
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = "queued", "running", "succeeded", "failed", "cancelled"
+FINISHED = {SUCCEEDED, FAILED, CANCELLED}
+
+jobs_finished = metrics.counter("lstm_training_jobs_total", "Jobs de treino finalizados", ("status",))
+
+
+# Épocas quando o pedido não informa: treino completo usa esta; fine-tuning, FINETUNE_EPOCHS
+DEFAULT_EPOCHS = 20
+
+
+class JobQueueFull(Exception):
+    """Limite de jobs pendentes atingido."""
+
+
+def resolve_epochs(epochs: int | None, incremental: bool) -> int:
+    """Épocas efetivas do job (as mesmas na chave de deduplicação, no registro e no relatório)."""
+    if epochs is not None:
+        return epochs
+    return settings.FINETUNE_EPOCHS if incremental else DEFAULT_EPOCHS
+
+
+@dataclass
+class TrainingJob:
+    id: str
+    ticker: str
+    lookback: int
+    epochs: int
+    n_obs: int
+    incremental: bool = False   # fine-tuning a partir da versão ativa (ver Trainer.fine_tune)
+    early_stopping: bool = False
+    status: str = QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    cancel_requested: bool = False
+    progress: list[dict] = field(default_factory=list)   # [{"epoch", "loss", "seconds"}]
+    result: dict | None = None
+    error: str | None = None
+
+    @property
+    def dedup_key(self) -> tuple:
+        return (self.ticker, self.lookback, self.epochs, self.incremental, self.early_stopping)
+
+    def to_dict(self) -> dict[str, Any]:
+        data = asdict(self)
+        data["elapsed_s"] = (
+            round((self.finished_at or time.time()) - self.started_at, 3) if self.started_at else None
+        )
+        return data
+
+
+@dataclass
+class TrainingSweep:
+    """Treino de vários tickers (um job por ticker) acompanhado como uma unidade."""
+    id: str
+    lookback: int
+    epochs: int
+    incremental: bool
+    early_stopping: bool
+    job_ids: dict[str, str]                               # ticker -> job id
+    errors: dict[str, str] = field(default_factory=dict)  # tickers não enviados
+    created_at: float = field(default_factory=time.time)
+
+
+def collect_series(db, tickers: list[str], lookback: int) -> tuple[dict[str, np.ndarray], dict[str, str]]:
+    """Séries de fechamento para uma varredura; tickers com série curta vão para os erros."""
+    from ftc4.data_pipeline.crud.stock_market_prices import PriceSeries
+
+    prices = PriceSeries(db)
+    series, errors = {}, {}
+    for ticker in tickers:
+        values = prices.range(ticker)
+        if len(values) < lookback + 5:
+            errors[ticker.upper()] = f"Série insuficiente para treino ({len(values)} < {lookback + 5})"
+        else:
+            series[ticker.upper()] = values
+    return series, errors
+
+
+def sweep_changes(previous: dict[str, tuple], status: dict[str, Any]) -> list[dict[str, Any]]:
+    """
+    Eventos de progresso de uma varredura desde a última leitura (status/época por ticker).
+    `previous` é atualizado no lugar; usado pelo stream da API e pela CLI.
+    """
+    changes = []
+    for ticker, info in status["jobs"].items():
+        mark = (info["status"], info["epochs_done"])
+        if previous.get(ticker) != mark:
+            previous[ticker] = mark
+            changes.append({"ticker": ticker, **{k: info[k] for k in
+                            ("status", "epochs_done", "last_loss", "train_s", "error")}})
+    return changes
+
+
+# -----------------------------------------------
+# Código executado no processo filho
+# -----------------------------------------------
+def _init_worker(torch_threads: int) -> None:
+    import torch
+    torch.set_num_threads(torch_threads)
+
+
+def _run_training_job(job_id: str, ticker: str, lookback: int, epochs: int, series: np.ndarray,
+                      events, cancel_flags, incremental: bool = False, early_stopping: bool = False) -> dict:
+    from ftc4.ml_models.lstm_model.train import Trainer
+
+    events.put((job_id, "started", time.time()))
+
+    def on_epoch_end(epoch: int, loss: float, seconds: float) -> bool:
+        events.put((job_id, "epoch", {"epoch": epoch, "loss": loss, "seconds": round(seconds, 4), "mode": trainer.mode}))
+        return not cancel_flags.get(job_id, False)
+
+    # validação só a pedido: por padrão o treino usa a série inteira (inclusive as barras mais recentes)
+    validation = ({"val_split": settings.EARLY_STOPPING_VAL_SPLIT, "patience": settings.EARLY_STOPPING_PATIENCE}
+                  if early_stopping else {})
+    if incremental:
+        # `epochs` são as do fine-tuning; se ele virar treino completo, vale o padrão do treino completo
+        trainer = Trainer(lookback=lookback, epochs=DEFAULT_EPOCHS, ticker=ticker, **validation)
+        trainer.fine_tune(series, device="cpu", on_epoch_end=on_epoch_end, epochs=epochs)
+    else:
+        trainer = Trainer(lookback=lookback, epochs=epochs, ticker=ticker, **validation)
+        trainer.fit(series, device="cpu", on_epoch_end=on_epoch_end)
+    return {"ticker": trainer.key.ticker, "lookback": trainer.key.lookback, "version": trainer.key.version,
+            "mode": trainer.mode, "refit_reason": trainer.refit_reason}
+
+
+# -----------------------------------------------
+# Gerenciador (processo da API)
+# -----------------------------------------------
+class TrainingJobManager:
+    """
+    Fila de treino assíncrona sobre um ProcessPoolExecutor limitado.
+      - submit() retorna na hora com o job (ou o job idêntico já em andamento).
+      - Progresso por época chega via fila do Manager e é drenado por uma thread.
+      - cancel() cancela jobs na fila ou sinaliza o filho para parar na próxima época.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int, torch_threads: int = 1, history: int = 200,
+                 max_sweep_pending: int | None = None):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        # teto de pendentes para aceitar uma varredura (pedidos avulsos usam max_pending)
+        self.max_sweep_pending = max(max_pending, max_sweep_pending or max_pending)
+        self.torch_threads = torch_threads
+        self.history = history
+        self._jobs: "OrderedDict[str, TrainingJob]" = OrderedDict()
+        self._futures: dict[str, Future] = {}
+        self._inflight: dict[tuple, str] = {}
+        self._lock = threading.Lock()
+        self._executor: ProcessPoolExecutor | None = None
+        self._manager = None
+        self._events = None
+        self._cancel_flags = None
+        self._drain_thread: threading.Thread | None = None
+        self._sweeps: "OrderedDict[str, TrainingSweep]" = OrderedDict()
+
+    def _ensure_started(self) -> None:
+        # Criação tardia: importar o módulo não sobe processos
+        if self._executor is not None:
+            return
+        ctx = mp.get_context("spawn")  # fork + threads do torch pode travar
+        self._manager = ctx.Manager()
+        self._events = self._manager.Queue()
+        self._cancel_flags = self._manager.dict()
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.max_workers, mp_context=ctx,
+            initializer=_init_worker, initargs=(self.torch_threads,),
+        )
+        self._drain_thread = threading.Thread(target=self._drain_events, name="training-jobs-events", daemon=True)
+        self._drain_thread.start()
+
+    def submit(self, ticker: str, lookback: int, series: np.ndarray, epochs: int | None = None,
+               enforce_limit: bool = True, incremental: bool = False,
+               early_stopping: bool = False) -> tuple[TrainingJob, bool]:
+        """Retorna (job, deduplicado). Sem `epochs`, usa o padrão do modo (ver resolve_epochs)."""
+        epochs = resolve_epochs(epochs, incremental)
+        with self._lock:
+            existing = self._find_inflight(ticker, lookback, epochs, incremental, early_stopping)
+            if existing is not None:
+                return existing, True
+            if enforce_limit and self._pending() >= self.max_pending:
+                raise JobQueueFull(f"Limite de {self.max_pending} jobs pendentes atingido")
+            job, future = self._enqueue(ticker, lookback, series, epochs, incremental, early_stopping)
+        self._watch(job, future)
+        return job, False
+
+    def submit_sweep(self, series_by_ticker: dict[str, np.ndarray], lookback: int, epochs: int | None = None,
+                     errors: dict[str, str] | None = None, incremental: bool = False,
+                     early_stopping: bool = False, enforce_limit: bool = True) -> TrainingSweep:
+        """
+        Um job por ticker no mesmo process pool (cada worker com `torch_threads` threads),
+        cada modelo no seu slot de artefato. O lote é aceito ou recusado inteiro: com
+        `enforce_limit`, JobQueueFull se os pendentes mais os jobs novos passarem de
+        `max_sweep_pending` (a CLI, com pool próprio, não limita).
+        """
+        epochs = resolve_epochs(epochs, incremental)
+        job_ids, enqueued = {}, []
+        with self._lock:
+            new = [t for t in series_by_ticker
+                   if self._find_inflight(t, lookback, epochs, incremental, early_stopping) is None]
+            pending = self._pending()
+            if enforce_limit and pending + len(new) > self.max_sweep_pending:
+                raise JobQueueFull(f"Varredura de {len(new)} jobs novos com {pending} pendentes passa do "
+                                   f"limite de {self.max_sweep_pending}")
+            for ticker, series in series_by_ticker.items():
+                job = self._find_inflight(ticker, lookback, epochs, incremental, early_stopping)
+                if job is None:
+                    job, future = self._enqueue(ticker, lookback, series, epochs, incremental, early_stopping)
+                    enqueued.append((job, future))
+                job_ids[job.ticker] = job.id
+            sweep = TrainingSweep(id=uuid.uuid4().hex, lookback=lookback, epochs=epochs, incremental=incremental,
+                                  early_stopping=early_stopping, job_ids=job_ids, errors=dict(errors or {}))
+            self._sweeps[sweep.id] = sweep
+            while len(self._sweeps) > self.history:
+                self._sweeps.popitem(last=False)
+        for job, future in enqueued:
+            self._watch(job, future)
+        logger.info(f"Varredura de treino {sweep.id}: {len(job_ids)} tickers enfileirados")
+        return sweep
+
+    def sweep_status(self, sweep_id: str) -> dict[str, Any] | None:
+        """Status agregado: tempo de parede total e tempo/épocas/loss por ticker."""
+        with self._lock:
+            sweep = self._sweeps.get(sweep_id)
+            if sweep is None:
+                return None
+            jobs = {t: self._jobs.get(jid) for t, jid in sweep.job_ids.items()}
+            per_ticker, counts, finished_at = {}, {}, []
+            for ticker, job in jobs.items():
+                if job is None:   # saiu do histórico
+                    continue
+                counts[job.status] = counts.get(job.status, 0) + 1
+                if job.finished_at:
+                    finished_at.append(job.finished_at)
+                last = job.progress[-1] if job.progress else None
+                per_ticker[ticker] = {
+                    "job_id": job.id,
+                    "status": job.status,
+                    "epochs_done": len(job.progress),
+                    "last_loss": last["loss"] if last else None,
+                    "queue_s": round(job.started_at - job.created_at, 3) if job.started_at else None,
+                    "train_s": round((job.finished_at or time.time()) - job.started_at, 3) if job.started_at else None,
+                    "result": job.result,
+                    "error": job.error,
+                }
+            done = all(j is None or j.status in FINISHED for j in jobs.values())
+            end = max(finished_at) if done and finished_at else time.time()
+            return {
+                "sweep_id": sweep.id,
+                "status": "finished" if done else "running",
+                "lookback": sweep.lookback,
+                "epochs": sweep.epochs,
+                "incremental": sweep.incremental,
+                "early_stopping": sweep.early_stopping,
+                "workers": self.max_workers,
+                "torch_threads": self.torch_threads,
+                "tickers": len(sweep.job_ids),
+                "counts": counts,
+                "wall_s": round(end - sweep.created_at, 3),
+                "train_s_total": round(sum(t["train_s"] or 0 for t in per_ticker.values()), 3),
+                "jobs": per_ticker,
+                "errors": sweep.errors,
+            }
+
+    def get(self, job_id: str) -> TrainingJob | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> TrainingJob | None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED:
+                return job
+            job.cancel_requested = True
+            future = self._futures.get(job_id)
+            self._cancel_flags[job_id] = True
+        # Ainda na fila: cancela direto; rodando: o filho para ao fim da época corrente
+        if future is not None:
+            future.cancel()
+        return job
+
+    def shutdown(self) -> None:
+        if self._executor is None:
+            return
+        for job_id in list(self._futures):
+            self.cancel(job_id)
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._events.put(None)
+        self._manager.shutdown()
+        self._executor = self._manager = self._events = self._cancel_flags = None
+
+    # ---------------- internos ----------------
+    # _find_inflight/_pending/_enqueue: chamados com self._lock adquirido
+    def _find_inflight(self, ticker: str, lookback: int, epochs: int, incremental: bool,
+                       early_stopping: bool) -> TrainingJob | None:
+        job_id = self._inflight.get((ticker.upper(), lookback, epochs, incremental, early_stopping))
+        return self._jobs[job_id] if job_id is not None else None
+
+    def _pending(self) -> int:
+        return sum(1 for j in self._jobs.values() if j.status not in FINISHED)
+
+    def _enqueue(self, ticker: str, lookback: int, series: np.ndarray, epochs: int, incremental: bool,
+                 early_stopping: bool) -> tuple[TrainingJob, Future]:
+        self._ensure_started()
+        ticker = ticker.upper()
+        job = TrainingJob(id=uuid.uuid4().hex, ticker=ticker, lookback=lookback, epochs=epochs,
+                          n_obs=len(series), incremental=incremental, early_stopping=early_stopping)
+        self._jobs[job.id] = job
+        self._inflight[job.dedup_key] = job.id
+        future = self._executor.submit(
+            _run_training_job, job.id, ticker, lookback, epochs, np.asarray(series, dtype=float),
+            self._events, self._cancel_flags, incremental, early_stopping,
+        )
+        self._futures[job.id] = future
+        self._trim_history()
+        return job, future
+
+    def _watch(self, job: TrainingJob, future: Future) -> None:
+        # fora do lock: um future já concluído chama _on_done na hora
+        future.add_done_callback(lambda f, job_id=job.id: self._on_done(job_id, f))
+        logger.info(f"Job de treino {job.id} enfileirado ({job.ticker}, lookback={job.lookback}, epochs={job.epochs}"
+                    f"{', incremental' if job.incremental else ''})")
+
+    def _drain_events(self) -> None:
+        while True:
+            try:
+                item = self._events.get()
+            except (EOFError, OSError):
+                return
+            if item is None:
+                return
+            job_id, kind, payload = item
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    continue
+                if kind == "started":
+                    job.started_at = payload
+                    if job.status == QUEUED:
+                        job.status = RUNNING
+                elif kind == "epoch":
+                    job.progress.append(payload)
+                    # as métricas do processo de treino não chegam ao /metrics da API
+                    record_epoch(job.ticker, payload["mode"], payload["seconds"], payload["loss"])
+
+    def _on_done(self, job_id: str, future: Future) -> None:
+        from ftc4.ml_models.lstm_model.train import TrainingCancelled
+
+        with self._lock:
+            job = self._jobs.get(job_id)
+            self._futures.pop(job_id, None)
+            if job is None:
+                return
+            job.finished_at = time.time()
+            if future.cancelled():
+                job.status = CANCELLED
+            else:
+                exc = future.exception()
+                if exc is None:
+                    job.status, job.result = SUCCEEDED, future.result()
+                elif isinstance(exc, TrainingCancelled):
+                    job.status = CANCELLED
+                else:
+                    job.status, job.error = FAILED, f"{type(exc).__name__}: {exc}"
+            if self._inflight.get(job.dedup_key) == job_id:
+                del self._inflight[job.dedup_key]
+            if self._cancel_flags is not None:
+                self._cancel_flags.pop(job_id, None)
+
+        jobs_finished.inc(status=job.status)
+        if job.status == FAILED:
+            logger.error(f"Job de treino {job_id} falhou: {job.error}")
+        else:
+            logger.info(f"Job de treino {job_id} finalizado com status {job.status}")
+
+    def _trim_history(self) -> None:
+        finished = [jid for jid, j in self._jobs.items() if j.status in FINISHED]
+        for jid in finished[:max(0, len(self._jobs) - self.history)]:
+            del self._jobs[jid]
+
+
+training_jobs = TrainingJobManager(
+    max_workers=settings.TRAINING_MAX_WORKERS,
+    max_pending=settings.TRAINING_MAX_PENDING,
+    torch_threads=settings.TRAINING_TORCH_THREADS,
+    history=settings.TRAINING_JOBS_HISTORY,
+    max_sweep_pending=settings.SWEEP_MAX_PENDING,
+)
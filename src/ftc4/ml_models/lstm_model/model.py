@@ -11,4 +11,18 @@ class LSTMForecaster(nn.Module):
         out, _ = self.lstm(x)
         out = out[:, -1, :]  # última saída
         out = self.fc(out)
-        return out
\ No newline at end of file
+        return out
+
+    # ---- Inferência incremental (stateful) ----
+    # jit.export: os métodos também vão para as variantes TorchScript (ver export.py)
+    @torch.jit.export
+    def warmup(self, x):
+        """Processa a janela inteira uma vez; retorna (previsão, estado (h, c))."""
+        out, state = self.lstm(x)
+        return self.fc(out[:, -1, :]), state
+
+    @torch.jit.export
+    def step(self, x_t, state: tuple[torch.Tensor, torch.Tensor]):
+        """Avança um único passo (x_t: (batch, 1, input_size)) a partir do estado (h, c)."""
+        out, state = self.lstm(x_t, state)
+        return self.fc(out[:, -1, :]), state
@@ -1,35 +1,173 @@
 from __future__ import annotations
+import time
 import numpy as np
 import torch
-from pathlib import Path
-from ftc4.ml_models.lstm_model.model import LSTMForecaster
-from ftc4.ml_models import lstm_model
-
-def load_artifacts():
-    model = LSTMForecaster()
-    model.load_state_dict(torch.load(lstm_model.ARTIFACTS_DIR / "lstm.pt", map_location="cpu"))
-    model.eval()
-    import joblib
-    pp = joblib.load(lstm_model.ARTIFACTS_DIR / "preprocessor.joblib")
-    return model, pp
+from ftc4.common import metrics
+from ftc4.common.config import settings
+from ftc4.ml_models.lstm_model.registry import CachedModel, model_registry
+from ftc4.ml_models.lstm_model.store import ArtifactKey, artifact_store
+
+load_seconds = metrics.histogram("lstm_load_artifacts_seconds", "Carga de modelo + preprocessor do disco", ("variant",))
+step_seconds = metrics.histogram(
+    "lstm_forecast_step_seconds", "Latência por passo da previsão recursiva (lote inteiro)",
+    ("mode",), buckets=metrics.FAST_BUCKETS,
+)
+forecast_batch = metrics.histogram(
+    "lstm_forecast_batch_size", "Séries por forward na previsão recursiva", buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+
+
+def resolve_model_key(ticker: str | None = None, lookback: int | None = None) -> ArtifactKey:
+    """
+    Versão ativa do modelo do ticker. Só `ticker=None` usa o slot padrão (modelo
+    treinado sem ticker); um ticker sem modelo próprio levanta FileNotFoundError,
+    em vez de prever com o modelo/escala de outra série.
+    """
+    return artifact_store.resolve(ticker, lookback)
+
+
+def load_artifacts(ticker: str | None = None, lookback: int | None = None, version: int | None = None,
+                   variant: str | None = None):
+    """(modelo, preprocessor) na variante configurada (LSTM_SERVING_VARIANT) ou em `variant`."""
+    key = artifact_store.resolve(ticker, lookback, version) if version is not None else resolve_model_key(ticker, lookback)
+    return _load(key, variant or settings.LSTM_SERVING_VARIANT)
+
+
+def _load(key: ArtifactKey, variant: str):
+    with load_seconds.time(variant=variant):
+        return artifact_store.load(key, variant)
+
+
+def _registry_entry(key: ArtifactKey) -> CachedModel:
+    return model_registry.get(key.slot, key, lambda: _load(key, settings.LSTM_SERVING_VARIANT))
+
+
+def get_model(ticker: str | None = None, lookback: int | None = None) -> CachedModel:
+    """Modelo + preprocessor via registry em memória (recarrega só quando a versão ativa muda)."""
+    return _registry_entry(resolve_model_key(ticker, lookback))
+
+
+def warm_model(key: ArtifactKey) -> float:
+    """Carrega `key` no registry e roda um forward com janela zerada (warm-up); retorna os segundos."""
+    t0 = time.perf_counter()
+    entry = _registry_entry(key)
+    with torch.no_grad():
+        entry.model(torch.zeros(1, key.lookback, 1))
+    return time.perf_counter() - t0
+
+
+INFERENCE_MODES = ("window", "stateful")
+
+
+def _window_forecast(model, window: torch.Tensor, n_steps: int) -> torch.Tensor:
+    """
+    Previsão recursiva reexecutando o LSTM sobre a janela deslizante (caminho original).
+    A janela desliza sobre um buffer pré-alocado, sem concatenações por passo.
+    """
+    n, lookback, _ = window.shape
+    buf = torch.empty(n, lookback + n_steps, 1)
+    buf[:, :lookback] = window
+    for i in range(n_steps):
+        buf[:, lookback + i] = model(buf[:, i:i + lookback])
+    return buf[:, lookback:, 0]
+
+
+def _stateful_forecast(model, window: torch.Tensor, n_steps: int) -> torch.Tensor:
+    """
+    Previsão recursiva incremental: a janela é processada uma vez e cada passo
+    avança um único timestep a partir do estado (h, c). Custo O(lookback + steps)
+    em vez de O(steps x lookback). Como o estado carrega também os pontos que
+    sairiam da janela, o resultado é uma aproximação do caminho "window".
+    """
+    n = window.shape[0]
+    preds = torch.empty(n, n_steps)
+    x_t = torch.empty(n, 1, 1)
+    yhat, state = model.warmup(window)
+    for i in range(n_steps):
+        preds[:, i] = yhat[:, 0]
+        if i + 1 < n_steps:
+            x_t.copy_(yhat.view(n, 1, 1))
+            yhat, state = model.step(x_t, state)
+    return preds
+
+
+def _recursive_forecast(model, window: torch.Tensor, n_steps: int, mode: str | None = None) -> torch.Tensor:
+    """Previsão recursiva em lote: window (n, lookback, 1) -> (n, n_steps), escala do scaler."""
+    mode = mode or settings.LSTM_INFERENCE_MODE
+    if mode not in INFERENCE_MODES:
+        raise ValueError(f"Modo de inferência inválido: {mode}. Use um de {INFERENCE_MODES}")
+    t0 = time.perf_counter()
+    if mode == "stateful":
+        preds = _stateful_forecast(model, window, n_steps)
+    else:
+        preds = _window_forecast(model, window, n_steps)
+    if n_steps:
+        step_seconds.observe((time.perf_counter() - t0) / n_steps, mode=mode)
+    forecast_batch.observe(window.shape[0])
+    return preds
+
 
 @torch.no_grad()
-def predict_next(series: np.ndarray, n_steps: int = 5):
-    model, pp = load_artifacts()
-    device = "cpu"
+def predict_next(series: np.ndarray, n_steps: int = 5, ticker: str | None = None, lookback: int | None = None,
+                 mode: str | None = None):
+    entry = get_model(ticker, lookback)
+    model, pp = entry.model, entry.pp
     scaled = pp.transform(series)
 
     # previsão recursiva
-    window = scaled[-pp.lookback:].reshape(1, pp.lookback, 1)
-    window = torch.tensor(window, dtype=torch.float32).to(device)
-
-    preds_scaled = []
-    for _ in range(n_steps):
-        yhat = model(window).cpu().numpy().ravel()[0]
-        preds_scaled.append(yhat)
-        # shift janela
-        new_window = np.concatenate([window.cpu().numpy().ravel()[1:], [yhat]])
-        window = torch.tensor(new_window.reshape(1, pp.lookback, 1), dtype=torch.float32).to(device)
-
-    preds = pp.inverse_transform(np.array(preds_scaled))
-    return preds
\ No newline at end of file
+    window = torch.tensor(scaled[-pp.lookback:].reshape(1, pp.lookback, 1), dtype=torch.float32)
+    preds_scaled = _recursive_forecast(model, window, n_steps, mode).numpy().ravel()
+    return pp.inverse_transform(preds_scaled)
+
+
+@torch.no_grad()
+def forecast_windows(key: ArtifactKey, series_list: list[np.ndarray], n_steps: int,
+                     mode: str | None = None) -> np.ndarray:
+    """
+    Previsão recursiva de várias séries com o mesmo modelo: as janelas são empilhadas
+    em (n, lookback, 1) e cada passo roda um forward só. Retorna (n, n_steps) na escala original.
+    """
+    entry = _registry_entry(key)
+    model, pp = entry.model, entry.pp
+    windows = np.stack([pp.transform(np.asarray(s, dtype=float)[-pp.lookback:]).ravel() for s in series_list])
+    window = torch.tensor(windows.reshape(len(series_list), pp.lookback, 1), dtype=torch.float32)
+    preds_scaled = _recursive_forecast(model, window, n_steps, mode).numpy()
+    return np.stack([pp.inverse_transform(row) for row in preds_scaled])
+
+
+@torch.no_grad()
+def predict_next_batch(
+    series_by_ticker: dict[str, np.ndarray], n_steps: int = 5, mode: str | None = None
+) -> tuple[dict[str, np.ndarray], dict[str, str]]:
+    """
+    Previsão para vários tickers. Tickers que usam o mesmo modelo (mesma versão)
+    são empilhados num único tensor (n_tickers, lookback, 1), então cada passo
+    recursivo roda um forward só para o grupo inteiro.
+    Retorna (resultados, erros) por ticker.
+    """
+    results: dict[str, np.ndarray] = {}
+    errors: dict[str, str] = {}
+
+    groups: dict[ArtifactKey, list[str]] = {}
+    for ticker in series_by_ticker:
+        try:
+            groups.setdefault(resolve_model_key(ticker), []).append(ticker)
+        except FileNotFoundError:
+            errors[ticker] = "Nenhum modelo treinado para este ticker"
+
+    for key, tickers in groups.items():
+        lookback = key.lookback
+        batch = []
+        for ticker in tickers:
+            n = len(series_by_ticker[ticker])
+            if n < lookback:
+                errors[ticker] = f"Série insuficiente: {n} pontos, lookback do modelo = {lookback}"
+                continue
+            batch.append(ticker)
+        if not batch:
+            continue
+
+        preds = forecast_windows(key, [series_by_ticker[t] for t in batch], n_steps, mode)
+        results.update(zip(batch, preds))
+
+    return results, errors
@@ -16,15 +16,25 @@ class SeriesPreprocessor:
         series = series.reshape(-1, 1)
         return self.scaler.transform(series)
 
+    def range_drift(self, series: np.ndarray) -> float:
+        """Quanto `series` sai da faixa [0, 1] do scaler já ajustado, em fração da amplitude (0 = dentro)."""
+        if not len(series):
+            return 0.0
+        scaled = self.transform(np.asarray(series, dtype=float)).ravel()
+        return float(max(0.0, -scaled.min(), scaled.max() - 1.0))
+
     def inverse_transform(self, series: np.ndarray) -> np.ndarray:
         return self.scaler.inverse_transform(series.reshape(-1, 1)).ravel()
 
     def build_windows(self, scaled: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
-        X, y = [], []
-        for i in range(self.lookback, len(scaled)):
-            X.append(scaled[i - self.lookback:i, 0])
-            y.append(scaled[i, 0])
-        X = np.array(X)
-        y = np.array(y)
+        """
+        Janelas deslizantes sem cópia: X é uma view com strides sobre `scaled`
+        (somente leitura), X[i] = scaled[i:i + lookback] e y[i] = scaled[i + lookback].
+        """
+        flat = np.asarray(scaled).reshape(-1)
+        if len(flat) <= self.lookback:
+            return np.empty((0, self.lookback, 1)), np.empty(0)
+        X = np.lib.stride_tricks.sliding_window_view(flat[:-1], self.lookback)
+        y = flat[self.lookback:]
         # (batch, seq, feat)
-        return X.reshape((X.shape[0], X.shape[1], 1)), y
\ No newline at end of file
+        return X[:, :, None], y
\ No newline at end of file
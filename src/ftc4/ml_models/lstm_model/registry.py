@@ -0,0 +1,130 @@
+from __future__ import annotations
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Hashable, Tuple
+
+from ftc4.common.config import settings
+
+if TYPE_CHECKING:
+    import torch.nn as nn
+
+
+@dataclass(frozen=True)
+class CachedModel:
+    """Entrada imutável do registry: trocar a entrada inteira é atômico."""
+    model: nn.Module
+    pp: Any
+    signature: Hashable
+    nbytes: int
+    loaded_at: float
+
+
+def _model_nbytes(model: nn.Module) -> int:
+    tensors = list(model.parameters()) + list(model.buffers())
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+
+class ModelRegistry:
+    """
+    Cache em memória de modelos já carregados.
+      - Recarrega quando a assinatura do artefato (mtime/versão) muda.
+      - Despejo LRU por número de entradas e por teto de memória.
+      - Contadores de hit/miss/tempo de carga em `stats()`.
+    """
+
+    def __init__(self, max_entries: int = 8, max_bytes: int = 256 * 1024 ** 2):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, CachedModel]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Um lock por chave evita que N requisições simultâneas carreguem o mesmo artefato N vezes
+        self._load_locks: dict[Hashable, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.evictions = 0
+        self.load_time_s = 0.0
+
+    def _lookup(self, key: Hashable, signature: Hashable) -> CachedModel | None:
+        entry = self._entries.get(key)
+        if entry is None or entry.signature != signature:
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def get(self, key: Hashable, signature: Hashable, loader: Callable[[], Tuple[nn.Module, Any]]) -> CachedModel:
+        with self._lock:
+            entry = self._lookup(key, signature)
+            if entry is not None:
+                self.hits += 1
+                return entry
+            self.misses += 1
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        with load_lock:
+            # Outra thread pode ter carregado enquanto esperávamos
+            with self._lock:
+                entry = self._lookup(key, signature)
+            if entry is not None:
+                return entry
+
+            t0 = time.perf_counter()
+            model, pp = loader()
+            elapsed = time.perf_counter() - t0
+            with self._lock:
+                self.loads += 1
+                self.load_time_s += elapsed
+                return self._put(key, model, pp, signature)
+
+    def publish(self, key: Hashable, model: nn.Module, pp: Any, signature: Hashable) -> CachedModel:
+        """Hot-swap: substitui a entrada de uma vez; predições em andamento seguem com o modelo antigo."""
+        with self._lock:
+            return self._put(key, model, pp, signature)
+
+    def invalidate(self, key: Hashable | None = None) -> None:
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def _put(self, key: Hashable, model: nn.Module, pp: Any, signature: Hashable) -> CachedModel:
+        entry = CachedModel(model, pp, signature, _model_nbytes(model), time.time())
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        self._evict()
+        return entry
+
+    def _evict(self) -> None:
+        # Sempre mantém ao menos a entrada mais recente
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_entries or self.nbytes > self.max_bytes
+        ):
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    @property
+    def nbytes(self) -> int:
+        return sum(e.nbytes for e in self._entries.values())
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "nbytes": self.nbytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "loads": self.loads,
+                "evictions": self.evictions,
+                "load_time_s": round(self.load_time_s, 6),
+            }
+
+
+model_registry = ModelRegistry(
+    max_entries=settings.MODEL_CACHE_MAX_ENTRIES,
+    max_bytes=int(settings.MODEL_CACHE_MAX_MB * 1024 ** 2),
+)
@@ -0,0 +1,276 @@
+from __future__ import annotations
+import json
+import os
+import shutil
+import time
+import uuid
+import warnings
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Tuple
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from ftc4.common.config import LSTM_VARIANTS, settings
+from ftc4.common.logger import get_logger
+from ftc4.ml_models import lstm_model
+from ftc4.ml_models.lstm_model.model import LSTMForecaster
+
+logger = get_logger(__name__)
+
+# Slot usado quando o modelo é treinado sem ticker (ex.: uso direto do Trainer)
+DEFAULT_TICKER = "_DEFAULT"
+
+WEIGHTS_FILE = "weights.bin"
+MANIFEST_FILE = "manifest.json"
+PREPROCESSOR_FILE = "preprocessor.joblib"
+OPTIMIZER_FILE = "optimizer.pt"
+EXPORT_REPORT_FILE = "export_report.json"
+# Variantes servíveis: "eager" usa weights.bin; as demais são TorchScript exportadas após o treino
+VARIANT_FILES = {"torchscript": "model.ts.pt", "int8": "model.int8.pt"}
+VARIANTS = LSTM_VARIANTS
+POINTER_FILE = "current.json"
+FORMAT_VERSION = 1
+
+
+@dataclass(frozen=True, order=True)
+class ArtifactKey:
+    ticker: str
+    lookback: int
+    version: int
+
+    @property
+    def slot(self) -> Tuple[str, int]:
+        """Identifica o modelo sem a versão (uma entrada por slot no registry)."""
+        return (self.ticker, self.lookback)
+
+
+def _normalize_ticker(ticker: str | None) -> str:
+    return DEFAULT_TICKER if not ticker else ticker.strip().upper()
+
+
+def _write_json_atomic(path: Path, payload: dict) -> None:
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    tmp.write_text(json.dumps(payload), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _model_config(model: LSTMForecaster) -> dict:
+    lstm = model.lstm
+    return {
+        "input_size": lstm.input_size,
+        "hidden_size": lstm.hidden_size,
+        "num_layers": lstm.num_layers,
+        "dropout": lstm.dropout,
+    }
+
+
+class ArtifactStore:
+    """
+    Artefatos do LSTM versionados por (ticker, lookback, versão):
+
+        <root>/<TICKER>/lb<lookback>/v<versão>/
+            weights.bin          # todos os tensores float32 contíguos (mmap)
+            manifest.json        # nome, shape e offset de cada tensor + metadados
+            preprocessor.joblib
+            optimizer.pt         # opcional: estado do otimizador (fine-tuning incremental)
+            model.ts.pt          # opcional: variantes exportadas (TorchScript fp32 / int8)
+            model.int8.pt
+            export_report.json   # opcional: diferença de acurácia e latência das variantes
+
+    Cada versão é escrita num diretório temporário e publicada com rename atômico;
+    `current.json` (no slot e no ticker) aponta para a versão ativa.
+    Os pesos são lidos via mmap copy-on-write, então N processos compartilham
+    as mesmas páginas do page cache em vez de N cópias no heap.
+    """
+
+    def __init__(self, root: Path, keep_versions: int = 3):
+        self.root = Path(root)
+        self.keep_versions = keep_versions
+
+    # ---------------- caminhos ----------------
+    def ticker_dir(self, ticker: str | None) -> Path:
+        return self.root / _normalize_ticker(ticker)
+
+    def slot_dir(self, ticker: str | None, lookback: int) -> Path:
+        return self.ticker_dir(ticker) / f"lb{lookback}"
+
+    def path(self, key: ArtifactKey) -> Path:
+        return self.slot_dir(key.ticker, key.lookback) / f"v{key.version:04d}"
+
+    def versions(self, ticker: str | None, lookback: int) -> list[int]:
+        slot = self.slot_dir(ticker, lookback)
+        if not slot.is_dir():
+            return []
+        return sorted(int(p.name[1:]) for p in slot.glob("v[0-9]*") if p.is_dir())
+
+    # ---------------- resolução ----------------
+    def resolve(self, ticker: str | None = None, lookback: int | None = None, version: int | None = None) -> ArtifactKey:
+        """Resolve a versão ativa. Levanta FileNotFoundError se não houver modelo treinado."""
+        ticker = _normalize_ticker(ticker)
+        if lookback is None:
+            pointer = self.ticker_dir(ticker) / POINTER_FILE
+            if not pointer.exists():
+                raise FileNotFoundError(f"Nenhum modelo treinado para {ticker}")
+            lookback = int(json.loads(pointer.read_text(encoding="utf-8"))["lookback"])
+        if version is None:
+            pointer = self.slot_dir(ticker, lookback) / POINTER_FILE
+            if not pointer.exists():
+                raise FileNotFoundError(f"Nenhum modelo treinado para {ticker} (lookback={lookback})")
+            version = int(json.loads(pointer.read_text(encoding="utf-8"))["version"])
+        key = ArtifactKey(ticker, int(lookback), int(version))
+        if not (self.path(key) / MANIFEST_FILE).exists():
+            raise FileNotFoundError(f"Artefato inexistente: {key}")
+        return key
+
+    def active_keys(self, limit: int | None = None) -> list[ArtifactKey]:
+        """Versões ativas de cada ticker, da ativada mais recentemente para a mais antiga."""
+        pointers = sorted(self.root.glob(f"*/{POINTER_FILE}"), key=lambda p: p.stat().st_mtime, reverse=True)
+        keys = []
+        for pointer in pointers[:limit]:
+            try:
+                keys.append(self.resolve(pointer.parent.name))
+            except FileNotFoundError:
+                continue
+        return keys
+
+    def activate(self, key: ArtifactKey) -> None:
+        _write_json_atomic(self.slot_dir(key.ticker, key.lookback) / POINTER_FILE, {"version": key.version})
+        _write_json_atomic(self.ticker_dir(key.ticker) / POINTER_FILE, {"lookback": key.lookback, "version": key.version})
+
+    # ---------------- escrita ----------------
+    def save(self, model: LSTMForecaster, pp: Any, ticker: str | None = None,
+             extra: dict | None = None, activate: bool = True,
+             optimizer_state: dict | None = None) -> ArtifactKey:
+        import joblib
+
+        ticker = _normalize_ticker(ticker)
+        slot = self.slot_dir(ticker, pp.lookback)
+        slot.mkdir(parents=True, exist_ok=True)
+
+        tmp = slot / f".tmp-{uuid.uuid4().hex}"
+        tmp.mkdir()
+        try:
+            params, offset = [], 0
+            state = {k: v.detach().to("cpu", torch.float32).contiguous() for k, v in model.state_dict().items()}
+            with open(tmp / WEIGHTS_FILE, "wb") as fh:
+                for name, tensor in state.items():
+                    fh.write(tensor.numpy().tobytes())
+                    params.append({"name": name, "shape": list(tensor.shape), "offset": offset, "numel": tensor.numel()})
+                    offset += tensor.numel()
+                fh.flush()
+                os.fsync(fh.fileno())
+            joblib.dump(pp, tmp / PREPROCESSOR_FILE)
+            if optimizer_state is not None:
+                torch.save(optimizer_state, tmp / OPTIMIZER_FILE)
+
+            manifest = {
+                "format": FORMAT_VERSION,
+                "dtype": "float32",
+                "numel": offset,
+                "params": params,
+                "model": _model_config(model),
+                "ticker": ticker,
+                "lookback": pp.lookback,
+                "created_at": time.time(),
+                **(extra or {}),
+            }
+
+            # Publica com rename atômico; se outro processo pegou a mesma versão, tenta a próxima
+            while True:
+                version = (self.versions(ticker, pp.lookback) or [0])[-1] + 1
+                key = ArtifactKey(ticker, pp.lookback, version)
+                _write_json_atomic(tmp / MANIFEST_FILE, {**manifest, "version": version})
+                try:
+                    os.rename(tmp, self.path(key))
+                    break
+                except OSError:
+                    if not self.path(key).exists():
+                        raise
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+
+        if activate:
+            self.activate(key)
+        self._prune(ticker, pp.lookback)
+        return key
+
+    def _prune(self, ticker: str, lookback: int) -> None:
+        if self.keep_versions <= 0:
+            return
+        try:
+            active = self.resolve(ticker, lookback).version
+        except FileNotFoundError:
+            active = None
+        for version in self.versions(ticker, lookback)[:-self.keep_versions]:
+            if version != active:
+                # Processos que já mapearam os pesos seguem válidos (o inode só some no último munmap)
+                shutil.rmtree(self.path(ArtifactKey(ticker, lookback, version)), ignore_errors=True)
+
+    # ---------------- leitura ----------------
+    def manifest(self, key: ArtifactKey) -> dict:
+        return json.loads((self.path(key) / MANIFEST_FILE).read_text(encoding="utf-8"))
+
+    def save_variant(self, key: ArtifactKey, variant: str, module: torch.jit.ScriptModule) -> None:
+        """Grava uma variante exportada na versão já publicada (arquivo temporário + rename)."""
+        path = self.path(key) / VARIANT_FILES[variant]
+        tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", FutureWarning)   # TorchScript marcado como depreciado no torch 2.x
+            torch.jit.save(module, str(tmp))
+        os.replace(tmp, path)
+
+    def save_export_report(self, key: ArtifactKey, report: dict) -> None:
+        _write_json_atomic(self.path(key) / EXPORT_REPORT_FILE, report)
+
+    def export_report(self, key: ArtifactKey) -> dict | None:
+        path = self.path(key) / EXPORT_REPORT_FILE
+        if not path.exists():
+            return None
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def load(self, key: ArtifactKey, variant: str = "eager") -> Tuple[nn.Module, Any]:
+        """
+        Carrega sem cópia: os parâmetros são views sobre o arquivo mapeado em memória.
+        Com `variant` TorchScript, carrega o módulo exportado; versões sem a variante caem no eager.
+        """
+        import joblib
+
+        if variant not in VARIANTS:
+            raise ValueError(f"Variante inválida: {variant}. Use uma de {VARIANTS}")
+        folder = self.path(key)
+        if variant != "eager":
+            path = folder / VARIANT_FILES[variant]
+            if path.exists():
+                with warnings.catch_warnings():
+                    warnings.simplefilter("ignore", FutureWarning)
+                    module = torch.jit.load(str(path), map_location="cpu").eval()
+                return module, joblib.load(folder / PREPROCESSOR_FILE)
+            logger.warning(f"Variante {variant} não exportada para {key}; servindo o modelo eager")
+        manifest = self.manifest(key)
+        flat = np.memmap(folder / WEIGHTS_FILE, dtype=np.float32, mode="c", shape=(manifest["numel"],))
+        flat_t = torch.from_numpy(flat)
+        state = {
+            p["name"]: flat_t[p["offset"]:p["offset"] + p["numel"]].view(p["shape"])
+            for p in manifest["params"]
+        }
+        # Instancia no device "meta" (sem alocar pesos) e associa os tensores mapeados
+        with torch.device("meta"):
+            model = LSTMForecaster(**manifest["model"])
+        model.load_state_dict(state, assign=True)
+        model.eval()
+        pp = joblib.load(folder / PREPROCESSOR_FILE)
+        return model, pp
+
+    def load_optimizer_state(self, key: ArtifactKey) -> dict | None:
+        """Estado do otimizador salvo com a versão (None em artefatos sem ele)."""
+        path = self.path(key) / OPTIMIZER_FILE
+        if not path.exists():
+            return None
+        return torch.load(path, map_location="cpu", weights_only=True)
+
+
+artifact_store = ArtifactStore(lstm_model.ARTIFACTS_DIR, keep_versions=settings.ARTIFACT_KEEP_VERSIONS)
@@ -1,50 +1,243 @@
 from __future__ import annotations
+import copy
+import time
+from typing import Callable
 import numpy as np
 import torch
 import torch.nn as nn
-from torch.utils.data import DataLoader, TensorDataset
-from pathlib import Path
+from ftc4.common.config import settings
+from ftc4.common.logger import get_logger
+from ftc4.ml_models.lstm_model.export import export_variants
 from ftc4.ml_models.lstm_model.model import LSTMForecaster
 from ftc4.ml_models.lstm_model.preprocess import SeriesPreprocessor
-from ftc4.ml_models import lstm_model
+from ftc4.ml_models.lstm_model.forecast_cache import forecast_cache
+from ftc4.ml_models.lstm_model.registry import model_registry
+from ftc4.ml_models.lstm_model.store import ArtifactKey, artifact_store
+from ftc4.ml_models.lstm_model.training_metrics import record_epoch
+
+logger = get_logger(__name__)
+
+FULL, INCREMENTAL, UNCHANGED = "full", "incremental", "unchanged"
+
+# Callback por época: (época, loss, segundos). Retornar False interrompe o treino.
+EpochCallback = Callable[[int, float, float], "bool | None"]
+
+
+class TrainingCancelled(Exception):
+    """Treino interrompido pelo callback de época (nenhum artefato é salvo)."""
+
+
+def window_views(series: torch.Tensor, lookback: int) -> tuple[torch.Tensor, torch.Tensor]:
+    """
+    Janelas deslizantes como view (unfold, sem cópia) sobre a série 1D:
+    windows[i] = series[i:i + lookback] e targets[i] = series[i + lookback].
+    Só o lote indexado a cada passo é materializado.
+    """
+    return series[:-1].unfold(0, lookback, 1), series[lookback:]
+
 
 class Trainer:
-    def __init__(self, lookback: int = 60, lr: float = 1e-3, epochs: int = 20, batch_size: int = 64):
+    """
+    Treino do LSTM direto sobre tensores: janelas por view (unfold) e lotes por
+    permutação embaralhada de índices, sem TensorDataset/DataLoader.
+    Com `val_split` > 0 os últimos pontos da série (em ordem temporal) viram validação
+    e não entram no treino (nem no fine-tuning seguinte, que só visita alvos novos);
+    com `patience` o treino para após `patience` épocas sem melhora de `min_delta`
+    na loss de validação e restaura os pesos da melhor época. Por padrão, sem validação.
+    `fine_tune` parte da versão ativa do slot (pesos, scaler e otimizador) e treina
+    só as janelas novas mais uma amostra do histórico; cai no `fit` completo quando
+    não há modelo anterior, a série não estende a anterior ou o scaler sai da faixa.
+    """
+
+    def __init__(self, lookback: int = 60, lr: float = 1e-3, epochs: int = 20, batch_size: int = 64,
+                 ticker: str | None = None, val_split: float = 0.0, patience: int | None = None,
+                 min_delta: float = 1e-5):
+        self.ticker = ticker
         self.pp = SeriesPreprocessor(lookback=lookback)
         self.lr = lr
         self.epochs = epochs
         self.batch_size = batch_size
+        self.val_split = val_split
+        self.patience = patience
+        self.min_delta = min_delta
+        self.history: list[dict] = []     # [{"epoch", "loss", "val_loss", "seconds"}]
+        self.best_epoch: int | None = None
+        self.mode: str | None = None      # full | incremental | unchanged
+        self.refit_reason: str | None = None
 
-    def fit(self, series: np.ndarray, device: str | None = None):
+    @staticmethod
+    def _train_epoch(model: nn.Module, opt: torch.optim.Optimizer, loss_fn, windows: torch.Tensor,
+                     targets: torch.Tensor, order: torch.Tensor, batch_size: int) -> float:
+        """Uma época sobre os índices `order` (já embaralhados); loss média por amostra."""
+        # soma no device: sem .item() (sincronização) por lote
+        epoch_loss = torch.zeros((), device=targets.device)
+        for start in range(0, len(order), batch_size):
+            idx = order[start:start + batch_size]
+            xb = windows[idx].unsqueeze(-1)
+            yb = targets[idx].unsqueeze(1)
+            opt.zero_grad()
+            loss = loss_fn(model(xb), yb)
+            loss.backward()
+            opt.step()
+            epoch_loss += loss.detach() * len(idx)
+        return (epoch_loss / len(order)).item()
+
+    @torch.no_grad()
+    def _evaluate(self, model: nn.Module, windows: torch.Tensor, targets: torch.Tensor, loss_fn,
+                  chunk: int = 4096) -> float:
+        model.eval()
+        total = torch.zeros((), device=targets.device)
+        for start in range(0, len(targets), chunk):
+            xb = windows[start:start + chunk].unsqueeze(-1)
+            yb = targets[start:start + chunk].unsqueeze(1)
+            total += loss_fn(model(xb), yb) * len(yb)
+        model.train()
+        return (total / len(targets)).item()
+
+    def fit(self, series: np.ndarray, device: str | None = None, on_epoch_end: EpochCallback | None = None):
         device = device or ("cuda" if torch.cuda.is_available() else "cpu")
-        scaled = self.pp.fit_transform(series)
-        X, y = self.pp.build_windows(scaled)
-        X_t = torch.tensor(X, dtype=torch.float32).to(device)
-        y_t = torch.tensor(y, dtype=torch.float32).unsqueeze(1).to(device)
+        lookback = self.pp.lookback
+        scaled = self.pp.fit_transform(np.asarray(series, dtype=float))
+        flat = torch.as_tensor(scaled.reshape(-1), dtype=torch.float32, device=device)
+        windows, targets = window_views(flat, lookback)
 
-        ds = TensorDataset(X_t, y_t)
-        dl = DataLoader(ds, batch_size=self.batch_size, shuffle=True)
+        n = len(targets)
+        n_val = int(n * self.val_split) if self.val_split > 0 else 0
+        n_train = n - n_val
+        if n_train <= 0:
+            raise ValueError(f"Série insuficiente para treino: {len(series)} pontos, lookback = {lookback}")
+        val_windows, val_targets = windows[n_train:], targets[n_train:]
 
         model = LSTMForecaster().to(device)
         opt = torch.optim.Adam(model.parameters(), lr=self.lr)
         loss_fn = nn.MSELoss()
 
+        best_val, best_state, stale = float("inf"), None, 0
+        self.history, self.best_epoch, self.mode, self.refit_reason = [], None, FULL, None
         model.train()
         for epoch in range(self.epochs):
-            epoch_loss = 0.0
-            for xb, yb in dl:
-                opt.zero_grad()
-                preds = model(xb)
-                loss = loss_fn(preds, yb)
-                loss.backward()
-                opt.step()
-                epoch_loss += loss.item() * xb.size(0)
-            epoch_loss /= len(ds)
+            t0 = time.perf_counter()
+            perm = torch.randperm(n_train, device=device)
+            epoch_loss = self._train_epoch(model, opt, loss_fn, windows, targets, perm, self.batch_size)
+            val_loss = self._evaluate(model, val_windows, val_targets, loss_fn) if n_val else None
+            seconds = time.perf_counter() - t0
+            record_epoch(self.ticker, FULL, seconds, epoch_loss)
+            self.history.append({"epoch": epoch + 1, "loss": epoch_loss, "val_loss": val_loss, "seconds": seconds})
             if (epoch + 1) % 5 == 0:
-                print(f"[epoch {epoch+1}] loss={epoch_loss:.6f}")
+                if n_val:
+                    logger.info("[epoch %d] loss=%.6f val_loss=%.6f", epoch + 1, epoch_loss, val_loss)
+                else:
+                    logger.info("[epoch %d] loss=%.6f", epoch + 1, epoch_loss)
+            if on_epoch_end is not None and on_epoch_end(epoch + 1, epoch_loss, seconds) is False:
+                raise TrainingCancelled(f"Treino interrompido na época {epoch + 1}")
+
+            if val_loss is not None:
+                if val_loss < best_val - self.min_delta:
+                    best_val, stale, self.best_epoch = val_loss, 0, epoch + 1
+                    best_state = copy.deepcopy(model.state_dict())
+                else:
+                    stale += 1
+                    if self.patience is not None and stale >= self.patience:
+                        logger.info(f"Early stopping na época {epoch + 1} ({self.ticker or 'modelo padrão'}): "
+                                    f"melhor época {self.best_epoch}, val_loss={best_val:.6f}")
+                        break
+
+        if best_state is not None:
+            model.load_state_dict(best_state)
+
+        extra = {"best_epoch": self.best_epoch, "best_val_loss": best_val if best_state is not None else None}
+        return self._save(model, opt, series, extra)
+
+    def fine_tune(self, series: np.ndarray, device: str | None = None, on_epoch_end: EpochCallback | None = None,
+                  epochs: int | None = None, replay: int | None = None, drift_tol: float | None = None):
+        """
+        Atualização incremental (warm start) sobre a versão ativa de (ticker, lookback):
+        `epochs` épocas sobre as janelas cujo alvo é posterior ao último treino mais
+        `replay` janelas antigas sorteadas. `series` deve estender a série do último treino.
+        """
+        device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+        epochs = settings.FINETUNE_EPOCHS if epochs is None else epochs
+        replay = settings.FINETUNE_REPLAY if replay is None else replay
+        drift_tol = settings.FINETUNE_DRIFT_TOL if drift_tol is None else drift_tol
+        series = np.asarray(series, dtype=float)
+        lookback = self.pp.lookback
+
+        try:
+            base_key = artifact_store.resolve(self.ticker, lookback)
+        except FileNotFoundError:
+            return self._refit(series, device, on_epoch_end, "sem modelo anterior")
+        manifest = artifact_store.manifest(base_key)
+        n_prev, last_value = manifest.get("n_obs"), manifest.get("last_value")
+        if (n_prev is None or last_value is None or len(series) < n_prev
+                or not np.isclose(series[n_prev - 1], last_value)):
+            return self._refit(series, device, on_epoch_end, "série não estende a do último treino")
+
+        base, pp = artifact_store.load(base_key)
+        drift = pp.range_drift(series[n_prev:])
+        if drift > drift_tol:
+            return self._refit(series, device, on_epoch_end, f"dados novos fora da faixa do scaler ({drift:.3f})")
+        if len(series) == n_prev:
+            self.pp, self.key, self.history, self.mode, self.refit_reason = pp, base_key, [], UNCHANGED, None
+            return base
+
+        self.pp, self.mode, self.refit_reason = pp, INCREMENTAL, None
+        model = LSTMForecaster(**manifest["model"]).to(device)
+        model.load_state_dict(base.state_dict())   # cópia: os pesos carregados são views do mmap
+        opt = torch.optim.Adam(model.parameters(), lr=self.lr)
+        opt_state = artifact_store.load_optimizer_state(base_key)
+        if opt_state is not None:
+            opt.load_state_dict(opt_state)
+            for group in opt.param_groups:
+                group["lr"] = self.lr
+        loss_fn = nn.MSELoss()
+
+        scaled = pp.transform(series)
+        flat = torch.as_tensor(scaled.reshape(-1), dtype=torch.float32, device=device)
+        windows, targets = window_views(flat, lookback)
+        # janela i prevê series[i + lookback]: novas são as de alvo >= n_prev
+        first_new = max(0, n_prev - lookback)
+        replay_idx = torch.randperm(first_new, device=device)[:replay]
+        idx = torch.cat((replay_idx, torch.arange(first_new, len(targets), device=device)))
+
+        self.history, self.best_epoch = [], None
+        model.train()
+        for epoch in range(epochs):
+            t0 = time.perf_counter()
+            order = idx[torch.randperm(len(idx), device=device)]
+            epoch_loss = self._train_epoch(model, opt, loss_fn, windows, targets, order, self.batch_size)
+            seconds = time.perf_counter() - t0
+            record_epoch(self.ticker, INCREMENTAL, seconds, epoch_loss)
+            self.history.append({"epoch": epoch + 1, "loss": epoch_loss, "val_loss": None, "seconds": seconds})
+            if on_epoch_end is not None and on_epoch_end(epoch + 1, epoch_loss, seconds) is False:
+                raise TrainingCancelled(f"Treino interrompido na época {epoch + 1}")
+
+        extra = {"base_version": base_key.version, "n_new": len(series) - n_prev, "n_replay": len(replay_idx)}
+        return self._save(model, opt, series, extra)
+
+    def _refit(self, series: np.ndarray, device: str, on_epoch_end: EpochCallback | None, reason: str):
+        logger.info(f"Fine-tuning de {self.ticker or 'modelo padrão'} virou treino completo: {reason}")
+        model = self.fit(series, device=device, on_epoch_end=on_epoch_end)
+        self.refit_reason = reason
+        return model
+
+    def _save(self, model: nn.Module, opt: torch.optim.Optimizer, series: np.ndarray, extra: dict):
+        # salvar: nova versão em (ticker, lookback), publicada com rename atômico;
+        # n_obs/last_value/otimizador permitem o próximo fine-tuning incremental
+        extra = {"n_obs": len(series), "last_value": float(np.asarray(series)[-1]), "mode": self.mode,
+                 "epochs_run": len(self.history), **extra}
+        self.key: ArtifactKey = artifact_store.save(model, self.pp, ticker=self.ticker, extra=extra,
+                                                    optimizer_state=opt.state_dict(), activate=False)
 
-        # salvar
-        torch.save(model.state_dict(), lstm_model.ARTIFACTS_DIR / "lstm.pt")
-        import joblib
-        joblib.dump(self.pp, lstm_model.ARTIFACTS_DIR / "preprocessor.joblib")
-        return model
\ No newline at end of file
+        # cópia em CPU/eval para não compartilhar estado com o modelo retornado
+        serving = copy.deepcopy(model).cpu().eval()
+        # variantes TorchScript/int8 + relatório, na mesma versão; o ponteiro só passa para ela
+        # depois, senão outro processo resolveria a versão sem a variante e cairia no eager
+        export_variants(serving, self.pp, self.key, series)
+        artifact_store.activate(self.key)
+        if settings.LSTM_SERVING_VARIANT != "eager":
+            serving, _ = artifact_store.load(self.key, settings.LSTM_SERVING_VARIANT)
+        # hot-swap no registry
+        model_registry.publish(self.key.slot, serving, copy.deepcopy(self.pp), self.key)
+        # previsões feitas com versões anteriores deste slot deixam de valer
+        forecast_cache.invalidate_model(self.key.slot)
+        return model
@@ -0,0 +1,16 @@
+"""
+Métricas por época de treino, sem torch: o Trainer registra no processo que treina e o
+gerenciador de jobs reobserva no processo da API as épocas que chegam pela fila de eventos
+(as do processo de treino não chegam ao /metrics).
+"""
+from __future__ import annotations
+
+from ftc4.common import metrics
+
+epoch_seconds = metrics.histogram("lstm_train_epoch_seconds", "Duração de cada época de treino", ("mode",))
+epoch_loss = metrics.gauge("lstm_train_epoch_loss", "Loss (MSE, escala do scaler) da última época", ("ticker", "mode"))
+
+
+def record_epoch(ticker: str | None, mode: str, seconds: float, loss: float) -> None:
+    epoch_seconds.observe(seconds, mode=mode)
+    epoch_loss.set(loss, ticker=ticker or "default", mode=mode)
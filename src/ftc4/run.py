@@ -8,5 +8,106 @@ def main_admin():
     """Função de entrada para o modo de administração."""
     uvicorn.run("ftc4.api.admin:app", reload=True)
 
+def main_sync_watchlist(argv: list[str] | None = None):
+    """Ingestão de uma watchlist pela linha de comando (sem subir a API)."""
+    import argparse
+    import json
+    from datetime import date
+    from pathlib import Path
+
+    parser = argparse.ArgumentParser(prog="sync_watchlist", description=main_sync_watchlist.__doc__)
+    parser.add_argument("tickers", nargs="*", help="Tickers, ex: NVDA AAPL")
+    parser.add_argument("--file", type=Path, help="Arquivo com um ticker por linha")
+    parser.add_argument("--start", type=date.fromisoformat, required=True, help="YYYY-MM-DD")
+    parser.add_argument("--end", type=date.fromisoformat, default=None, help="YYYY-MM-DD (exclusivo)")
+    parser.add_argument("--mode", choices=["full", "delta"], default="delta")
+    parser.add_argument("--concurrency", type=int, default=None)
+    parser.add_argument("--retries", type=int, default=None)
+    parser.add_argument("--source", default=None, help="yfinance | fake")
+    args = parser.parse_args(argv)
+
+    tickers = list(args.tickers)
+    if args.file:
+        tickers += [line.strip() for line in args.file.read_text().splitlines() if line.strip()]
+    if not tickers:
+        parser.error("Informe tickers ou --file")
+
+    from ftc4.data_pipeline.database.connection import SessionLocal
+    from ftc4.data_pipeline.database.init_db import init_db
+    from ftc4.data_pipeline.sources.factory import get_price_fetcher
+    from ftc4.data_pipeline.watchlist import sync_watchlist
+
+    init_db()
+    db = SessionLocal()
+    try:
+        report = sync_watchlist(
+            db, tickers, args.start, args.end, fetch=get_price_fetcher(args.source),
+            mode=args.mode, max_concurrency=args.concurrency, retries=args.retries,
+        )
+    finally:
+        db.close()
+    print(json.dumps(report.as_dict(), indent=2))
+
+def main_train_sweep(argv: list[str] | None = None):
+    """Treina um modelo por ticker em paralelo (process pool, poucas threads do torch por processo)."""
+    import argparse
+    import json
+    import time
+    from pathlib import Path
+
+    from ftc4.common.config import settings
+
+    parser = argparse.ArgumentParser(prog="train_sweep", description=main_train_sweep.__doc__)
+    parser.add_argument("tickers", nargs="*", help="Tickers, ex: NVDA AAPL")
+    parser.add_argument("--file", type=Path, help="Arquivo com um ticker por linha")
+    parser.add_argument("--lookback", type=int, default=60)
+    parser.add_argument("--epochs", type=int, default=None,
+                        help="Épocas (padrão: 20 no treino completo, FINETUNE_EPOCHS com --incremental)")
+    parser.add_argument("--workers", type=int, default=settings.SWEEP_MAX_WORKERS)
+    parser.add_argument("--torch-threads", type=int, default=settings.SWEEP_TORCH_THREADS)
+    parser.add_argument("--incremental", action="store_true",
+                        help="Fine-tuning a partir dos modelos ativos (retreino completo só se preciso)")
+    parser.add_argument("--early-stopping", action="store_true",
+                        help="Separa o fim da série para validação e para o treino sem melhora (EARLY_STOPPING_*)")
+    args = parser.parse_args(argv)
+
+    tickers = list(args.tickers)
+    if args.file:
+        tickers += [line.strip() for line in args.file.read_text().splitlines() if line.strip()]
+    tickers = list(dict.fromkeys(t.upper() for t in tickers))
+    if not tickers:
+        parser.error("Informe tickers ou --file")
+
+    from ftc4.data_pipeline.database.connection import SessionLocal
+    from ftc4.data_pipeline.database.init_db import init_db
+    from ftc4.ml_models.lstm_model.jobs import TrainingJobManager, collect_series, sweep_changes
+
+    init_db()
+    db = SessionLocal()
+    try:
+        series, errors = collect_series(db, tickers, args.lookback)
+    finally:
+        db.close()
+    if not series:
+        print(json.dumps({"errors": errors}, indent=2, ensure_ascii=False))
+        raise SystemExit(1)
+
+    manager = TrainingJobManager(max_workers=args.workers, max_pending=len(series),
+                                 torch_threads=args.torch_threads)
+    try:
+        sweep = manager.submit_sweep(series, args.lookback, args.epochs, errors, incremental=args.incremental,
+                                     early_stopping=args.early_stopping, enforce_limit=False)
+        seen: dict = {}
+        while True:
+            status = manager.sweep_status(sweep.id)
+            for change in sweep_changes(seen, status):
+                print(json.dumps(change, ensure_ascii=False), flush=True)
+            if status["status"] == "finished":
+                break
+            time.sleep(0.5)
+    finally:
+        manager.shutdown()
+    print(json.dumps(status, indent=2, ensure_ascii=False))
+
 if __name__ == "__main__":
     main_public()
\ No newline at end of file
@@ -0,0 +1,36 @@
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Banco, artefatos e logs da suíte num diretório temporário: as configurações
+# leem DATA_DIR/ARTIFACTS_DIR/LOG_DIR no import do ftc4, então isto roda antes dele
+_ROOT = Path(tempfile.mkdtemp(prefix="ftc4-tests-"))
+for _var, _sub in (("DATA_DIR", "data"), ("ARTIFACTS_DIR", "artifacts"), ("LOG_DIR", "logs")):
+    os.environ[_var] = str(_ROOT / _sub)
+    (_ROOT / _sub).mkdir(parents=True, exist_ok=True)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    from ftc4.common.logger import shutdown_logging
+
+    shutdown_logging()
+    shutil.rmtree(_ROOT, ignore_errors=True)
+
+
+@pytest.fixture
+def memory_session():
+    """Sessão num SQLite em memória com todas as tabelas criadas."""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+    from ftc4.data_pipeline.database.connection import Base
+    from ftc4.data_pipeline.database.init_db import import_all_models
+
+    import_all_models()   # tabelas registradas no Base antes do create_all
+    mem = create_engine("sqlite://")
+    Base.metadata.create_all(mem)
+    with Session(mem) as db:
+        yield db
+    mem.dispose()
@@ -5,4 +5,199 @@ def test_health():
     client = TestClient(app)
     r = client.get("/health")
     assert r.status_code == 200
-    assert r.json()["status"] == "ok"
\ No newline at end of file
+    assert r.json()["status"] == "ok"
+
+def test_insert_stream_ndjson():
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+    from sqlalchemy.pool import StaticPool
+    from ftc4.common.config import settings
+    from ftc4.data_pipeline.database.connection import Base, get_session_factory
+
+    # Uma conexão compartilhada: cada chunk abre sua sessão numa thread diferente da requisição
+    mem = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(mem)
+    app.dependency_overrides[get_session_factory] = lambda: lambda: Session(mem)
+    try:
+        lines = [
+            f'{{"date": "2024-02-{d:02d}", "ticker": "AAPL", "open": 1, "high": 2, "low": 0.5, "close": 1.5, "volume": 10}}'
+            for d in range(1, 6)
+        ]
+        client = TestClient(app)
+        r = client.post("/stock/insert_stream?chunk_size=2", content="\n".join(lines + ["nao-json"]),
+                        headers={"Content-Type": "application/x-ndjson"})
+        assert r.status_code == 200
+        body = r.json()
+        assert (body["received"], body["accepted"], body["rejected"]) == (6, 5, 1)
+        assert len(body["chunks"]) == 3
+
+        # corpo sem quebras de linha: 413 em vez de bufferizar tudo
+        r = client.post("/stock/insert_stream", content=lines[0] + " " * settings.INGEST_MAX_LINE_BYTES,
+                        headers={"Content-Type": "application/x-ndjson"})
+        assert r.status_code == 413 and r.json()["detail"]["received"] == 0
+    finally:
+        app.dependency_overrides.clear()
+
+
+def _price_db(tmp_path, ticker: str):
+    """Banco temporário com preços sintéticos + modelo treinado; rotas async leem dele."""
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from sqlalchemy.orm import Session
+    from ftc4.data_pipeline.crud.stock_market_prices import upsert_price_frame
+    from ftc4.data_pipeline.database.connection import (
+        Base, get_async_read_db, make_async_read_engine, make_engines,
+    )
+    from ftc4.data_pipeline.sources.fake_source import FakePriceSource
+    from ftc4.ml_models.lstm_model.train import Trainer
+
+    path = tmp_path / "api.db"
+    writer, _ = make_engines(path)
+    Base.metadata.create_all(writer)
+    frame = FakePriceSource()(ticker, "2023-01-01", "2023-12-01")
+    with Session(writer) as db:
+        upsert_price_frame(db, frame)
+    Trainer(lookback=10, epochs=1, ticker=ticker).fit(frame["close"].to_numpy())
+
+    async_engine = make_async_read_engine(path)
+
+    async def _read_db():
+        async with AsyncSession(async_engine) as db:
+            yield db
+        await async_engine.dispose()   # conexões aiosqlite presas ao loop desta requisição
+
+    app.dependency_overrides[get_async_read_db] = _read_db
+    return writer, frame
+
+
+def test_predict_async_route_runs_on_inference_executor(tmp_path):
+    from ftc4.ml_models.lstm_model.executor import inference_executor
+
+    writer, _ = _price_db(tmp_path, "ZZAPI")
+    try:
+        completed = inference_executor.stats()["completed"]
+        r = TestClient(app).get("/lstm/predict", params={"ticker": "zzapi", "steps": 3})
+        assert r.status_code == 200, r.text
+        assert len(r.json()["predictions"]) == 3
+        assert inference_executor.stats()["completed"] == completed + 1
+    finally:
+        app.dependency_overrides.clear()
+        writer.dispose()
+
+
+def test_forecast_cache_header_and_invalidation(tmp_path):
+    import sqlite3
+    from datetime import datetime
+    from sqlalchemy.orm import Session
+    from ftc4.data_pipeline.crud.stock_market_prices import upsert_price_frame
+    from ftc4.ml_models.lstm_model.train import Trainer
+
+    writer, frame = _price_db(tmp_path, "ZZFC")
+    client = TestClient(app)
+    get = lambda steps=3: client.get("/lstm/predict", params={"ticker": "ZZFC", "steps": steps})
+    try:
+        first, second = get(), get()
+        assert (first.headers["X-Forecast-Cache"], second.headers["X-Forecast-Cache"]) == ("MISS", "HIT")
+        assert first.json() == second.json()
+        assert get(steps=4).headers["X-Forecast-Cache"] == "MISS"      # passos fazem parte da chave
+
+        # correção de um valor já existente (mesma última data) invalida pelo commit
+        fixed = frame.tail(1).copy()
+        fixed["close"] *= 1.01
+        fixed["high"] = fixed[["high", "close"]].max(axis=1)
+        with Session(writer) as db:
+            upsert_price_frame(db, fixed)
+        assert get().headers["X-Forecast-Cache"] == "MISS"
+        assert get().headers["X-Forecast-Cache"] == "HIT"
+
+        # escrita de outro processo (sem o hook de commit deste): o updated_at do watermark muda a chave
+        with sqlite3.connect(tmp_path / "api.db") as conn:
+            conn.execute("UPDATE stock_prices SET close = close * 1.01 WHERE ticker = 'ZZFC' "
+                         "AND date = (SELECT MAX(date) FROM stock_prices WHERE ticker = 'ZZFC')")
+            conn.execute("UPDATE ticker_watermarks SET updated_at = ? WHERE ticker = 'ZZFC'",
+                         (datetime.now().isoformat(sep=" "),))
+        assert get().headers["X-Forecast-Cache"] == "MISS"
+
+        # novo modelo publicado
+        Trainer(lookback=10, epochs=1, ticker="ZZFC").fit(frame["close"].to_numpy())
+        assert get().headers["X-Forecast-Cache"] == "MISS"
+
+        batch = client.post("/lstm/predict_batch", json={"tickers": ["ZZFC", "NOPE_FC"], "steps": 3})
+        assert batch.headers["X-Forecast-Cache"] == "HIT"
+        assert batch.json()["predictions"]["ZZFC"] == get().json()["predictions"]
+    finally:
+        app.dependency_overrides.clear()
+        writer.dispose()
+
+
+def test_app_import_is_lazy():
+    import subprocess
+    import sys
+
+    code = ("import sys, ftc4.api.public; "
+            "print(','.join(m for m in ('torch', 'sklearn', 'pandas', 'yfinance') if m in sys.modules))")
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == ""
+
+
+def test_ready_after_warm_up(monkeypatch):
+    import asyncio
+    import dataclasses
+    import numpy as np
+    from ftc4.api import startup as startup_module
+    from ftc4.ml_models.lstm_model.train import Trainer
+
+    with TestClient(app) as client:   # lifespan sem warm-up: pronta logo após o init_db
+        r = client.get("/ready")
+        assert r.status_code == 200 and r.json()["status"] == "ready"
+        assert "init_db_s" in r.json()["timings"]
+
+    Trainer(lookback=10, epochs=1, ticker="ZZWARM").fit(np.sin(np.linspace(0, 20, 120)) + 5)
+    monkeypatch.setattr(startup_module, "settings",
+                        dataclasses.replace(startup_module.settings, WARMUP_TICKERS=("ZZWARM",)))
+    state = startup_module.StartupState()
+    monkeypatch.setattr(startup_module, "startup", state)
+    monkeypatch.setattr("ftc4.api.public.startup", state)
+    assert TestClient(app).get("/ready").status_code == 503
+
+    asyncio.run(state.warm_up())
+    r = TestClient(app).get("/ready")
+    assert r.status_code == 200
+    assert set(r.json()["warmup"]["models_s"]) == {"ZZWARM"}
+    assert "warmup_s" in r.json()["timings"]
+
+
+def test_metrics_endpoint_and_slow_request_profile(tmp_path, monkeypatch):
+    import dataclasses
+    from ftc4.api import instrumentation
+    from ftc4.common import metrics
+
+    from ftc4.ml_models.lstm_model.predict import load_artifacts
+
+    writer, _ = _price_db(tmp_path, "ZZMET")
+    client = TestClient(app)
+    try:
+        assert client.get("/lstm/predict", params={"ticker": "ZZMET", "steps": 3}).status_code == 200
+        load_artifacts("ZZMET")   # o treino publica direto no registry; a carga do disco é à parte
+    finally:
+        app.dependency_overrides.clear()
+        writer.dispose()
+
+    text = client.get("/metrics").text
+    assert 'http_request_duration_seconds_count{method="GET",route="/lstm/predict",status="200"} ' in text
+    for name in ("lstm_forecast_step_seconds_count", 'lstm_load_artifacts_seconds_count{variant="eager"}',
+                 "lstm_train_epoch_seconds_count", 'db_query_duration_seconds_count{engine="async_reader",op="select"}'):
+        assert name in text, name
+
+    @metrics.timer("test_timer_seconds", etapa="x")
+    def work():
+        return 42
+    assert work() == 42 and work() == 42
+    assert metrics.registry.get("test_timer_seconds").count(etapa="x") == 2
+
+    # profiler opt-in: toda requisição acima de ~0 ms grava as pilhas
+    monkeypatch.setattr(instrumentation, "settings", dataclasses.replace(
+        instrumentation.settings, PROFILE_SLOW_REQUEST_MS=0.001, PROFILE_DIR=tmp_path / "profiles"))
+    assert client.get("/health").status_code == 200
+    (profile,) = (tmp_path / "profiles").glob("*_GET_health_*.folded")
+    stack, count = profile.read_text().splitlines()[0].rsplit(" ", 1)
+    assert int(count) >= 1 and ";" in stack
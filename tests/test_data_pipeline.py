@@ -0,0 +1,225 @@
+import numpy as np
+import pandas as pd
+from ftc4.data_pipeline.validation.stock_market_prices import normalize_price_frame, validate_price_frame
+
+
+def test_validate_price_frame_rules():
+    raw = pd.DataFrame({
+        "Date": pd.to_datetime(["2024-01-03", "2024-01-02", "2024-01-04", "2024-01-05", "2024-01-08", "bad"],
+                               errors="coerce"),
+        "Open":  [10, 10, 10, 10, -1, 10],
+        "High":  [12, 12, 9, 11, 12, 12],
+        "Low":   [9, 9, 10, 10.5, 9, 9],
+        "Close": [11, 11, 9.5, 11, 11, 11],
+        "Volume": [100, np.nan, 100, 100, 100, 100],
+    })
+    checked = validate_price_frame(normalize_price_frame(raw, ticker=" nvda "))
+
+    assert checked.frame["date"].dt.strftime("%m-%d").tolist() == ["01-02", "01-03"]
+    assert checked.frame["ticker"].unique().tolist() == ["NVDA"]
+    assert checked.frame["volume"].tolist() == [0, 100]
+    assert checked.rejected == {
+        "valores_ausentes": 1,
+        "preco_nao_positivo": 1,
+        "high_menor_que_low": 1,
+        "low_maior_que_open_close": 3,
+        "high_menor_que_open_close": 1,
+        "total": 4,
+    }
+
+
+def test_upsert_price_frame(memory_session):
+    from ftc4.data_pipeline.crud.stock_market_prices import PriceSeries, upsert_price_frame
+
+    frame = validate_price_frame(normalize_price_frame(pd.DataFrame({
+        "date": pd.date_range("2024-01-01", periods=4),
+        "open": 1.0, "high": 2.0, "low": 0.5, "close": [1.0, 1.1, 1.2, 1.3], "volume": 5,
+    }), ticker="aaa")).frame
+
+    db = memory_session
+    assert upsert_price_frame(db, frame, chunk_size=3).inserted == 4
+    assert upsert_price_frame(db, frame).skipped == 4
+    np.testing.assert_allclose(PriceSeries(db).tail("AAA", 2), [1.2, 1.3])
+
+
+def test_delta_sync_fetches_only_missing_ranges(memory_session):
+    from datetime import date
+    from ftc4.data_pipeline.crud.stock_market_prices import get_watermark
+    from ftc4.data_pipeline.ingest import INGESTED, NO_NEW_DATA, UP_TO_DATE, ingest_ticker
+
+    calls = []
+
+    def fake_fetch(ticker, start, end):
+        calls.append((start, end))
+        days = pd.bdate_range(start, end, inclusive="left")
+        return pd.DataFrame({"Date": days, "Open": 10.0, "High": 11.0, "Low": 9.0, "Close": 10.5, "Volume": 1})
+
+    db = memory_session
+    first = ingest_ticker(db, "aaa", date(2024, 1, 8), date(2024, 1, 15), fetch=fake_fetch, mode="delta")
+    assert first.upsert.inserted == 5
+    wm = get_watermark(db, "AAA")
+    assert (wm.first_date, wm.last_date) == (date(2024, 1, 8), date(2024, 1, 12))
+
+    # já atualizado (só resta o fim de semana): nenhum download
+    calls.clear()
+    again = ingest_ticker(db, "AAA", date(2024, 1, 8), date(2024, 1, 14), fetch=fake_fetch, mode="delta")
+    assert again.skipped_download and calls == []
+    assert again.as_dict()["status"] == UP_TO_DATE and first.status == INGESTED
+
+    # período maior: baixa só o trecho anterior e a cauda
+    wider = ingest_ticker(db, "AAA", date(2024, 1, 1), date(2024, 1, 20), fetch=fake_fetch, mode="delta")
+    assert calls == [("2024-01-01", "2024-01-08"), ("2024-01-13", "2024-01-20")]
+    assert (wider.upsert.inserted, wider.upsert.skipped) == (10, 0)
+    wm = get_watermark(db, "AAA")
+    assert (wm.first_date, wm.last_date) == (date(2024, 1, 1), date(2024, 1, 19))
+
+    # cauda só com feriado: baixa, a fonte não devolve nada e o resultado diz isso
+    holiday = ingest_ticker(db, "AAA", date(2024, 1, 1), date(2024, 1, 23),
+                            fetch=lambda *a: pd.DataFrame(), mode="delta")
+    assert holiday.status == NO_NEW_DATA and holiday.records == 0 and not holiday.skipped_download
+
+
+def test_sync_watchlist_offline_with_retries(memory_session):
+    from datetime import date
+    from ftc4.data_pipeline.crud.stock_market_prices import PriceSeries
+    from ftc4.data_pipeline.sources.fake_source import FakePriceSource
+    from ftc4.data_pipeline.watchlist import sync_watchlist
+
+    db = memory_session
+    source = FakePriceSource(fail_times=1)
+    tickers = [f"T{i:02d}" for i in range(12)]
+    report = sync_watchlist(db, tickers, date(2024, 1, 1), date(2024, 3, 1), fetch=source,
+                            max_concurrency=4, backoff_s=0.0, batch_rows=100)
+
+    assert len(report.fetched) == 12 and not report.failed
+    assert report.retries == 12                       # uma falha simulada por ticker
+    assert report.upsert.inserted == report.rows == 12 * 44
+    assert report.commits > 1                         # escritor único gravando em lotes
+    assert len(PriceSeries(db).range("T03")) == 44
+
+    again = sync_watchlist(db, tickers, date(2024, 1, 1), date(2024, 3, 1), fetch=source)
+    assert len(again.up_to_date) == 12 and again.rows == 0
+
+
+def test_cached_price_source_fetches_only_uncovered_ranges(tmp_path):
+    from datetime import date
+    from ftc4.data_pipeline.sources.cache import CachedPriceSource
+    from ftc4.data_pipeline.sources.fake_source import FakePriceSource, synthetic_ohlcv
+    from ftc4.data_pipeline.sources.local_source import LocalDirectorySource
+
+    inner = FakePriceSource()
+    cached = CachedPriceSource(inner, tmp_path / "cache")
+
+    first = cached("nvda", "2023-11-01", "2024-02-01")
+    assert inner.calls["NVDA"] == 1
+    assert sorted(p.name for p in (tmp_path / "cache" / "NVDA").glob("*.parquet")) == ["2023.parquet", "2024.parquet"]
+
+    # Contido no que já foi baixado: nenhuma chamada à fonte
+    inside = cached("NVDA", "2023-12-01", "2024-01-15")
+    assert inner.calls["NVDA"] == 1 and cached.hits == 1
+    assert inside["date"].between("2023-12-01", "2024-01-14").all()
+
+    # Sobreposição parcial: só a cauda descoberta vai para a fonte
+    wider = cached("NVDA", "2023-11-01", "2024-03-01")
+    assert inner.calls["NVDA"] == 2
+    assert cached.coverage("NVDA") == [(date(2023, 11, 1), date(2024, 3, 1))]
+    expected = synthetic_ohlcv("NVDA", "2023-11-01", "2024-03-01")
+    np.testing.assert_allclose(wider["close"].to_numpy(), expected["Close"].to_numpy())
+    assert wider.iloc[: len(first)]["date"].equals(first["date"])
+
+    # Replay offline a partir de um diretório local (mesmo formato do yfinance)
+    expected.to_csv(tmp_path / "NVDA.csv", index=False)
+    local = LocalDirectorySource(tmp_path)("NVDA", "2024-01-01", "2024-02-01")
+    assert len(local) == len(synthetic_ohlcv("NVDA", "2024-01-01", "2024-02-01"))
+    assert set(local.columns) >= {"date", "ticker", "close"} and (local["ticker"] == "NVDA").all()
+
+
+def test_cached_price_source_retries_empty_ranges(tmp_path):
+    from datetime import date
+    from ftc4.data_pipeline.sources.base import empty_price_frame
+    from ftc4.data_pipeline.sources.cache import CachedPriceSource
+    from ftc4.data_pipeline.sources.fake_source import FakePriceSource
+
+    class FlakySource(FakePriceSource):
+        # como o yfinance em falha de rede: frame vazio em vez de exceção na primeira chamada
+        def fetch(self, ticker, start, end):
+            if not self.calls[ticker]:
+                self.calls[ticker] += 1
+                return empty_price_frame()
+            return super().fetch(ticker, start, end)
+
+    inner = FlakySource()
+    cached = CachedPriceSource(inner, tmp_path / "cache")
+
+    assert cached("NVDA", "2024-01-01", "2024-02-01").empty
+    assert cached.coverage("NVDA") == []
+
+    retried = cached("NVDA", "2024-01-01", "2024-02-01")
+    assert inner.calls["NVDA"] == 2 and not retried.empty
+    assert cached.coverage("NVDA") == [(date(2024, 1, 1), date(2024, 2, 1))]
+
+    # fim de semana sem pregão: vazio legítimo, fica coberto
+    assert cached("NVDA", "2024-03-02", "2024-03-04").empty
+    assert (date(2024, 3, 2), date(2024, 3, 4)) in cached.coverage("NVDA")
+
+
+def test_ingest_stream_ndjson_and_csv_in_chunks(memory_session):
+    import json
+    from ftc4.data_pipeline.crud.stock_market_prices import PriceSeries
+    from ftc4.data_pipeline.streaming import INVALID_RECORD, ingest_stream
+
+    rows = [
+        {"date": f"2024-01-{d:02d}", "ticker": "nvda", "open": 10, "high": 12, "low": 9, "close": 11, "volume": 100}
+        for d in range(1, 11)
+    ]
+    rows[3]["high"] = 1                                  # high < low
+    body = "\n".join(json.dumps(r) for r in rows[:6]) + "\n{quebrado\n" + "\n".join(json.dumps(r) for r in rows[6:])
+    raw = body.encode()
+    pieces = [raw[i:i + 7] for i in range(0, len(raw), 7)]  # linhas partidas entre pedaços
+
+    db = memory_session
+    report = ingest_stream(db, pieces, fmt="ndjson", chunk_size=4).as_dict()
+    assert report["received"] == 11 and report["accepted"] == 9 and report["inserted"] == 9
+    assert [c["received"] for c in report["chunks"]] == [4, 4, 3]
+    assert report["chunks"][0]["rejected"] == {"high_menor_que_low": 1, "high_menor_que_open_close": 1}
+    assert report["chunks"][1]["rejected"] == {INVALID_RECORD: 1}
+    assert len(PriceSeries(db).range("NVDA")) == 9
+
+    csv_body = b"Date,Ticker,Open,High,Low,Close,Volume\n2024-01-11,NVDA,10,12,9,11,100\n2024-01-01,NVDA,10,12,9,11.5,100\n"
+    report = ingest_stream(db, [csv_body], fmt="csv").as_dict()
+    assert (report["inserted"], report["updated"]) == (1, 1)
+
+
+def test_delta_sync_releases_writer_lock_during_download(tmp_path):
+    import sqlite3
+    from datetime import date
+    from sqlalchemy.orm import Session
+    from ftc4.data_pipeline.database.connection import Base, make_engines
+    from ftc4.data_pipeline.ingest import ingest_ticker
+    from ftc4.data_pipeline.sources.fake_source import FakePriceSource
+    from ftc4.data_pipeline.watchlist import sync_watchlist
+
+    path = tmp_path / "lock.db"
+    writer, _ = make_engines(path)
+    Base.metadata.create_all(writer)
+    source = FakePriceSource()
+    locked = []
+
+    def fetch(ticker, start, end):
+        # outro processo/conexão precisa conseguir escrever enquanto o download acontece
+        other = sqlite3.connect(path, timeout=0)
+        try:
+            other.execute("BEGIN IMMEDIATE")
+            other.rollback()
+        except sqlite3.OperationalError as e:
+            locked.append(str(e))
+        finally:
+            other.close()
+        return source(ticker, start, end)
+
+    with Session(writer) as db:
+        ingest_ticker(db, "AAA", date(2024, 1, 1), date(2024, 2, 1), fetch=source)
+        ingest_ticker(db, "AAA", date(2024, 1, 1), date(2024, 3, 1), fetch=fetch, mode="delta")
+        sync_watchlist(db, ["AAA", "BBB"], date(2024, 1, 1), date(2024, 4, 1), fetch=fetch, max_concurrency=1)
+    writer.dispose()
+    assert locked == []
@@ -1,13 +1,126 @@
+from datetime import date, timedelta
+
+import numpy as np
 from sqlalchemy import inspect
-from ftc4.data_pipeline.database.connection import engine
+from sqlalchemy.orm import Session
+from ftc4.data_pipeline.database.connection import Base, engine
 from ftc4.data_pipeline.database.init_db import init_db
+from ftc4.data_pipeline.orm_models.stock_market import StockPrice
 
 def test_init_db():
     init_db()
 
 def test_check_tables():
     insp = inspect(engine)
-    assert insp.get_table_names() == ['stock_prices']
+    assert insp.get_table_names() == ['stock_prices', 'ticker_watermarks']
+
+
+
+def _add_prices(db: Session, ticker: str, closes):
+    start = date(2024, 1, 1)
+    db.add_all(
+        StockPrice(date=start + timedelta(days=i), ticker=ticker, close=c, high=c, low=c, open=c, volume=1)
+        for i, c in enumerate(closes)
+    )
+    db.commit()
+
+
+def test_price_series_tail_range_and_index(memory_session):
+    from ftc4.data_pipeline.crud.stock_market_prices import PriceSeries
+
+    db = memory_session
+    _add_prices(db, "AAA", [10.0, 11.5, 12.25, 13.0, 14.75])
+    _add_prices(db, "BBB", [1.0, 2.0])
+    series = PriceSeries(db)
+
+    tail = series.tail("aaa", 3)
+    assert tail.dtype == np.float64
+    np.testing.assert_array_equal(tail, [12.25, 13.0, 14.75])
+    np.testing.assert_array_equal(series.range("AAA", date(2024, 1, 2), date(2024, 1, 3)), [11.5, 12.25])
+    assert len(series.range("AAA")) == 5
+
+    tails = series.tails(["AAA", "BBB", "CCC"], 2)
+    assert set(tails) == {"AAA", "BBB"}
+    np.testing.assert_array_equal(tails["AAA"], [13.0, 14.75])
+    np.testing.assert_array_equal(tails["BBB"], [1.0, 2.0])
+
+    indexes = {ix["name"]: ix["column_names"] for ix in inspect(db.get_bind()).get_indexes("stock_prices")}
+    assert indexes["ix_stock_prices_ticker_date"] == ["ticker", "date"]
+
+
+def test_upsert_prices_counts_and_uniqueness(memory_session):
+    from ftc4.data_pipeline.crud.stock_market_prices import PriceSeries, upsert_prices
+
+    db = memory_session
+    rows = [
+        {"date": date(2024, 1, d), "ticker": "aaa", "open": 1.0, "high": 2.0, "low": 0.5, "close": 1.5, "volume": 10}
+        for d in range(1, 6)
+    ]
+    first = upsert_prices(db, rows, chunk_size=2)
+    assert (first.inserted, first.updated, first.skipped, first.chunks) == (5, 0, 0, 3)
+
+    # reenvio com sobreposição: 2 alteradas, 3 idênticas, 1 nova e 1 repetida no lote
+    changed = [dict(r, close=1.75) if r["date"].day in (4, 5) else r for r in rows]
+    extra = {**rows[0], "date": date(2024, 1, 6)}
+    second = upsert_prices(db, changed + [extra, extra], chunk_size=100)
+    assert (second.inserted, second.updated, second.skipped) == (1, 2, 4)
+
+    np.testing.assert_array_equal(PriceSeries(db).range("AAA"), [1.5, 1.5, 1.5, 1.75, 1.75, 1.5])
+
+
+def test_series_cache_lazy_load_append_and_rollback(memory_session):
+    from ftc4.data_pipeline.crud.stock_market_prices import PriceSeries, upsert_prices
+    from ftc4.data_pipeline.series_cache import SeriesCache
+
+    db = memory_session
+    cache = SeriesCache(db.get_bind(), check_interval_s=3600)
+    row = lambda d, c: {"date": date(2024, 1, d), "ticker": "AAA", "open": c, "high": c, "low": c, "close": c, "volume": 1}
+    upsert_prices(db, [row(d, float(d)) for d in (2, 3, 4)])
+
+    series = PriceSeries(db)
+    assert series.cache is cache
+    np.testing.assert_array_equal(series.range("AAA"), [2.0, 3.0, 4.0])   # carga preguiçosa
+    assert cache.stats()["misses"] == 1
+
+    # append na cauda, atualização e backfill chegam ao cache no commit, sem recarga
+    upsert_prices(db, [row(5, 5.0), row(3, 30.0), row(1, 1.0)])
+    np.testing.assert_array_equal(series.range("AAA"), [1.0, 2.0, 30.0, 4.0, 5.0])
+    np.testing.assert_array_equal(series.tail("AAA", 2), [4.0, 5.0])
+    np.testing.assert_array_equal(series.range("AAA", date(2024, 1, 2), date(2024, 1, 3)), [2.0, 30.0])
+    stats = cache.stats()
+    assert stats["misses"] == 1 and stats["reloads"] == 0 and stats["appends"] == 1
+
+    # rollback descarta as linhas pendentes
+    try:
+        upsert_prices(db, [row(6, 6.0), {**row(7, 7.0), "close": None}])
+    except Exception:
+        pass
+    assert len(series.range("AAA")) == 5
+
+    # cache e consulta direta concordam
+    np.testing.assert_array_equal(series.range("AAA"), PriceSeries(db, use_cache=False).range("AAA"))
+    assert not series.range("AAA").flags.writeable
+
+
+def test_wal_profile_reader_writer_engines(tmp_path):
+    import pytest
+    from sqlalchemy import text
+    from sqlalchemy.exc import OperationalError
+    from ftc4.data_pipeline.database.connection import make_engines
 
+    writer, reader = make_engines(tmp_path / "wal.db", profile="wal", read_pool_size=2)
+    Base.metadata.create_all(writer)
+    with writer.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1   # NORMAL
+        assert conn.exec_driver_sql("PRAGMA busy_timeout").scalar() > 0
+    assert writer.pool.size() == 1
 
-    
\ No newline at end of file
+    with Session(writer) as db:
+        _add_prices(db, "AAA", [1.0, 2.0])
+    with Session(reader) as db:
+        assert db.execute(text("SELECT COUNT(*) FROM stock_prices")).scalar() == 2
+        with pytest.raises(OperationalError):
+            db.execute(text("DELETE FROM stock_prices"))
+    writer.dispose()
+    reader.dispose()
@@ -0,0 +1,41 @@
+import json
+import logging
+import threading
+
+from ftc4.common.logger import build_handlers, build_pipeline
+
+
+def test_queue_pipeline_sampling_lazy_format_and_rotation(tmp_path):
+    handlers = build_handlers(tmp_path, rotation="size", console=False)
+    queue_handler, listener = build_pipeline(handlers, default_rate=1.0, rates={"t.hot": 0.1})
+    logger = logging.getLogger("t.hot.route")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(queue_handler)
+
+    class Arg:
+        thread = None
+
+        def __str__(self):
+            Arg.thread = threading.current_thread().name
+            return "arg"
+
+    try:
+        for i in range(2000):
+            logger.info("evento %d", i)
+        for _ in range(5):
+            logger.warning("aviso %s", Arg())
+    finally:
+        listener.stop()
+        logger.removeHandler(queue_handler)
+        for h in handlers:
+            h.close()
+
+    lines = [json.loads(l) for l in (tmp_path / "app.jsonl").read_text(encoding="utf-8").splitlines()]
+    infos = [l for l in lines if l["levelname"] == "INFO"]
+    warnings = [l for l in lines if l["levelname"] == "WARNING"]
+    assert 100 < len(infos) < 320            # ~10% amostrado
+    assert len(warnings) == 5                # WARNING+ nunca é amostrado
+    assert warnings[0]["message"] == "aviso arg" and warnings[0]["request_id"] == "-"
+    assert Arg.thread != threading.current_thread().name   # formatado na thread do listener
+    assert isinstance(handlers[0], logging.handlers.RotatingFileHandler)
@@ -9,4 +9,313 @@ def test_lstm_train_predict_smoke():
     t = Trainer(lookback=20, epochs=1, batch_size=32)
     t.fit(s)
     preds = predict_next(s, n_steps=3)
-    assert len(preds) == 3
\ No newline at end of file
+    assert len(preds) == 3
+
+def test_model_registry_cache_and_hot_swap():
+    from ftc4.ml_models.lstm_model.predict import get_model
+    from ftc4.ml_models.lstm_model.registry import model_registry
+
+    s = np.sin(np.linspace(0, 50, 400)) + 10
+    Trainer(lookback=20, epochs=1, batch_size=32).fit(s)
+    published = get_model()
+
+    hits = model_registry.stats()["hits"]
+    predict_next(s, n_steps=2)
+    predict_next(s, n_steps=2)
+    assert model_registry.stats()["hits"] == hits + 2
+    assert get_model() is published  # sem recarga do disco
+
+    # novo treino troca a entrada atomicamente
+    Trainer(lookback=20, epochs=1, batch_size=32).fit(s)
+    assert get_model() is not published
+    model_registry.invalidate(published.signature.slot)
+    assert len(predict_next(s, n_steps=2)) == 2
+
+
+def test_artifact_store_versions_and_mmap(tmp_path):
+    import torch
+    from ftc4.ml_models.lstm_model.store import ArtifactStore
+
+    s = np.sin(np.linspace(0, 50, 400)) + 10
+    trainer = Trainer(lookback=20, epochs=1, batch_size=32)
+    model = trainer.fit(s).cpu().eval()
+
+    store = ArtifactStore(tmp_path, keep_versions=2)
+    keys = [store.save(model, trainer.pp, ticker=t) for t in ("aapl", "AAPL", "NVDA", "AAPL")]
+    assert [k.version for k in keys] == [1, 2, 1, 3]
+    assert store.versions("AAPL", 20) == [2, 3]            # poda mantém as 2 últimas
+    assert store.resolve("AAPL") == keys[-1]
+
+    loaded, pp = store.load(keys[-1])
+    # todos os parâmetros são views do mesmo buffer mapeado (sem cópia por tensor)
+    storage_ptrs = {p.untyped_storage().data_ptr() for p in loaded.parameters()}
+    assert len(storage_ptrs) == 1
+    x = torch.randn(2, 20, 1)
+    with torch.no_grad():
+        assert torch.allclose(loaded(x), model(x))
+    assert pp.lookback == 20
+
+
+def test_training_job_queue_dedup_and_progress():
+    import time
+    from ftc4.ml_models.lstm_model.jobs import SUCCEEDED, TrainingJobManager
+
+    s = np.sin(np.linspace(0, 50, 400)) + 10
+    manager = TrainingJobManager(max_workers=1, max_pending=4)
+    try:
+        job, dedup = manager.submit("job_test", 20, s, epochs=2)
+        again, dedup_again = manager.submit("JOB_TEST", 20, s, epochs=2)
+        assert (dedup, dedup_again) == (False, True)
+        assert again.id == job.id
+
+        deadline = time.time() + 120
+        while time.time() < deadline and (job.status != SUCCEEDED or len(job.progress) < 2):
+            time.sleep(0.2)
+        assert job.status == SUCCEEDED, job.error
+        assert [p["epoch"] for p in job.progress] == [1, 2]
+        assert job.result["ticker"] == "JOB_TEST"
+    finally:
+        manager.shutdown()
+
+
+def test_predict_next_batch_matches_single():
+    from ftc4.ml_models.lstm_model.predict import predict_next_batch
+
+    s = np.sin(np.linspace(0, 50, 400)) + 10
+    series = {"AAA": s, "BBB": s[:-7] * 1.01, "CCC": s[:5]}
+    for t in ("AAA", "BBB"):
+        Trainer(lookback=20, epochs=1, batch_size=32, ticker=t).fit(series[t])
+    preds, errors = predict_next_batch(series, n_steps=4)
+
+    # CCC não tem modelo próprio: erro, sem cair no slot padrão
+    assert set(preds) == {"AAA", "BBB"} and set(errors) == {"CCC"}
+    for t in ("AAA", "BBB"):
+        np.testing.assert_allclose(preds[t], predict_next(series[t], n_steps=4, ticker=t), rtol=1e-5)
+
+
+def test_stateful_inference_agrees_with_window_path():
+    import torch
+    from ftc4.ml_models.lstm_model.predict import _stateful_forecast, _window_forecast
+
+    torch.manual_seed(0)
+    s = np.sin(np.linspace(0, 50, 400)) + 10
+    Trainer(lookback=20, epochs=1, batch_size=32).fit(s)
+
+    # primeiro passo é idêntico; os seguintes ficam próximos (o estado guarda o histórico inteiro)
+    window = predict_next(s, n_steps=8, mode="window")
+    stateful = predict_next(s, n_steps=8, mode="stateful")
+    np.testing.assert_allclose(stateful[0], window[0], rtol=1e-5)
+    np.testing.assert_allclose(stateful, window, atol=0.02 * np.ptp(s))
+
+    # caminho em lote com buffer pré-alocado == loop original com concatenação
+    from ftc4.ml_models.lstm_model.predict import get_model
+    model = get_model().model
+    w = torch.rand(3, 20, 1)
+    with torch.no_grad():
+        expected, win = [], w
+        for _ in range(5):
+            yhat = model(win)
+            expected.append(yhat)
+            win = torch.cat([win[:, 1:], yhat.unsqueeze(1)], dim=1)
+        torch.testing.assert_close(_window_forecast(model, w, 5), torch.cat(expected, dim=1))
+        assert _stateful_forecast(model, w, 5).shape == (3, 5)
+
+
+def test_micro_batcher_groups_concurrent_requests():
+    import asyncio
+    from ftc4.ml_models.lstm_model.batching import MicroBatcher
+    from ftc4.ml_models.lstm_model.executor import InferenceExecutor
+    from ftc4.ml_models.lstm_model.predict import resolve_model_key
+
+    s = np.sin(np.linspace(0, 50, 400)) + 10
+    Trainer(lookback=20, epochs=1, batch_size=32).fit(s)
+    key = resolve_model_key()
+    series = [s[: 300 + 10 * i] for i in range(6)]
+    steps = [1, 3, 5, 2, 5, 4]
+
+    executor = InferenceExecutor(max_workers=1)
+    batcher = MicroBatcher(max_batch_size=4, max_wait_ms=50, executor=executor)
+
+    async def run():
+        return await asyncio.gather(*(batcher.predict(key, x, n) for x, n in zip(series, steps)))
+
+    async def run_shutdown():
+        # janela longa: o shutdown dispara o grupo pendente e espera o lote terminar
+        slow = MicroBatcher(max_batch_size=8, max_wait_ms=60_000, executor=executor)
+        request = asyncio.ensure_future(slow.predict(key, series[0], 2))
+        await asyncio.sleep(0)
+        await slow.shutdown()
+        return request.result(), slow._tasks
+
+    try:
+        results = asyncio.run(run())
+        assert not batcher._tasks   # referências soltas quando o lote termina
+        flushed, tasks = asyncio.run(run_shutdown())
+    finally:
+        executor.shutdown()
+    assert flushed.shape == (2,) and not tasks
+
+    for x, n, got in zip(series, steps, results):
+        assert got.shape == (n,)
+        np.testing.assert_allclose(got, predict_next(x, n_steps=n), rtol=1e-5)
+    stats = batcher.stats()
+    # 6 pedidos: um lote cheio (4) + um lote disparado pelo tempo (2)
+    assert (stats["batches"], stats["full_batches"], executor.stats()["completed"]) == (2, 1, 3)
+    assert stats["fill_rate"] == 0.75
+
+
+def test_zero_copy_windows_and_early_stopping():
+    from ftc4.ml_models.lstm_model.preprocess import SeriesPreprocessor
+    from ftc4.ml_models.lstm_model.store import artifact_store
+
+    scaled = np.arange(10, dtype=float).reshape(-1, 1)
+    X, y = SeriesPreprocessor(lookback=3).build_windows(scaled)
+    assert X.shape == (7, 3, 1) and np.shares_memory(X, scaled)
+    np.testing.assert_array_equal(X[:, :, 0], [[i, i + 1, i + 2] for i in range(7)])
+    np.testing.assert_array_equal(y, np.arange(3, 10))
+
+    # min_delta inalcançável: melhor época é a 1ª e o treino para após `patience` épocas sem melhora
+    s = np.sin(np.linspace(0, 50, 400)) + 10
+    trainer = Trainer(lookback=20, epochs=20, batch_size=32, val_split=0.1, patience=2, min_delta=10.0)
+    trainer.fit(s)
+    assert len(trainer.history) == 3 and trainer.best_epoch == 1
+    assert all(h["val_loss"] is not None for h in trainer.history)
+    manifest = artifact_store.manifest(trainer.key)
+    assert manifest["epochs_run"] == 3 and manifest["best_epoch"] == 1
+
+    # padrão: sem validação, a série inteira (inclusive o fim) entra no treino
+    trainer = Trainer(lookback=20, epochs=2, batch_size=32)
+    trainer.fit(s)
+    assert len(trainer.history) == 2 and all(h["val_loss"] is None for h in trainer.history)
+
+
+def test_training_sweep_parallel_report():
+    import time
+    import pytest
+    from ftc4.ml_models.lstm_model.jobs import SUCCEEDED, JobQueueFull, TrainingJobManager, sweep_changes
+
+    s = np.sin(np.linspace(0, 50, 400)) + 10
+    manager = TrainingJobManager(max_workers=2, max_pending=1, torch_threads=1, max_sweep_pending=2)
+    try:
+        # a varredura tem teto próprio (max_sweep_pending), acima do limite de pedidos avulsos
+        sweep = manager.submit_sweep({"SWEEP_A": s, "SWEEP_B": s * 1.1}, 20, epochs=1, errors={"X": "curta"})
+        assert set(sweep.job_ids) == {"SWEEP_A", "SWEEP_B"}
+        # jobs já em andamento não contam de novo; um ticker novo passaria do teto
+        assert manager.submit_sweep({"SWEEP_A": s}, 20, epochs=1).job_ids == {"SWEEP_A": sweep.job_ids["SWEEP_A"]}
+        with pytest.raises(JobQueueFull):
+            manager.submit_sweep({"SWEEP_A": s, "SWEEP_C": s}, 20, epochs=1)
+
+        seen, events = {}, []
+        deadline = time.time() + 180
+        while time.time() < deadline:
+            status = manager.sweep_status(sweep.id)
+            events += sweep_changes(seen, status)
+            if status["status"] == "finished":
+                break
+            time.sleep(0.2)
+        assert status["status"] == "finished"
+        assert status["counts"] == {SUCCEEDED: 2} and status["errors"] == {"X": "curta"}
+        assert status["wall_s"] > 0 and status["workers"] == 2
+        for ticker, info in status["jobs"].items():
+            assert info["result"]["ticker"] == ticker   # slot de artefato próprio
+            assert info["train_s"] > 0 and info["epochs_done"] == 1
+        assert {e["ticker"] for e in events if e["status"] == SUCCEEDED} == {"SWEEP_A", "SWEEP_B"}
+    finally:
+        manager.shutdown()
+
+
+def test_fine_tune_warm_start_and_refit():
+    from ftc4.ml_models.lstm_model.store import artifact_store
+    from ftc4.ml_models.lstm_model.train import FULL, INCREMENTAL, UNCHANGED
+
+    s = np.sin(np.linspace(0, 50, 400)) + 10
+    base = Trainer(lookback=20, epochs=1, batch_size=32, ticker="FT_TEST")
+    base.fit(s[:350])
+    assert artifact_store.load_optimizer_state(base.key) is not None
+
+    # só as janelas novas + replay, partindo dos pesos e do otimizador salvos
+    t = Trainer(lookback=20, epochs=1, batch_size=32, ticker="FT_TEST")
+    t.fine_tune(s[:360], epochs=2, replay=64)
+    manifest = artifact_store.manifest(t.key)
+    assert t.mode == INCREMENTAL and t.key.version == base.key.version + 1
+    assert (manifest["base_version"], manifest["n_new"], manifest["n_replay"]) == (base.key.version, 10, 64)
+    assert len(t.history) == 2
+    assert len(predict_next(s[:360], n_steps=2, ticker="FT_TEST", lookback=20)) == 2
+
+    # nada novo: mantém a versão ativa
+    t = Trainer(lookback=20, epochs=1, batch_size=32, ticker="FT_TEST")
+    t.fine_tune(s[:360])
+    assert t.mode == UNCHANGED and t.key.version == base.key.version + 1
+
+    # dado novo fora da faixa do scaler: treino completo
+    t = Trainer(lookback=20, epochs=1, batch_size=32, ticker="FT_TEST")
+    t.fine_tune(np.append(s[:360], 100.0))
+    assert t.mode == FULL and "faixa do scaler" in t.refit_reason
+
+
+def test_incremental_job_uses_requested_epochs():
+    import queue
+    from ftc4.common.config import settings
+    from ftc4.ml_models.lstm_model.jobs import DEFAULT_EPOCHS, _run_training_job, resolve_epochs
+    from ftc4.ml_models.lstm_model.train import INCREMENTAL
+
+    assert resolve_epochs(None, incremental=True) == settings.FINETUNE_EPOCHS
+    assert resolve_epochs(None, incremental=False) == DEFAULT_EPOCHS and resolve_epochs(4, True) == 4
+
+    s = np.sin(np.linspace(0, 50, 400)) + 10
+    Trainer(lookback=20, epochs=1, batch_size=32, ticker="FT_JOB").fit(s[:350])
+    events = queue.Queue()
+    result = _run_training_job("job", "FT_JOB", 20, 4, s[:360], events, {}, incremental=True)
+    epochs = [payload for _, kind, payload in events.queue if kind == "epoch"]
+    assert result["mode"] == INCREMENTAL and len(epochs) == 4
+
+
+def test_settings_reject_invalid_variants():
+    import dataclasses
+    import pytest
+    from ftc4.common.config import settings
+
+    with pytest.raises(ValueError, match="LSTM_EXPORT_VARIANTS"):
+        dataclasses.replace(settings, LSTM_EXPORT_VARIANTS=("torchscript", "fp16"))
+    with pytest.raises(ValueError, match="LSTM_SERVING_VARIANT"):
+        dataclasses.replace(settings, LSTM_SERVING_VARIANT="onnx")
+
+
+def test_export_variants_report_and_serving(monkeypatch):
+    import dataclasses
+    import torch
+    from ftc4.common.config import settings
+    from ftc4.ml_models.lstm_model import export, predict, train
+    from ftc4.ml_models.lstm_model.predict import get_model, load_artifacts
+    from ftc4.ml_models.lstm_model.store import artifact_store
+
+    # exportação é opcional (padrão desligado)
+    monkeypatch.setattr(export, "settings", dataclasses.replace(settings, LSTM_EXPORT_VARIANTS=("torchscript", "int8")))
+    s = np.sin(np.linspace(0, 50, 400)) + 10
+    t = Trainer(lookback=20, epochs=1, batch_size=32, ticker="EXPORT_TEST")
+    t.fit(s)
+
+    report = artifact_store.export_report(t.key)
+    assert set(report["variants"]) == {"eager", "torchscript", "int8"}
+    assert report["variants"]["torchscript"]["max_abs_delta"] < 1e-4
+    assert report["variants"]["int8"]["max_abs_delta"] < 0.5
+    assert set(report["variants"]["int8"]["latency_ms"]) == {"batch_1", "batch_32"}
+
+    model, _ = load_artifacts("EXPORT_TEST", variant="int8")
+    assert isinstance(model, torch.jit.ScriptModule)
+
+    # a chave de configuração escolhe a variante servida
+    serving = dataclasses.replace(settings, LSTM_SERVING_VARIANT="torchscript")
+    monkeypatch.setattr(train, "settings", serving)
+    monkeypatch.setattr(predict, "settings", serving)
+    # durante a exportação o ponteiro ainda aponta a versão anterior (já com variantes)
+    active_during_export = []
+    export_variants = train.export_variants
+    monkeypatch.setattr(train, "export_variants", lambda *a, **kw: (
+        active_during_export.append(artifact_store.resolve("EXPORT_TEST")), export_variants(*a, **kw))[1])
+    t2 = Trainer(lookback=20, epochs=1, batch_size=32, ticker="EXPORT_TEST")
+    t2.fit(s)
+    assert active_during_export == [t.key] and artifact_store.resolve("EXPORT_TEST") == t2.key
+    assert isinstance(get_model("EXPORT_TEST").model, torch.jit.ScriptModule)
+    for mode in ("window", "stateful"):
+        assert len(predict_next(s, n_steps=3, ticker="EXPORT_TEST", mode=mode)) == 3